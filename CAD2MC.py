@@ -49,18 +49,40 @@ __date__    = "26/3/2019"
 ######################################################
 
 import os, sys
-OPENMCPATH = '/Users/faryab/anaconda3/envs/UROPTesting2/lib/python3.6/site-packages/'
+# only appended to sys.path when openmc is first used; set $OPENMCPATH to override
+OPENMCPATH = os.environ.get('OPENMCPATH', '/Users/faryab/anaconda3/envs/UROPTesting2/lib/python3.6/site-packages/')
 DEBUG = True
 #FREECADPATH = '/Users/faryab/anaconda3/envs/UROPTesting/lib' #
 #sys.path.append(FREECADPATH) #
-sys.path.append(OPENMCPATH)
-import openmc
-import FreeCAD
-import FreeCADGui #
-import Part  #FreeCAD's Part Workbench #
 import math
 import pickle
-from FreeCAD import Base #
+from functools import reduce
+from collections import namedtuple
+from lazyimport import LazyModule
+import converterregistry
+from converterregistry import ConverterRegistry
+from idallocator import IDAllocator
+from materialrules import MaterialRules, DEFAULT_RULES, DEFAULT_MATERIALS, check_materials
+import dependencyindex
+import geometryir
+import conversioncache
+import symmetry
+import shardedexport
+from xml.sax.saxutils import quoteattr
+from conversionscheduler import LevelScheduler
+
+
+def _add_openmc_path():
+    if OPENMCPATH and OPENMCPATH not in sys.path:
+        sys.path.append(OPENMCPATH)
+
+
+# the backends are imported on first use (see lazyimport.py)
+openmc = LazyModule('openmc', setup=_add_openmc_path)
+FreeCAD = LazyModule('FreeCAD')
+FreeCADGui = LazyModule('FreeCADGui') #
+Part = LazyModule('Part')  #FreeCAD's Part Workbench #
+Base = LazyModule('FreeCAD.Base', lambda: FreeCAD.Base) #
 
 # Have to import FREECAD from a separate env into this one.
 # in order to have FREECAD actually work, make sure you have
@@ -73,6 +95,44 @@ from FreeCAD import Base #
 # --------------- CONVERSION METHODS --------------- #
 ######################################################
 
+# TypeId -> converter (see converterregistry.py)
+primitives = ConverterRegistry('OpenMC primitives')    # convert(obj) -> region
+operations = ConverterRegistry('OpenMC operations')    # convert(obj, regions) -> region
+
+# The converters build geometryir regions over this table; the OpenMC objects are only
+# created by materialize() when the cells are exported.
+surfaces = geometryir.SurfaceTable()
+_materializer = geometryir.Materializer(surfaces)
+
+
+def get_surface(kind, boundary_type='transmission', **coeffs):
+    """
+    Returns the surface of type kind with the given coefficients, adding it to the surface
+    table only the first time. Coincident planes of different primitives (e.g. the
+    z-planes of coaxial cylinders) are then the same surface, which subtract_region
+    relies on.
+    :param kind: OpenMC surface class name ('ZPlane', 'ZCylinder', ...)
+    :param boundary_type: OpenMC boundary type
+    :param coeffs: keyword coefficients of the class (x0=, R=, ...)
+    :return: geometryir.SurfaceRef (+ref and -ref are its halfspaces)
+    """
+    return surfaces.add(kind, boundary_type, **coeffs)
+
+
+def materialize(region, materializer=None):
+    """
+    Creates the OpenMC region of a converted region. Every surface and every distinct
+    region is only created once, however often it is materialized.
+    :param region: geometryir.Region
+    :param materializer: geometryir.Materializer to use instead of the module's one
+    :return: openmc.Region (None for None)
+    """
+    if region is None:
+        return None
+    return (materializer or _materializer).region(region)
+
+
+@primitives.register('Part::Box')
 def convert_box(box):
     """
     Converts a Part workbench Box to an OpenMC Cuboid.
@@ -84,12 +144,12 @@ def convert_box(box):
     bounds = box.BoundBox
 
     # TODO: Boundary Type how to specify?
-    xMin = openmc.XPlane(x0=bounds.XMin, boundary_type='reflective')
-    yMin = openmc.YPlane(y0=bounds.YMin, boundary_type='reflective')
-    zMin = openmc.ZPlane(z0=bounds.ZMin, boundary_type='reflective')
-    xMax = openmc.XPlane(x0=bounds.XMax, boundary_type='reflective')
-    yMax = openmc.YPlane(y0=bounds.YMax, boundary_type='reflective')
-    zMax = openmc.ZPlane(z0=bounds.ZMax, boundary_type='reflective')
+    xMin = get_surface('XPlane', x0=bounds.XMin, boundary_type='reflective')
+    yMin = get_surface('YPlane', y0=bounds.YMin, boundary_type='reflective')
+    zMin = get_surface('ZPlane', z0=bounds.ZMin, boundary_type='reflective')
+    xMax = get_surface('XPlane', x0=bounds.XMax, boundary_type='reflective')
+    yMax = get_surface('YPlane', y0=bounds.YMax, boundary_type='reflective')
+    zMax = get_surface('ZPlane', z0=bounds.ZMax, boundary_type='reflective')
 
     box = +xMin & -xMax & +yMin & -yMax & +zMin & -zMax
 
@@ -108,12 +168,14 @@ def convert_plane(plane):
     return 0
 
 
+@primitives.register('Part::Cylinder')
 def convert_cylinder(clndr):
     """
     Converts an arbitrary FreeCAD cylinder to an arbitrary OpenMC cylinder
     Restrictions: Only cylinders in the X, Y or Z directions work
     :param clndr:
     :return: cylinder half space
+    :raises NotImplementedError: for cylinders whose axis is not found from the bounds
     """
     bounds = clndr.BoundBox
     # 0 1 2 3 4 5
@@ -127,10 +189,10 @@ def convert_cylinder(clndr):
         y = clndr.Placement.Base.y
         r = bounds.XLength/2
 
-        z_min = openmc.ZPlane(z0=bounds.ZMin, boundary_type='reflective')
-        z_max = openmc.ZPlane(z0=bounds.ZMax, boundary_type='reflective')
+        z_min = get_surface('ZPlane', z0=bounds.ZMin, boundary_type='reflective')
+        z_max = get_surface('ZPlane', z0=bounds.ZMax, boundary_type='reflective')
 
-        c_MC = openmc.ZCylinder(None, 'transmission', x, y, r)
+        c_MC = get_surface('ZCylinder', x0=x, y0=y, R=r)
 
         result = -c_MC & -z_max & +z_min
 
@@ -141,40 +203,41 @@ def convert_cylinder(clndr):
         z = clndr.Placement.Base.z
         r = bounds.XLength / 2
 
-        y_min = openmc.YPlane(y0=bounds.YMin, boundary_type='reflective')
-        y_max = openmc.YPlane(y0=bounds.YMax, boundary_type='reflective')
+        y_min = get_surface('YPlane', y0=bounds.YMin, boundary_type='reflective')
+        y_max = get_surface('YPlane', y0=bounds.YMax, boundary_type='reflective')
 
-        c_MC = openmc.ZCylinder(None, 'transmission', x, z, r)
+        c_MC = get_surface('YCylinder', x0=x, z0=z, R=r)
 
         result = -c_MC & -y_max & +y_min
 
     # X-Cylinder
     elif abs(bounds.YLength - bounds.ZLength) <= 0.001 and abs(bounds.YLength - bounds.XLength) > 0.001:
 
-        x = clndr.Placement.Base.x
         y = clndr.Placement.Base.y
+        z = clndr.Placement.Base.z
         r = bounds.YLength / 2
 
-        x_min = openmc.XPlane(x0=bounds.XMin, boundary_type='reflective')
-        x_max = openmc.XPlane(x0=bounds.XMax, boundary_type='reflective')
+        x_min = get_surface('XPlane', x0=bounds.XMin, boundary_type='reflective')
+        x_max = get_surface('XPlane', x0=bounds.XMax, boundary_type='reflective')
 
-        c_MC = openmc.ZCylinder(None, 'transmission', x, y, r)
+        c_MC = get_surface('XCylinder', y0=y, z0=z, R=r)
 
         result = -c_MC & -x_max & +x_min
     # Some XYZ cylinder with height = diameter
     else:
         #TODO
-        print("Unexpected Cylinder Type :( \n")
-        return
+        # recorded by the registry, so the dropped object shows up in conversion_report()
+        raise NotImplementedError("cylinder axis not recognized (tilted, or height equal to diameter)")
 
     return result
 
 
+@primitives.register('Part::Sphere')
 def convert_sphere(sph):
     """
     Converts an arbitrary FreeCAD sphere into an OpenMC circle
     :param sph:
-    :return: openmc.Sphere
+    :return: sphere half space
     """
 
     R = sph.Length / (2 * math.pi)
@@ -184,30 +247,62 @@ def convert_sphere(sph):
     y_shift = bounds.YMin + bounds.YMax
     z_shift = bounds.ZMin + bounds.ZMax
 
-    return openmc.Sphere(None,'transmission', x_shift, y_shift, z_shift, R)
+    return -get_surface('Sphere', x0=x_shift, y0=y_shift, z0=z_shift, R=R)
+
+
+def subtract_region(outer, inner):
+    """
+    Returns outer minus inner.
+
+    If inner is an intersection of halfspaces all but one of which also bound outer
+    (e.g. two coaxial cylinders between the same z-planes), only the remaining halfspace
+    has to be flipped: the annulus becomes +inner_cyl & -outer_cyl & +z_min & -z_max
+    instead of -outer_cyl -z_max +z_min ~(-inner_cyl -z_max +z_min).
+    :param outer, inner: geometryir regions
+    :return: geometryir region
+    """
+    outer_hs = outer.halfspaces()
+    inner_hs = inner.halfspaces()
+
+    if outer_hs is not None and inner_hs is not None:
+        rest = [h for h in inner_hs if h not in outer_hs]
+        if len(rest) == 1:
+            # flip the side of the one halfspace that is not shared
+            return outer & geometryir.Region([rest[0] ^ 1])
+
+    # A \ B = A \cap B^c
+    return outer & ~inner
+
+
+@operations.register('Part::Cut')
+def convert_cut(root, regions):
+    # For now we assume that right child is being subtracted FROM left child
+    return subtract_region(regions[0], regions[1])
+
 
+@operations.register('Part::Fuse', 'Part::MultiFuse')
+def convert_fusion(root, regions):
+    return reduce(lambda a, b: a | b, regions)
 
-def convert_object(root):
+
+@operations.register('Part::Common', 'Part::MultiCommon')
+def convert_common(root, regions):
+    return reduce(lambda a, b: a & b, regions)
+
+
+def convert_object(root, errors=None):
     """
     Converts Elementary Objects from FreeCAD to OpenMc
     :param root: FreeCAD Object
+    :param errors: list collecting the conversion errors; primitives.errors if None
     :return: OpenMC Object
     """
 
     print("convert_object:") if DEBUG else None
     print(f"    root.Name = {root.Name}") if DEBUG else None
 
-    if "Box" in root.Name:
-        obj = convert_box(root)
-    elif "Sphere" in root.Name:
-        obj = convert_sphere(root)
-    elif "Cylinder" in root.Name:
-        obj = convert_cylinder(root)
-    else:
-        print("Undefined object (root). Error 'hhx@)d*43<'")
-        input()
-
-    return obj
+    # None for unsupported types, the error is collected in errors (primitives.errors)
+    return primitives.convert(root, errors=errors)
 
 
 ######################################################
@@ -237,30 +332,104 @@ def combine_object(root, left, right):
 
     :param root: extract operation to perform
     :param left, right: parameters for the operation to be performed
-    :return: combined OpenMC object
+    :return: combined OpenMC object (None if the operation is unsupported)
+    """
+    return operations.convert(root, [left, right])
+
+
+def shape_children(root):
     """
-    combined = None
+    Returns the sub-objects of root that have a Shape attribute, i.e. the operands of
+    a boolean feature (left child first).
+    :param root: FreeCAD object
+    :return: list of FreeCAD objects
+    """
+    # We do not need an extra copy for children because OutList is already a copy.
+    if hasattr(root, 'Group') and root.TypeId != 'App::Part':
+        # fcc_prn(o.Label)
+        children = root.Group[2].Group
+    else:
+        children = dependencyindex.index_of(root).children(root)
 
-    if "Cut" in root.name:
-        # REMARK: Do we even need a cut?
+    left_and_right = []
 
-        # TODO: What object cuts what?
-        # For now we assume that right child is being subtracted FROM left child
+    print("for child in children:") if DEBUG else None
+    for child in children:
+        print(f"    child.Name: {child.Name}") if DEBUG else None
+
+        if hasattr(child, 'Shape'):
+            print(f"    child.Shape: {child.Shape}") if DEBUG else None
+            left_and_right.append(child)
+
+    if DEBUG:
+        print(f"    len(left_and_right) = {len(left_and_right)}")
+
+    return left_and_right
+
+
+def convert_node(root, converted, errors=None):
+    """
+    Converts root once its shape children are converted.
+    :param root: FreeCAD object
+    :param converted: OpenMC objects of shape_children(root), in the same order
+    :param errors: list collecting the conversion errors; the registries' errors if None
+    :return: OpenMC object, None if root or one of its children could not be converted
+    """
+    if any(c is None for c in converted):
+        # the failing descendant is already in the error report
+        return None
 
-        # A \ B = A \cap B^c
-        combined = left & ~right
-    elif "Fusion" in root.name:
-        combined = left | right
-    elif "Common" in root.name:
-        combined = left & right
+    if len(converted) == 0:
+        # No Children
+        return convert_object(root, errors)
+    elif root.TypeId in operations:
+        # Boolean of two (Cut) or more (MultiFuse, MultiCommon) children
+        return operations.convert(root, converted, errors=errors)
+    elif len(converted) == 1:
+        # Only left child exists (e.g. a Refine or a Body wrapping its Tip)
+        return converted[0]
     else:
-        print("Undefined Combination. Error '3#@jkLo^' ")
-        input()
+        operations.error(root, f"{len(converted)} shape children but no operation registered", errors)
+        return None
+
 
-    return combined
+def conversion_report(errors=None):
+    """
+    :param errors: list of ConversionErrors of one run, e.g. ScriptModel.errors
+    :return: objects that could not be converted (in errors, or else since the last
+             clear_conversion_errors())
+    """
+    if errors is not None:
+        return converterregistry.report('OpenMC conversion', errors)
+    return "\n".join(r for r in (primitives.report(), operations.report()) if r)
 
 
-def object_to_OpenMC(root):
+def clear_conversion_errors():
+    primitives.clear()
+    operations.clear()
+
+
+def cached_convert(root, cache, keys, convert):
+    """
+    Looks root's sub-tree up in the conversion cache and only converts it on a miss.
+    :param cache: conversioncache.ConversionCache
+    :param keys: dict obj.Name -> cache key, shared by one run
+    :param convert: convert() -> region of root
+    :return: geometryir region
+    """
+    key = conversioncache.subtree_key(root, shape_children, 'openmc', keys)
+    data = cache.get(key)
+    if data is not None:
+        print(f"    cache hit: {root.Name}") if DEBUG else None
+        return surfaces.load(geometryir.from_data(data))
+
+    region = convert()
+    if region is not None:
+        cache.put(key, geometryir.to_data(surfaces.export(region)))
+    return region
+
+
+def object_to_OpenMC(root, cache=None, keys=None, errors=None):
     """
     Recursively get all subobjects
 
@@ -271,61 +440,89 @@ def object_to_OpenMC(root):
 
     Remark: This assumes that each shape is made up of two sub_shapes at most.
     e.g a cut/union/intersection can be made up of at most two sub_shapes
+
+    :param cache: optional conversioncache.ConversionCache; sub-trees found in it are
+                  not converted again
+    :param keys: cache keys computed so far (dict obj.Name -> key)
+    :param errors: list collecting the conversion errors; the registries' errors if None
     """
     # TODOLater: Implement version that takes in FreeCAD objects made up of many sub_objects
-    combined = None
-
-    # We do not need an extra copy for children because OutList is already a copy.
-    if hasattr(root, 'Group') and root.TypeId != 'App::Part':
-        # fcc_prn(o.Label)
-        children = root.Group[2].Group
-    else:
-        children = root.OutList
-
-    left_and_right = []
-
 
     print("object_to_OpenMC:") if DEBUG else None
     print(f"    root.Name = {root.Name}") if DEBUG else None
 
-    # Extract left and Right Child
+    # 'Modified Post Order Traversal'
+    def convert():
+        left_and_right = shape_children(root)
+        return convert_node(root, [object_to_OpenMC(child, cache, keys, errors) for child in left_and_right],
+                            errors)
 
-    print("for child in children:") if DEBUG else None
-    for child in children:
-        print(f"    child.Name: {child.Name}") if DEBUG else None
+    if cache is None:
+        return convert()
+    return cached_convert(root, cache, {} if keys is None else keys, convert)
 
-        if hasattr(child, 'Shape'):
-            print(f"    child.Shape: {child.Shape}") if DEBUG else None
-            left_and_right.append(child)
 
-    if DEBUG:
-        print(f"    len(left_and_right) = {len(left_and_right)}")
+def symmetry_wedge(sym):
+    """
+    :param sym: symmetry.Symmetry of order 4 or 8
+    :return: region of the reduced sector, bounded by reflective planes through the center
+    """
+    cx, cy = sym.center
+    wedge = +get_surface('XPlane', x0=cx, boundary_type='reflective') & \
+            +get_surface('YPlane', y0=cy, boundary_type='reflective')
+    if sym.order == 8:
+        # x - y >= cx - cy, i.e. below the diagonal
+        wedge &= +get_surface('Plane', A=1.0, B=-1.0, C=0.0, D=cx - cy, boundary_type='reflective')
+    return wedge
 
-    # 'Modified Post Order Traversal'
-    if len(left_and_right) == 2:
-        # If both left and right child exist
-        left = object_to_OpenMC(left_and_right[0])
-        right = object_to_OpenMC(left_and_right[1])
-
-        combined = combine_object(root, left, right)
-    elif len(left_and_right) == 1:
-        # Only left child exists
-        combined = object_to_OpenMC(left_and_right[0])
-    elif len(left_and_right) == 0:
-        # No Children
-        combined = convert_object(root)
-    else:
-        print("undefined behavior at 'k37%3s_' ")
-        input()
 
-    return combined
+def outside_wedge(bounds, sym, tol=1e-6):
+    """
+    :return: True if the BoundBox bounds has no point inside the reduced sector of sym
+    """
+    cx, cy = sym.center
+    if bounds.XMax < cx + tol or bounds.YMax < cy + tol:
+        return True
+    # every point has y - cy > x - cx
+    return sym.order == 8 and bounds.YMin - cy > bounds.XMax - cx - tol
 
 
-def vis_objs_to_OpenMC(vis_objs=None):
+def reduce_to_symmetry(vis_objs_CAD, vis_objs_MC):
+    """
+    Detects 1/4 or 1/8 symmetry of the visible objects, drops the objects outside the
+    reduced sector and clips the others with reflective planes.
+    :return: vis_objs_CAD, vis_objs_MC, symmetry.Symmetry
+    """
+    boxes = [obj.Shape.BoundBox for obj in vis_objs_CAD]
+    if not boxes:
+        return vis_objs_CAD, vis_objs_MC, symmetry.NO_SYMMETRY
+    bounds = max(boxes, key=lambda b: b.XLength * b.YLength)   # the enclosing box
+    sym = symmetry.detect_symmetry(symmetry.primitives(vis_objs_CAD), bounds)
+    print(f"    symmetry: 1/{sym.order}") if DEBUG else None
+    if sym.order == 1:
+        return vis_objs_CAD, vis_objs_MC, sym
+
+    wedge = symmetry_wedge(sym)
+    kept_CAD, kept_MC = [], []
+    for obj, region, box in zip(vis_objs_CAD, vis_objs_MC, boxes):
+        if region is None or outside_wedge(box, sym):
+            continue
+        kept_CAD.append(obj)
+        kept_MC.append(region & wedge)
+    return kept_CAD, kept_MC, sym
+
+
+def vis_objs_to_OpenMC(vis_objs=None, executor=None, cache=None, errors=None):
     """
     Main function of the create_model that runs (1) and (2) from the algorithm defined at the top.
 
-    :return: vis_objs_CAD, vis_objs_MC
+    :param executor: optional concurrent.futures executor; if given, the objects are
+                     converted level by level with conversionscheduler.LevelScheduler
+                     (dependency order only, the GIL serializes the conversions)
+    :param cache: optional conversioncache.ConversionCache shared across runs
+    :param errors: list collecting the objects that could not be converted; if None the
+                   registries' errors are cleared and used (not safe with concurrent runs)
+    :return: vis_objs_CAD, vis_objs_MC (reduce_to_symmetry() keeps only the symmetry sector)
     """
 
     # (1) Query All Visible Objects in FreeCAD using select_all_visible_objects
@@ -338,125 +535,336 @@ def vis_objs_to_OpenMC(vis_objs=None):
 
     # (2) For each object, find out its previous dependencies, iterate through each object's
     #     dependency tree and perform operations in order.
-    vis_objs_MC = []
-    for obj in vis_objs_CAD:
-        mc_obj = object_to_OpenMC(obj)
-        vis_objs_MC.append(mc_obj)
+    if errors is None:
+        clear_conversion_errors()
+    keys = {}
+    if executor is not None:
+        def convert(root, converted):
+            return convert_node(root, converted, errors)
+        if cache is not None:
+            # every level is still converted, but hits skip the conversion of the node itself
+            def convert(root, converted):
+                return cached_convert(root, cache, keys, lambda: convert_node(root, converted, errors))
+
+        scheduler = LevelScheduler(shape_children, convert, executor)
+        results = scheduler.run(vis_objs_CAD)
+        print(scheduler.report()) if DEBUG else None
+        vis_objs_MC = [results[obj.Name] for obj in vis_objs_CAD]
+    else:
+        vis_objs_MC = []
+        for obj in vis_objs_CAD:
+            mc_obj = object_to_OpenMC(obj, cache, keys, errors)
+            vis_objs_MC.append(mc_obj)
 
-    return vis_objs_CAD, vis_objs_MC
+    if cache is not None:
+        print(f"conversion cache: {cache.stats()}") if DEBUG else None
 
+    report = conversion_report(errors)
+    if report:
+        print(report)
 
-def script():
-    """
-    Main function of the create_model that runs (3) from the algorithm defined at the top.
+    return vis_objs_CAD, vis_objs_MC
 
-    Remark: We assume materials are predefined, since we are only interested in replicating grometry.
-    :return: exports to XML the OpenMC representaion of the geometry
-    """
 
-    # Material Definitions
-    if True:
-        print("Defining Materials...")
-        uo2 = openmc.Material(1, "uo2")
+######################################################
+# ---------------- SHARDED EXPORT ------------------ #
+######################################################
 
-        mat = openmc.Material()
-        # Add nuclides to uo2
-        uo2.add_nuclide('U235', 0.03)
-        uo2.add_nuclide('U238', 0.97)
-        uo2.add_nuclide('O16', 2.0)
+GEOMETRY_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<geometry>\n"
+GEOMETRY_FOOTER = "</geometry>\n"
 
-        uo2.set_density('g/cm3', 10.0)
 
-        zirconium = openmc.Material(2, "zirconium")
-        zirconium.add_element('Zr', 1.0)
-        zirconium.set_density('g/cm3', 6.6)
+def universe_shard(slot, universe_id, cells, stride=100000):
+    """
+    Collects what the shard of one universe is written from, as plain data.
+    The surfaces and cells of the shard in slot s get the IDs s*stride+1, s*stride+2, ...,
+    so the IDs of a shard do not change when other shards are rebuilt, added or removed.
+    :param slot: slot of the shard (shardedexport.ShardSet.slot of its name)
+    :param universe_id: ID of the universe
+    :param cells: list of dicts with 'name', 'region' (geometryir.Region) and either
+                  'material' (ID or 'void') or 'fill' (universe ID)
+    :return: dict (picklable and JSON-serializable)
+    """
+    base = slot * stride
+    local = {}
+    entries = []
+    out = []
+    for n, cell in enumerate(cells, 1):
+        program = []
+        for t in cell['region'].program:
+            if t >= 0:
+                i = local.get(t // 2)
+                if i is None:
+                    i = local[t // 2] = len(entries)
+                    entries.append(surfaces[t // 2])
+                t = 2 * i + t % 2
+            program.append(t)
+        out.append({'id': base + n, 'name': cell.get('name', ''), 'material': cell.get('material'),
+                     'fill': cell.get('fill'), 'program': program})
+
+    if max(len(entries), len(out)) >= stride:
+        raise ValueError(f"Universe {universe_id} has more than {stride} cells or surfaces")
+    return {'base': base, 'universe': universe_id, 'cells': out,
+            'surfaces': [[kind, boundary, [list(c) for c in coeffs]] for kind, boundary, coeffs in entries]}
+
+
+def write_universe_shard(path, data):
+    """
+    Writes the <cell> and <surface> elements of a universe_shard() straight from the IR.
+    :return: None
+    """
+    base = data['base']
 
-        water = openmc.Material(3, "h2o")
-        water.add_nuclide('H1', 2.0)
-        water.add_nuclide('O16', 1.0)
-        water.set_density('g/cm3', 1.0)
+    def surface_id(i):
+        return base + i + 1
 
-        water.add_s_alpha_beta('c_H_in_H2O')
+    with open(path, 'w', encoding='utf-8') as f:
+        for cell in data['cells']:
+            # attributes in the (alphabetical) order openmc writes them
+            fill = f'fill="{cell["fill"]}" ' if cell['fill'] is not None else ''
+            material = cell['material'] if cell['material'] is not None else 'void'
+            material = f'material="{material}" ' if cell['fill'] is None else ''
+            region = geometryir.region_text(cell['program'], surface_id)
+            f.write(f'  <cell {fill}id="{cell["id"]}" {material}name={quoteattr(cell["name"])} '
+                    f'region="{region}" universe="{data["universe"]}" />\n')
+        for i, (kind, boundary, coeffs) in enumerate(data['surfaces']):
+            f.write(geometryir.surface_xml(surface_id(i), (kind, boundary, coeffs)))
 
-        mats = openmc.Materials([uo2, zirconium, water])
 
-        mats = openmc.Materials()
-        mats.append(uo2)
-        mats += [zirconium, water]
+def lattice_shard(lattice_id, name, lattice):
+    """
+    Collects what the shard of one rectangular lattice is written from, as plain data.
+    A lattice only refers to universes by ID, so it has no surfaces or cells of its own.
+    :param lattice_id: ID of the lattice
+    :param name: name of the lattice
+    :param lattice: dict with 'pitch' (x, y), 'lower_left' (x, y), 'universes' (rows of
+                    universe IDs, top row first as in geometry.xml) and optionally 'outer'
+                    (universe ID outside the lattice)
+    :return: dict (picklable and JSON-serializable)
+    """
+    rows = [list(row) for row in lattice['universes']]
+    if any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError(f"Lattice {lattice_id} has rows of different lengths")
+    return {'id': lattice_id, 'name': name, 'pitch': [float(p) for p in lattice['pitch']],
+            'lower_left': [float(v) for v in lattice['lower_left']],
+            'outer': lattice.get('outer'), 'universes': rows}
 
-        mats.export_to_xml()
 
-        ## Element Expansion
+def write_lattice_shard(path, data):
+    """
+    Writes the <lattice> element of a lattice_shard()
+    :return: None
+    """
+    def floats(values):
+        return " ".join(repr(v) for v in values)
+
+    rows = data['universes']
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'  <lattice id="{data["id"]}" name={quoteattr(data["name"])}>\n')
+        f.write(f'    <pitch>{floats(data["pitch"])}</pitch>\n')
+        if data['outer'] is not None:
+            f.write(f'    <outer>{data["outer"]}</outer>\n')
+        f.write(f'    <dimension>{len(rows[0]) if rows else 0} {len(rows)}</dimension>\n')
+        f.write(f'    <lower_left>{floats(data["lower_left"])}</lower_left>\n')
+        f.write('    <universes>\n')
+        for row in rows:
+            f.write(" ".join(str(u) for u in row) + "\n")
+        f.write('    </universes>\n')
+        f.write('  </lattice>\n')
+
+
+def export_sharded(universes, directory='geometry_shards', out='geometry.xml', executor=None,
+                   stride=100000, lattices=()):
+    """
+    Writes every universe and lattice to its own shard (only if it changed since the last
+    export) and concatenates the shards into out.
+    :param universes: list of (name, universe_id, cells), cells as in universe_shard
+    :param directory: shard directory (see shardedexport.ShardSet)
+    :param executor: concurrent.futures executor for the shard writers
+    :param lattices: list of (name, lattice_id, lattice), lattice as in lattice_shard; the
+                     names share one namespace with the universe names
+    :return: names of the shards that were rewritten
+    """
+    shards = shardedexport.ShardSet(directory, GEOMETRY_HEADER, GEOMETRY_FOOTER)
+    jobs = []
+    for name, universe_id, cells in universes:
+        # the IDs of a universe follow its name, not its position in the list
+        data = universe_shard(shards.slot(name), universe_id, cells, stride)
+        jobs.append((name, shardedexport.content_key(data), write_universe_shard, (data,)))
+    for name, lattice_id, lattice in lattices:
+        data = lattice_shard(lattice_id, name, lattice)
+        jobs.append((name, shardedexport.content_key(data), write_lattice_shard, (data,)))
+
+    written = shards.write(jobs, executor)
+    shards.merge(out)
+    print(f"export_sharded: rewrote {len(written)} of {len(jobs)} shards") if DEBUG else None
+    return written
+
+
+def create_material(material_id, name, definition):
+    """
+    :param material_id: ID of the material
+    :param name: name of the material
+    :param definition: dict with 'density' and optionally 'nuclides', 'elements' and 'sab'
+                       (see materialrules.py)
+    :return: openmc.Material
+    """
+    material = openmc.Material(material_id, name)
+    for nuclide in definition.get('nuclides', ()):
+        material.add_nuclide(*nuclide)
+    for element in definition.get('elements', ()):
+        material.add_element(*element)
+    for sab in definition.get('sab', ()):
+        material.add_s_alpha_beta(sab)
+    material.set_density(*definition['density'])
+    return material
+
 
-        water.remove_nuclide('O16')
-        water.add_element('O', 1.0)
+# openmc objects of one document built by build_model; the IDs are not compacted yet
+ScriptModel = namedtuple('ScriptModel', ['owner', 'materials', 'cells', 'universe', 'materializer',
+                                         'symmetry', 'errors'])
 
-        mats.export_to_xml()
 
-        ## Enrichment
+def build_model(ids, owner='script', rules=None, vis_objs=None, reduce_symmetry=False,
+                materials=None):
+    """
+    Builds the materials, cells and universe of the active document.
+
+    Only reserves ID blocks of owner from ids; nothing is renumbered or written, so any
+    number of documents can be built in parallel on one shared allocator. export_models()
+    then compacts and writes all of them once.
+    :param ids: idallocator.IDAllocator shared with other documents/workers
+    :param owner: key of this document's ID blocks in ids
+    :param rules: materialrules.MaterialRules or path of a JSON rule file assigning
+                  materials to Labels; the fuel/gap/clad/water pin cell rules if None
+    :param vis_objs: objects to convert; the visible objects of the active document if None
+    :param reduce_symmetry: if the model is 1/4 or 1/8 symmetric, only build that sector,
+                            bounded by reflective planes (see reduce_to_symmetry)
+    :param materials: dict material name -> definition (see materialrules.py); replaces
+                      equally named materials of the rule file. The materials are those of
+                      the rule file, or DEFAULT_MATERIALS (uo2, zirconium, h2o) if it
+                      defines none.
+    :return: ScriptModel; its symmetry is NO_SYMMETRY unless the model was reduced, its
+             errors are the objects of this build that could not be converted
+    """
+    if rules is None:
+        rules = MaterialRules.from_data(DEFAULT_RULES)
+    elif not isinstance(rules, MaterialRules):
+        rules = MaterialRules.load(rules)
+    material_ids = ids.block('material', owner)
+    cell_ids = ids.block('cell', owner)
+    materializer = geometryir.Materializer(surfaces, ids.block('surface', owner))
 
-        uo2_three = openmc.Material()
-        uo2_three.add_element('U', 1.0, enrichment=3.0)
-        uo2_three.add_element('O', 2.0)
-        uo2_three.set_density('g/cc', 10.0)
+    # Material Definitions
+    print("Defining Materials...")
+    definitions = dict(rules.materials or DEFAULT_MATERIALS)
+    definitions.update(check_materials(materials or {}))
+    materials = dict((name, create_material(material_ids.next(), name, definition))
+                     for name, definition in definitions.items())
 
-    # (3) Create OpenMC Geometry & Export to XML # TODO
+    # (3) Create OpenMC Geometry # TODO
     print("Running CAD2MC.py...")
 
-    vis_objs_CAD, vis_objs_MC = vis_objs_to_OpenMC()
+    if vis_objs is None:
+        vis_objs = select_all_visible_objects()
+    # errors of this build only, other documents may be converted at the same time
+    errors = []
+    vis_objs_CAD, vis_objs_MC = vis_objs_to_OpenMC(vis_objs, errors=errors)
+    sym = symmetry.NO_SYMMETRY
+    if reduce_symmetry:
+        vis_objs_CAD, vis_objs_MC, sym = reduce_to_symmetry(vis_objs_CAD, vis_objs_MC)
 
     # (If Materials are defined...)
     MATS_DEF = True
     if MATS_DEF:
+        assignments, unmatched = rules.assign(vis_objs_CAD)
+
         cells = []
+        for a in assignments:
+            if vis_objs_MC[a.index] is None:
+                continue    # not converted, see conversion_report()
+            if a.material is not None and a.material not in materials:
+                unmatched.append((a.index, a.obj))
+                print(f"Unknown material '{a.material}' for {a.obj.Label}")
+                continue
+            cell = openmc.Cell(cell_ids.next(), a.cell)
+            cell.fill = materials.get(a.material)
+            cell.region = materialize(vis_objs_MC[a.index], materializer)
+            cells.append(cell)
 
-        fuel_region = None
-        gap_region = None
-        clad_region = None
-        water_region = None
-
-        num_objs = len(vis_objs_CAD)
-        for i in range(1, num_objs+1):
-            if 'fuel' in vis_objs_CAD[i].Label:
-                fuel_region = vis_objs_MC[i]
-            elif 'gap' in vis_objs_CAD[i].Label:
-                gap_region = vis_objs_MC[i]
-            elif 'clad' in vis_objs_CAD[i].Label:
-                clad_region = vis_objs_MC[i]
-            elif 'water' in vis_objs_CAD[i]:
-                water_region = vis_objs_MC[i]
-            else:
-                print("Unrecognized region. Error: 'ajd#*zz/x'")
-                input()
-
-        fuel = openmc.Cell(1, 'fuel')
-        fuel.fill = uo2
-        fuel.region = fuel_region
-
-        gap = openmc.Cell(2, 'air gap')
-        gap.region = gap_region
-
-        clad = openmc.Cell(3, 'clad')
-        clad.fill = zirconium
-        clad.region = clad_region
-
-        moderator = openmc.Cell(4, 'moderator')
-        moderator.fill = water
-        moderator.region = water_region
+        if unmatched:
+            print(rules.report(sorted(unmatched, key=lambda u: u[0])))
 
     # (If Materials are not defined, assume cells are not filled with anything...)
     else:
         cells = []
 
-        num_objs = len(vis_objs_CAD)
-        for i in range(1, num_objs+1):
-            cell = openmc.Cell(i, vis_objs_CAD[i].Label)
-            cell.region = vis_objs_MC[i]
+        for obj_CAD, obj_MC in zip(vis_objs_CAD, vis_objs_MC):
+            if obj_MC is None:
+                continue
+            cell = openmc.Cell(cell_ids.next(), obj_CAD.Label)
+            cell.region = materialize(obj_MC, materializer)
             cells.append(cell)
 
-    root = openmc.Universe(cells=cells)
+    root = openmc.Universe(universe_id=ids.block('universe', owner).next(), cells=cells)
+    return ScriptModel(owner, list(materials.values()), cells, root, materializer, sym, errors)
+
+
+def export_models(models, ids, root=None, directory='.'):
+    """
+    Merge step, run once after all build_model() calls have returned: compacts the IDs of
+    all owners, renumbers the objects of every model and writes materials.xml and
+    geometry.xml. The IDs only depend on the owners and on what each owner built, not on
+    the order in which the workers ran.
+    :param models: list of ScriptModel built on ids
+    :param ids: the shared idallocator.IDAllocator
+    :param root: root openmc.Universe, its ID and the IDs of its cells drawn from ids; the
+                 universe of the only model if None
+    :param directory: where the XML files are written
+    :return: None
+    """
+    if root is None:
+        if len(models) != 1:
+            raise ValueError("export_models needs a root universe for more than one model")
+        root = models[0].universe
+
+    # renumber contiguously; every object is renumbered exactly once
+    compact = ids.compact()
+    universes = [m.universe for m in models]
+    cells = [c for m in models for c in m.cells]
+    if all(u is not root for u in universes):
+        # the root's own cells (e.g. the ones filled with the models) are renumbered too
+        universes.append(root)
+        cells.extend(root.cells.values())
+    IDAllocator.apply([s for m in models for s in m.materializer.surfaces.values()],
+                      compact.get('surface', {}))
+    IDAllocator.apply(cells, compact.get('cell', {}))
+    IDAllocator.apply([mat for m in models for mat in m.materials], compact.get('material', {}))
+    IDAllocator.apply(universes, compact.get('universe', {}))
+
+    mats = openmc.Materials([mat for m in models for mat in m.materials])
+    mats.export_to_xml(os.path.join(directory, 'materials.xml'))
+
     geom = openmc.Geometry(root)
-    geom.export_to_xml()
+    geom.export_to_xml(os.path.join(directory, 'geometry.xml'))
+
+
+def script(ids=None, owner='script', rules=None, vis_objs=None, reduce_symmetry=False,
+           materials=None):
+    """
+    Main function of the create_model that runs (3) from the algorithm defined at the top.
+
+    Remark: We assume materials are predefined, since we are only interested in replicating grometry.
+    Remark: For several documents or workers call build_model() for each (they may share
+            one allocator and run in parallel) and export_models() once after all of them.
+    :param ids: idallocator.IDAllocator; a new one if None
+    :param owner: key of this document's ID blocks in ids
+    :param rules, vis_objs, reduce_symmetry, materials: see build_model
+    :return: exports to XML the OpenMC representaion of the geometry
+    """
+    ids = IDAllocator() if ids is None else ids
+    model = build_model(ids, owner, rules, vis_objs, reduce_symmetry, materials)
+    export_models([model], ids)
 
     return 0
 
@@ -32,16 +32,28 @@ import os, sys
 DEBUG = True
 #FREECADPATH = '/Users/faryab/anaconda3/envs/UROPTesting/lib' #
 #sys.path.append(FREECADPATH) #
-import FreeCAD #
-import FreeCADGui #
-import Part  #FreeCAD's Part Workbench #
 import math
-from FreeCAD import Base #
+from lazyimport import LazyModule
+from converterregistry import ConverterRegistry
 from mpactgeometry import *  # Contains the class heirarchy for the geometry in python
-from lxml import etree # xml library
+import dependencyindex
+import conversioncache
+import symmetry
+import shardedexport
+
+# the backends are imported on first use (see lazyimport.py)
+FreeCAD = LazyModule('FreeCAD') #
+FreeCADGui = LazyModule('FreeCADGui') #
+Part = LazyModule('Part')  #FreeCAD's Part Workbench #
+Base = LazyModule('FreeCAD.Base', lambda: FreeCAD.Base) #
+etree = LazyModule('lxml.etree') # xml library
 
 # Remark: If importing into FreeCAD console, no need to have imports marked with #
 
+# TypeId -> converter (see converterregistry.py)
+areas = ConverterRegistry('MPACT areas')              # convert(obj) -> (area, obj)
+geometries = ConverterRegistry('MPACT geometries')    # convert(obj) -> Geom
+
 ######################################################
 # --------------- FreeCAD SCRIPTING ---------------- #
 ######################################################
@@ -72,9 +84,9 @@ def has_outlist(obj):
     :return: True or False
     """
     if hasattr(obj, 'Shape'):
-        if hasattr(obj, 'OutList'):
-            if len(obj.OutList) > 0:
-                return True
+        index = dependencyindex.index_of(obj)
+        if obj in index and index.child_count(obj) > 0:
+            return True
 
     return False
 
@@ -85,14 +97,14 @@ def find_area__obj(obj):
     :param obj:
     :return: area
     """
-    max_area = 0
+    max_area, max_obj = 0, None
     # compound object
     if has_outlist(obj):
-        sub_objs = obj.OutList
+        sub_objs = dependencyindex.index_of(obj).children(obj)
 
         for sub_obj in sub_objs:
             sub_obj_area, sub_obj = find_area__obj(sub_obj)
-            if sub_obj_area > max_area:
+            if sub_obj is not None and sub_obj_area > max_area:
                 max_area = sub_obj_area
                 max_obj = sub_obj
     else:
@@ -105,89 +117,603 @@ def find_area_elementary_obj(obj):
     """
     Returns the areas of elementary FreeCAD objects
     :param obj:
-    :return: area
+    :return: area, obj; (0, None) if obj is not supported for MPACT (see areas.report())
     """
     print("find_diameter_elementary_obj:") if DEBUG else None
 
-    if "Box" in obj.Name:
-        bounds = obj.Shape.BoundBox
-        return bounds.XLength * bounds.YLength, obj
-    elif "Sphere" in obj.Name:
-        print("Error at 'find_area_elementary_obj'. Object not supported for MPACT. ")
-        raise NotImplementedError
-    elif "Cylinder" in obj.Name:
-        bounds = obj.Shape.BoundBox
-
-        # Z-Cylinder
-        if abs(bounds.XLength - bounds.YLength) <= 0.001 and abs(bounds.XLength - bounds.ZLength) > 0.001:
-            area = math.pi * ((bounds.XLength/2)**2)
-            return area, obj
-        # Some other cylinder
-        else:
-            print("Error at 'find_area_elementary_obj'. Object not supported for MPACT. ")
-            raise NotImplementedError
-    else:
-        print("Error at 'find_area_elementary_obj'. Object not supported for MPACT. ")
-        raise NotImplementedError
+    result = areas.convert(obj)
+    return (0, None) if result is None else result
+
+
+@areas.register('Part::Box')
+def box_area(obj):
+    bounds = obj.Shape.BoundBox
+    return bounds.XLength * bounds.YLength, obj
+
 
+@areas.register('Part::Cylinder')
+def cylinder_area(obj):
+    bounds = obj.Shape.BoundBox
 
-def create_model(vis_objs):
+    # Z-Cylinder
+    if abs(bounds.XLength - bounds.YLength) <= 0.001 and abs(bounds.XLength - bounds.ZLength) > 0.001:
+        area = math.pi * ((bounds.XLength/2)**2)
+        return area, obj
+    # Some other cylinder
+    raise NotImplementedError("only cylinders along the z-axis are supported for MPACT")
+
+
+@geometries.register('Part::Box')
+def box_geom(obj):
+    bounds = obj.Shape.BoundBox
+    return BoxGeom(cornerpt=(bounds.XMin, bounds.YMin), extent=[bounds.XLength, bounds.YLength],
+                   meshparams=MeshParams())
+
+
+@geometries.register('Part::Cylinder')
+def circle_geom(obj):
+    radius = obj.Radius
+    # CAD angles are in degrees, MPACT angles in radians
+    stop_angle = math.radians(getattr(obj.Angle, 'Value', obj.Angle))
+    centroid = (obj.Placement.Base[0], obj.Placement.Base[1])
+    return CircleGeom(r=radius, startangl=0, stopangl=stop_angle, centroid=centroid, meshparams=MeshParams())
+
+
+def level_geom(obj, cache=None, keys=None):
     """
-    Main function of the create_model that runs (3) from the algorithm defined at the top.
+    Returns the level geometry of obj, from the conversion cache if it is there.
+    :param obj: FreeCAD object
+    :param cache: optional conversioncache.ConversionCache
+    :param keys: cache keys computed so far (dict obj.Name -> key)
+    :return: Geom, None if obj is not supported (see geometries.report())
+    """
+    if cache is None:
+        return geometries.convert(obj)
 
-    Remark: We assume materials are predefined, since we are only interested in replicating geometry.
-    :return: exports to XML the OpenMC representaion of the geometry
+    key = conversioncache.subtree_key(obj, dependencyindex.index_of(obj).children,
+                                      'mpact-geom', keys)
+    data = cache.get(key)
+    if data is not None:
+        return geom_from_data(data)
+
+    geom = geometries.convert(obj)
+    if geom is not None:
+        cache.put(key, geom_to_data(geom))
+    return geom
+
+
+def reduce_geom(geom, sym, tol=1e-6):
+    """
+    Restricts a level geometry to the sector of sym.
+    :param geom: Geom
+    :param sym: symmetry.Symmetry
+    :return: the reduced Geom, None if it lies outside the sector
     """
+    if sym.order == 1:
+        return geom
+    if isinstance(geom, CircleGeom):
+        cx, cy = geom.Centroid
+        if abs(cx - sym.center[0]) <= tol and abs(cy - sym.center[1]) <= tol:
+            # centered circle: keep the part of its arc inside the sector
+            geom.StartAngle = max(geom.StartAngle, sym.start)
+            geom.StopAngle = min(geom.StopAngle, sym.stop)
+            return geom if geom.StopAngle > geom.StartAngle else None
+        if not symmetry.in_sector(cx, cy, sym, tol):
+            return None
+        half = plane_half(cx - sym.center[0], cy - sym.center[1], sym, tol)
+        if half is not None and geom.StopAngle - geom.StartAngle >= 2 * math.pi - tol:
+            # centered on a reflective plane: only the half inside the sector is kept
+            geom.StartAngle, geom.StopAngle = half
+        return geom
+    if isinstance(geom, BoxGeom):
+        if geom.Extent is None:
+            return geom if symmetry.in_sector(geom.CornerPoint[0], geom.CornerPoint[1], sym, tol) else None
+        return clip_box(geom, sym, tol)
+    return geom
+
+
+def plane_half(dx, dy, sym, tol=1e-6):
+    """
+    :param dx, dy: circle center relative to the symmetry center (inside the sector)
+    :return: (start, stop) angles of the half of a circle centered on a reflective plane
+             of sym that lies inside the sector, None if the center is on no plane
+    """
+    if abs(dy) <= tol and dx > tol:
+        return 0.0, math.pi                         # on y = cy, keep y >= cy
+    if sym.order == 4 and abs(dx) <= tol and dy > tol:
+        return -math.pi / 2, math.pi / 2            # on x = cx, keep x >= cx
+    if sym.order == 8 and abs(dx - dy) <= tol and dx > tol:
+        return -3 * math.pi / 4, math.pi / 4        # on the diagonal, keep y <= x
+    return None
 
-    print("Running CAD2MPACT.py ...")
 
-    # sort using python magic
-    areas_objs = [find_area__obj(obj) for obj in vis_objs]
+def clip_box(geom, sym, tol=1e-6):
+    """
+    Clips an axis aligned BoxGeom to the quadrant of the sector of sym. For 1/8 symmetry
+    the box keeps the quadrant part, the diagonal reflective plane bounds it.
+    :return: the clipped BoxGeom, None if the box does not overlap the sector
+    """
+    cx, cy = sym.center
+    x0, y0 = geom.CornerPoint
+    x1, y1 = x0 + geom.Extent[0], y0 + geom.Extent[1]
+    x0, y0 = max(x0, cx), max(y0, cy)
+    if x1 - x0 <= tol or y1 - y0 <= tol:
+        return None
+    # the corner closest to the sector is (x1, y0); below the diagonal if they overlap
+    if sym.order == 8 and y0 - cy >= x1 - cx - tol:
+        return None
+    geom.CornerPoint = (x0, y0)
+    geom.Extent = [x1 - x0, y1 - y0]
+    return geom
+
+
+def sort_level_objs(vis_objs):
+    """
+    :return: (boundary, level objects); the boundary is the object with the largest area,
+             the level objects follow by decreasing area
+    """
+    # sort using python magic; unsupported objects are dropped and reported by the registries
+    areas_objs = [a for a in (find_area__obj(obj) for obj in vis_objs) if a[1] is not None]
     areas_objs.sort(key=lambda tup: tup[0], reverse=True)
     sorted_objs = [obj[1] for obj in areas_objs]
 
     boundary = sorted_objs[0] # 1st element in sorted objs is the biggest
     sorted_objs.pop(0) # remove bound box, since it's not a real level
+    return boundary, sorted_objs
+
+
+def create_model(vis_objs, cache=None, reduce_symmetry=False):
+    """
+    Main function of the create_model that runs (3) from the algorithm defined at the top.
+
+    Remark: We assume materials are predefined, since we are only interested in replicating geometry.
+    :param cache: optional conversioncache.ConversionCache shared across runs
+    :param reduce_symmetry: if the model is 1/4 or 1/8 symmetric, only emit that sector
+                            (see symmetry.py); the mesh type records the symmetry
+    :return: exports to XML the OpenMC representaion of the geometry
+    """
+
+    print("Running CAD2MPACT.py ...")
+    areas.clear()
+    geometries.clear()
+
+    boundary, sorted_objs = sort_level_objs(vis_objs)
     bounds = boundary.Shape.BoundBox
 
+    sym = symmetry.NO_SYMMETRY
+    if reduce_symmetry:
+        sym = symmetry.detect_symmetry(symmetry.primitives(sorted_objs), bounds)
+        print(f"    symmetry: 1/{sym.order}") if DEBUG else None
+
     levels = []
+    keys = {}
     # Create Class Hierarchy using the sorted objects.
-    for i in range(start=1, stop=len(sorted_objs)+1):
-        lvl = Level(ngeom=1, name=i)
-        if "Box" in sorted_objs[i].Name:
-            geom = BoxGeom() # TODO
-        elif "Cylinder" in sorted_objs[i].Name:
-            radius = sorted_objs[i].Radius
-            stop_angle = sorted_objs[i].Angle
-            centroid = (sorted_objs[i].Placement.Base[0], sorted_objs[i].Placement.Base[1])
-            geom = CircleGeom(r=radius, startangl=0, stopangl=stop_angle, centroid=centroid, meshparams=MeshParams())
-        else:
-            print("Error at 'create_model(vis_objs)'. Object not supported for MPACT. ")
-            raise NotImplementedError
-
+    for obj in sorted_objs:
+        geom = level_geom(obj, cache, keys)
+        if geom is None:
+            continue
+        geom = reduce_geom(geom, sym)
+        if geom is None:
+            continue
+
+        lvl = Level(name=len(levels)+1)
         lvl.add_geom(geom)
         levels.append(lvl)
 
-    Model = GeneralMeshType(id=1, nlevels=len(vis_objs)-1, xpitch=bounds.XLength,
-                            ypitch=bounds.YLength, zpitch=bounds.ZLength, split=0, levels=levels)
+    report = "\n".join(r for r in (areas.report(), geometries.report()) if r)
+    if report:
+        print(report)
+
+    Model = GeneralMeshType(id=1, nlevels=len(levels), xpitch=bounds.XLength,
+                            ypitch=bounds.YLength, zpitch=bounds.ZLength, split=0, levels=levels,
+                            symmetry=sym.order, symmetryplanes=sym.mirrors)
 
     # Export Created Hierarchy to XML
 
     return Model
 
 
+def axial_planes(objs, bounds, dz=None, breakpoints=None, tol=1e-6):
+    """
+    Returns the z planes the model is sliced at.
+    :param objs: level objects
+    :param bounds: BoundBox of the boundary object
+    :param dz: largest slice height; intervals between breakpoints are cut into equal slices
+    :param breakpoints: z values to slice at; the bottoms and tops of all objects if None
+    :return: sorted list of z, from bounds.ZMin to bounds.ZMax
+    """
+    if breakpoints is None:
+        breakpoints = [z for obj in objs for z in (obj.Shape.BoundBox.ZMin, obj.Shape.BoundBox.ZMax)]
+    planes = []
+    for z in sorted([bounds.ZMin, bounds.ZMax] + [z for z in breakpoints if bounds.ZMin < z < bounds.ZMax]):
+        if not planes or z - planes[-1] > tol:
+            planes.append(z)
+
+    if dz is None:
+        return planes
+    out = [planes[0]]
+    for bottom, top in zip(planes, planes[1:]):
+        n = max(1, int(math.ceil((top - bottom) / dz - tol)))
+        out.extend(bottom + (top - bottom) * k / n for k in range(1, n + 1))
+    return out
+
+
+def create_axial_model(vis_objs, dz=None, breakpoints=None, cache=None, reduce_symmetry=False):
+    """
+    Slices the geometry axially and collapses identical consecutive slices.
+
+    Every slice gets the levels of the objects at the slice's mid height. Slices are
+    compared by GeneralMeshType.structure_key(); equal slices share one mesh type and
+    consecutive ones become one zone with a multiplier, so the model only grows with the
+    number of distinct axial zones. Each object is converted once, not once per slice.
+    :param dz: largest slice height (see axial_planes)
+    :param breakpoints: z values to slice at; the object bottoms and tops if None
+    :param cache: optional conversioncache.ConversionCache shared across runs
+    :param reduce_symmetry: emit only the symmetry sector of every slice (see create_model)
+    :return: AxialStack
+    """
+    print("Running CAD2MPACT.py (axial) ...")
+    areas.clear()
+    geometries.clear()
+
+    boundary, sorted_objs = sort_level_objs(vis_objs)
+    bounds = boundary.Shape.BoundBox
+    planes = axial_planes(sorted_objs, bounds, dz, breakpoints)
+
+    keys = {}
+    geoms = {}          # (obj.Name, symmetry) -> reduced Geom
+    symmetries = {}     # objects of a slice -> symmetry.Symmetry
+    mesh_types = {}     # structure_key -> GeneralMeshType
+    stack = AxialStack(z0=bounds.ZMin)
+
+    for bottom, top in zip(planes, planes[1:]):
+        mid = (bottom + top) / 2
+        objs = [obj for obj in sorted_objs if obj.Shape.BoundBox.ZMin <= mid <= obj.Shape.BoundBox.ZMax]
+
+        names = tuple(obj.Name for obj in objs)
+        sym = symmetries.get(names)
+        if sym is None:
+            sym = symmetry.NO_SYMMETRY
+            if reduce_symmetry:
+                sym = symmetry.detect_symmetry(symmetry.primitives(objs), bounds)
+            symmetries[names] = sym
+
+        levels = []
+        for obj in objs:
+            if (obj.Name, sym) not in geoms:
+                geom = level_geom(obj, cache, keys)
+                geoms[(obj.Name, sym)] = None if geom is None else reduce_geom(geom, sym)
+            geom = geoms[(obj.Name, sym)]
+            if geom is None:
+                continue
+            lvl = Level(name=len(levels)+1)
+            lvl.add_geom(geom)
+            levels.append(lvl)
+
+        model = GeneralMeshType(nlevels=len(levels), xpitch=bounds.XLength, ypitch=bounds.YLength,
+                                zpitch=top - bottom, split=0, levels=levels,
+                                symmetry=sym.order, symmetryplanes=sym.mirrors)
+        key = model.structure_key()
+        if key not in mesh_types:
+            model.ID = len(mesh_types) + 1
+            mesh_types[key] = model
+        stack.add(mesh_types[key])
+
+    report = "\n".join(r for r in (areas.report(), geometries.report()) if r)
+    if report:
+        print(report)
+    print(f"    {stack.NSlices} slices, {len(stack.Zones)} zones, "
+          f"{len(mesh_types)} distinct mesh types") if DEBUG else None
+    return stack
+
+
+def _xy(obj):
+    """
+    :return: (x, y) position of a level object: the axis of a cylinder, else the center
+    """
+    if obj.TypeId == 'Part::Cylinder':
+        return obj.Placement.Base[0], obj.Placement.Base[1]
+    center = obj.Shape.BoundBox.Center
+    return center[0], center[1]
+
+
+def _localize(geom, x0, y0):
+    """
+    Moves geom into the coordinates of a pin centered at (x0, y0)
+    """
+    if isinstance(geom, CircleGeom):
+        geom.Centroid = (geom.Centroid[0] - x0, geom.Centroid[1] - y0)
+    elif isinstance(geom, BoxGeom):
+        geom.CornerPoint = (geom.CornerPoint[0] - x0, geom.CornerPoint[1] - y0)
+    return geom
+
+
+def lattice_pitch(objs, bounds, tol=1e-6):
+    """
+    :return: the smallest spacing of the cylinder axes, the boundary width if there is
+             at most one column of pins
+    """
+    xs = sorted(set(round(_xy(obj)[0], 6) for obj in objs if obj.TypeId == 'Part::Cylinder'))
+    steps = [b - a for a, b in zip(xs, xs[1:]) if b - a > tol]
+    return min(steps) if steps else bounds.XLength
+
+
+def create_lattice_model(vis_objs, pitch=None, pins=None, cache=None):
+    """
+    Cuts an assembly into pin cells and emits each unique pin once.
+
+    The boundary (largest object) is divided into squares of the pin pitch. Every level
+    object belongs to the square its axis (or center) lies in and becomes a level of that
+    pin, in pin local coordinates. Equal pins get the same ID from the PinLibrary, so
+    the lattice only holds IDs.
+    :param pitch: pin pitch; inferred from the cylinder axes if None
+    :param pins: PinLibrary shared with other assemblies; a new one if None
+    :param cache: optional conversioncache.ConversionCache shared across runs
+    :return: (Lattice, PinLibrary)
+    """
+    print("Running CAD2MPACT.py (lattice) ...")
+    areas.clear()
+    geometries.clear()
+    pins = PinLibrary() if pins is None else pins
+
+    boundary, sorted_objs = sort_level_objs(vis_objs)
+    bounds = boundary.Shape.BoundBox
+    pitch = lattice_pitch(sorted_objs, bounds) if pitch is None else pitch
+    nx = max(1, int(round(bounds.XLength / pitch)))
+    ny = max(1, int(round(bounds.YLength / pitch)))
+
+    # objects per lattice position, still sorted by decreasing area
+    cells = {}
+    for obj in sorted_objs:
+        x, y = _xy(obj)
+        i = min(nx - 1, max(0, int((x - bounds.XMin) // pitch)))
+        j = min(ny - 1, max(0, int((y - bounds.YMin) // pitch)))
+        cells.setdefault((i, j), []).append(obj)
+
+    keys = {}
+    pin_map = []
+    for j in reversed(range(ny)):      # top row first
+        row = []
+        for i in range(nx):
+            x0 = bounds.XMin + (i + 0.5) * pitch
+            y0 = bounds.YMin + (j + 0.5) * pitch
+            levels = []
+            for obj in cells.get((i, j), []):
+                geom = level_geom(obj, cache, keys)
+                if geom is None:
+                    continue
+                lvl = Level(name=len(levels)+1)
+                lvl.add_geom(_localize(geom, x0, y0))
+                levels.append(lvl)
+            row.append(pins.add(GeneralMeshType(nlevels=len(levels), xpitch=pitch, ypitch=pitch,
+                                                zpitch=bounds.ZLength, split=0, levels=levels)))
+        pin_map.append(row)
+
+    report = "\n".join(r for r in (areas.report(), geometries.report()) if r)
+    if report:
+        print(report)
+
+    lattice = Lattice(pitch=pitch, pin_map=pin_map)
+    print(f"    {nx}x{ny} pins, {len(pins)} unique pin types") if DEBUG else None
+    return lattice, pins
+
+
+def create_core_model(assemblies, core_map, pitch=None, cache=None):
+    """
+    Builds a core from assembly documents.
+    :param assemblies: dict assembly name -> visible objects of the assembly
+    :param core_map: rows (top row first) of assembly names, None for empty positions
+    :param pitch: pin pitch of all assemblies; inferred per assembly if None
+    :return: Core; pins and assemblies are shared wherever they are equal
+    """
+    core = Core()
+    ids = {}
+    for name, vis_objs in assemblies.items():
+        lattice, _ = create_lattice_model(vis_objs, pitch, core.Pins, cache)
+        lattice.name = name
+        ids[name] = core.add_assembly(lattice)
+    core.Map = [[0 if name is None else ids[name] for name in row] for row in core_map]
+    return core
+
+
+XML_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n" \
+             "<?xml-stylesheet version=\"1.0\" type=\"text/xsl\" href=\"PL9.xsl\"?>\n"
+
+
+def _parameter(parent, name, type, value):
+    """
+    Appends <Parameter name= type= value=/> to parent
+    """
+    if isinstance(value, (list, tuple)):
+        fmt = str if type in ("Array(int)", "Array(string)") else lambda v: repr(float(v))
+        value = "{" + ",".join(fmt(v) for v in value) + "}"
+    elif isinstance(value, float):
+        value = repr(value)
+    return etree.SubElement(parent, "Parameter", name=name, type=type, value=str(value))
+
+
+def _parameter_list(parent, name):
+    return etree.SubElement(parent, "ParameterList", name=name)
+
+
+def geom_element(parent, geom):
+    """
+    Appends the ParameterList of a CircleGeom or BoxGeom (format of xmlTesting.xml)
+    """
+    node = _parameter_list(parent, geom.Name)
+    if isinstance(geom, CircleGeom):
+        _parameter(node, "Radius", "float", float(geom.Radius))
+        _parameter(node, "Centroid", "Array(double)", geom.Centroid)
+        _parameter(node, "StartingAngle", "float", float(geom.StartAngle))
+        _parameter(node, "StoppingAngle", "float", float(geom.StopAngle))
+    elif isinstance(geom, BoxGeom):
+        _parameter(node, "CornerPoint", "Array(double)", geom.CornerPoint)
+        _parameter(node, "Vector1", "Array(double)", geom.Vector1)
+        _parameter(node, "Vector2", "Array(double)", geom.Vector2)
+        if geom.Extent is not None:
+            _parameter(node, "Extent", "Array(double)", geom.Extent)
+    if geom.MeshParams is not None:
+        mesh = _parameter_list(node, "MeshParams")
+        for attr, value in sorted(vars(geom.MeshParams).items()):
+            _parameter(mesh, attr, "int", int(value))
+    return node
+
+
+def mesh_type_element(model, parent=None):
+    """
+    Builds the ParameterList of a GeneralMeshType
+    :param model: GeneralMeshType
+    :param parent: optional lxml element to append to
+    :return: lxml element
+    """
+    root = etree.Element("ParameterList", name=model.name) if parent is None else \
+        _parameter_list(parent, model.name)
+    _parameter(root, "ID", "int", model.ID)
+    _parameter(root, "NLevels", "int", len(model.Levels))
+    _parameter(root, "XPitch", "float", float(model.XPitch))
+    _parameter(root, "YPitch", "float", float(model.YPitch))
+    _parameter(root, "ZPitch", "float", float(model.ZPitch))
+    _parameter(root, "Split", "int", model.Split)
+    if model.Symmetry != 1:
+        _parameter(root, "Symmetry", "int", model.Symmetry)
+        # reflective boundary planes through the pin center ('x', 'y', 'diagonal')
+        _parameter(root, "ReflectivePlanes", "Array(string)", list(model.SymmetryPlanes))
+
+    for n, level in enumerate((model.Levels[k] for k in sorted(model.Levels)), 1):
+        lvl = _parameter_list(root, f"Level {n}")
+        _parameter(lvl, "nGeom", "int", len(level.geoms))
+        for m, geom in enumerate(level.geoms, 1):
+            geom_element(_parameter_list(lvl, f"Geom {m}"), geom)
+    return root
+
+
+def axial_stack_element(stack, parent=None):
+    """
+    Builds the ParameterList of an AxialStack: every distinct mesh type once, then the
+    zones as (mesh type ID, multiplier) from bottom to top
+    :param stack: AxialStack
+    :param parent: optional lxml element to append to
+    :return: lxml element
+    """
+    root = etree.Element("ParameterList", name="AxialStack") if parent is None else \
+        _parameter_list(parent, "AxialStack")
+    _parameter(root, "Z0", "float", float(stack.Z0))
+    _parameter(root, "NZones", "int", len(stack.Zones))
+    for mesh_type in stack.mesh_types():
+        mesh_type_element(mesh_type, root)
+    zones = _parameter_list(root, "Zones")
+    for n, (mesh_type, multiplier) in enumerate(stack.Zones, 1):
+        zone = _parameter_list(zones, f"Zone {n}")
+        _parameter(zone, "MeshType", "int", mesh_type.ID)
+        _parameter(zone, "Multiplier", "int", multiplier)
+    return root
+
+
+def lattice_element(lattice, parent=None):
+    """
+    Builds the ParameterList of a Lattice; the pin map is written as pin IDs, row by row
+    """
+    root = etree.Element("ParameterList", name=lattice.name) if parent is None else \
+        _parameter_list(parent, lattice.name)
+    _parameter(root, "ID", "int", lattice.ID)
+    _parameter(root, "NX", "int", lattice.NX)
+    _parameter(root, "NY", "int", lattice.NY)
+    _parameter(root, "Pitch", "float", float(lattice.Pitch))
+    _parameter(root, "PinMap", "Array(int)", [pin_id for row in lattice.Map for pin_id in row])
+    return root
+
+
+def core_element(core):
+    """
+    Builds the ParameterList of a Core (or of a single (Lattice, PinLibrary)): every
+    unique pin mesh type and assembly once, then the maps of IDs
+    """
+    if isinstance(core, tuple):
+        lattice, pins = core
+        core = Core(pins)
+        core.Map = [[core.add_assembly(lattice)]]
+    root = etree.Element("ParameterList", name=core.name)
+    _parameter(root, "NPinTypes", "int", len(core.Pins))
+    pins = _parameter_list(root, "Pins")
+    for mesh_type in core.Pins.MeshTypes:
+        mesh_type_element(mesh_type, pins)
+    assemblies = _parameter_list(root, "Assemblies")
+    for lattice in core.Assemblies:
+        lattice_element(lattice, assemblies)
+    _parameter(root, "NX", "int", len(core.Map[0]) if core.Map else 0)
+    _parameter(root, "NY", "int", len(core.Map))
+    _parameter(root, "CoreMap", "Array(int)", [a for row in core.Map for a in row])
+    return root
+
+
 def generateXML(model, filename=None):
     """
     Takes in a MPACT Class Heirarchical Model and generates XML based on its hierarchy
-    :param model:
+    :param model: GeneralMeshType, AxialStack, Core or (Lattice, PinLibrary)
     :return: saves 'filename.xml' file at a particular directory
     """
+    filename = "mpact.xml" if filename is None else filename
+    if isinstance(model, AxialStack):
+        element = axial_stack_element(model)
+    elif isinstance(model, (Core, tuple)):
+        element = core_element(model)
+    else:
+        element = mesh_type_element(model)
+    body = etree.tostring(element, pretty_print=True, encoding='unicode')
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(XML_HEADER)
+        f.write(body)
+
+
+def mesh_data(model):
+    """
+    :return: everything a mesh type shard is written from, as JSON-serializable data
+    """
+    return {'name': model.name, 'ID': model.ID, 'pitch': [model.XPitch, model.YPitch, model.ZPitch],
+            'Split': model.Split, 'Symmetry': model.Symmetry,
+            'levels': [[geom_to_data(g) for g in model.Levels[k].geoms] for k in sorted(model.Levels)]}
 
-    # TODO:
-    # Use lxml
+
+def lattice_data(lattice):
+    """
+    :return: everything a lattice shard is written from, as JSON-serializable data
+    """
+    return {'name': lattice.name, 'ID': lattice.ID, 'Pitch': lattice.Pitch, 'Map': lattice.Map}
 
 
-    raise NotImplementedError
+def write_mesh_shard(path, model):
+    """
+    Writes the ParameterList of one mesh type or Lattice as a shard body
+    """
+    element = lattice_element(model) if isinstance(model, Lattice) else mesh_type_element(model)
+    body = etree.tostring(element, pretty_print=True, encoding='unicode')
+    with open(path, 'w', encoding='utf-8') as f:
+        # indented one level, inside the merged root ParameterList
+        for line in body.splitlines(True):
+            f.write("    " + line)
+
+
+def export_sharded(models, directory='mpact_shards', out='mpact.xml', executor=None):
+    """
+    Writes every mesh type and lattice to its own shard (only if it changed since the last
+    export) and concatenates the shards into out under one root ParameterList.
+    :param models: list of GeneralMeshType and Lattice (e.g. the pins and assemblies of a Core)
+    :param executor: concurrent.futures executor for the shard writers
+    :return: names of the shards that were rewritten
+    """
+    shards = shardedexport.ShardSet(directory, XML_HEADER + "<ParameterList name=\"MPACT\">\n",
+                                    "</ParameterList>\n")
+    jobs = []
+    for model in models:
+        if isinstance(model, Lattice):
+            jobs.append((f"lattice {model.name}_{model.ID}", shardedexport.content_key(lattice_data(model)),
+                         write_mesh_shard, (model,)))
+        else:
+            jobs.append((f"{model.name}_{model.ID}", shardedexport.content_key(mesh_data(model)),
+                         write_mesh_shard, (model,)))
+    written = shards.write(jobs, executor)
+    shards.merge(out)
+    return written
 
 
 def script(vis_objs):
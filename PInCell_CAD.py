@@ -71,11 +71,11 @@ def main():
     ## Defining Geometry in FreeCAD
     sph = convert_sphere(Part.makeSphere(1.0))
 
-    z_plane = openmc.ZPlane(z0=0) # TODO: Is this worth it?
-    northern_hemisphere = -sph & +z_plane
+    z_plane = get_surface('ZPlane', z0=0) # TODO: Is this worth it?
+    northern_hemisphere = sph & +z_plane
 
     cell = openmc.Cell()
-    cell.region = northern_hemisphere
+    cell.region = materialize(northern_hemisphere)
 
     cell.fill = water
 
@@ -100,29 +100,30 @@ def main():
     # clad_ir = convert_cylinder(Part.makeCylinder(0.40, float('inf'), Base.Vector(0, 0, -float('inf'))))
     # clad_or = convert_cylinder(Part.makeCylinder(0.46, float('inf'), Base.Vector(0, 0, -float('inf'))))
     
-    gap_region = clad_ir & ~fuel_region
-    clad_region = clad_or & ~clad_ir
+    # coaxial cylinders share their z-planes, so these become flat annuli
+    gap_region = subtract_region(clad_ir, fuel_region)
+    clad_region = subtract_region(clad_or, clad_ir)
 
     fuel = openmc.Cell(1, 'fuel')
     fuel.fill = uo2
-    fuel.region = fuel_region
+    fuel.region = materialize(fuel_region)
 
     gap = openmc.Cell(2, 'air gap')
-    gap.region = gap_region
+    gap.region = materialize(gap_region)
 
     clad = openmc.Cell(3, 'clad')
     clad.fill = zirconium
-    clad.region = clad_region
+    clad.region = materialize(clad_region)
 
     pitch = 1.26
 
     # Box centered at (0,0,0), length=width=pitch, height=1
     water_region = convert_box(Part.makeBox(pitch, pitch, 1, Base.Vector(-pitch / 2, -pitch / 2, -0.5)))
-    water_region = water_region & ~clad_or
+    water_region = subtract_region(water_region, clad_or)
 
     moderator = openmc.Cell(4, 'moderator')
     moderator.fill = water
-    moderator.region = water_region
+    moderator.region = materialize(water_region)
 
     root = openmc.Universe(cells=(fuel, gap, clad, moderator))
 
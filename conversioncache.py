@@ -0,0 +1,226 @@
+"""
+On-disk cache of converted sub-trees, shared between documents, sessions and workers.
+
+Entries are content addressed: the key of an object is a hash of its TypeId, its
+geometric parameters (Length, Radius, Angle, ...), its Placement and the keys of its
+children, so equal parts get equal keys whatever they are called and whichever document
+they are in, and changing any primitive changes the key of every feature built on it.
+
+The cache is a SQLite database in WAL mode. Each thread has its own connection, writers
+take the lock with BEGIN IMMEDIATE and wait up to `timeout` seconds for each other, so
+several batch workers (threads or processes) can share one file. Once the stored values
+exceed max_bytes the least recently used entries are deleted. The total size is kept in
+a one-row table, updated in the transaction that changes the entries, so a put does not
+sum the whole table.
+
+Usage:
+    cache = ConversionCache('~/.cad2mc_cache.sqlite', max_bytes=256 * 2**20)
+    vis_objs_CAD, vis_objs_MC = CAD2MC.vis_objs_to_OpenMC(vis_objs, cache=cache)
+    model = CAD2MPACT.create_model(vis_objs, cache=cache)
+    cache.stats()
+"""
+
+__title__ = "conversioncache.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# bump when the stored format or the converters change, old entries are then never hit
+CACHE_FORMAT = 1
+
+# properties that define the geometry of the Part primitives
+GEOMETRY_PROPERTIES = ('Length', 'Width', 'Height', 'Radius', 'Radius1', 'Radius2', 'Radius3',
+                       'Angle', 'Angle1', 'Angle2', 'Angle3', 'Polygon', 'Circumradius',
+                       'X', 'Y', 'Z', 'DirMode', 'Dir', 'Refine')
+
+
+######################################################
+# ------------------- KEYS ------------------------- #
+######################################################
+
+def _value(v):
+    """
+    :return: JSON-able, rounded form of a property value
+    """
+    if isinstance(v, float):
+        return round(v, 9)
+    if isinstance(v, (int, bool, str)) or v is None:
+        return v
+    if hasattr(v, 'Value'):          # FreeCAD Quantity
+        return round(float(v.Value), 9)
+    if hasattr(v, 'x') and hasattr(v, 'y') and hasattr(v, 'z'):    # Vector
+        return [round(v.x, 9), round(v.y, 9), round(v.z, 9)]
+    if isinstance(v, (list, tuple)):
+        return [_value(x) for x in v]
+    return str(v)
+
+
+def _placement(obj):
+    p = getattr(obj, 'Placement', None)
+    if p is None:
+        return None
+    return [_value(p.Base), [round(q, 9) for q in p.Rotation.Q]]
+
+
+def object_key(obj, child_keys, kind):
+    """
+    :param obj: FreeCAD object
+    :param child_keys: keys of the children obj is converted from, in order
+    :param kind: what the entry holds (e.g. 'openmc', 'mpact-geom')
+    :return: hex digest identifying the sub-tree below obj
+    """
+    content = [CACHE_FORMAT, kind, obj.TypeId,
+               [[p, _value(getattr(obj, p))] for p in GEOMETRY_PROPERTIES if hasattr(obj, p)],
+               _placement(obj), list(child_keys)]
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def subtree_key(obj, children, kind, memo=None):
+    """
+    Merkle key of obj: object_key over the subtree keys of children(obj).
+    :param children: children(obj) -> list of FreeCAD objects
+    :param memo: optional dict obj.Name -> key, shared between calls of one run
+    :return: hex digest
+    """
+    memo = {} if memo is None else memo
+    key = memo.get(obj.Name)
+    if key is None:
+        key = object_key(obj, [subtree_key(c, children, kind, memo) for c in children(obj)], kind)
+        memo[obj.Name] = key
+    return key
+
+
+######################################################
+# ------------------- STORAGE ---------------------- #
+######################################################
+
+class ConversionCache:
+    """
+    SQLite store of JSON values by key with size bounded LRU eviction
+    """
+
+    def __init__(self, path=None, max_bytes=256 * 2**20, timeout=30.0):
+        """
+        :param path: database file, ~/.cad2mc_cache.sqlite if None
+        :param max_bytes: total size of the stored values before eviction starts
+        :param timeout: seconds a writer waits for the database lock
+        """
+        self.path = os.path.expanduser(path or '~/.cad2mc_cache.sqlite')
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                       "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                       "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+            db.execute("CREATE TABLE IF NOT EXISTS total (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                       "bytes INTEGER NOT NULL)")
+            # summed once, when the table is created (also for caches written before it existed)
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR IGNORE INTO total (id, bytes) "
+                       "SELECT 0, COALESCE(SUM(size), 0) FROM entries")
+            db.execute("COMMIT")
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # isolation_level=None: transactions are opened explicitly below
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        """
+        :return: the value stored under key, None if there is none
+        """
+        db = self._connection()
+        row = db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # a lost LRU update only makes the entry look a bit older
+        try:
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.OperationalError:
+            pass
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """
+        Stores value (anything json.dumps accepts) under key and evicts the least
+        recently used entries if the cache has grown beyond max_bytes.
+        :return: None
+        """
+        text = json.dumps(value, separators=(',', ':'))
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO entries (key, value, size, last_used) "
+                       "VALUES (?, ?, ?, ?)", (key, text, len(text), time.time()))
+            db.execute("UPDATE total SET bytes = bytes + ? WHERE id = 0",
+                       (len(text) - (row[0] if row else 0),))
+            self._evict(db)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _evict(self, db):
+        total = db.execute("SELECT bytes FROM total WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        freed = 0
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        db.execute("UPDATE total SET bytes = bytes - ? WHERE id = 0", (freed,))
+
+    def stats(self):
+        """
+        :return: dict with number of entries, stored bytes, hits and misses of this process
+        """
+        db = self._connection()
+        count = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        size = db.execute("SELECT bytes FROM total WHERE id = 0").fetchone()[0]
+        return {'entries': count, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """
+        Deletes all entries.
+        :return: None
+        """
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM entries")
+            db.execute("UPDATE total SET bytes = 0 WHERE id = 0")
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
@@ -0,0 +1,125 @@
+"""
+Level-ordered conversion of a FreeCAD dependency DAG.
+
+Converting a feature only requires its inputs to be converted first. The scheduler
+follows the children function the converter uses (e.g. CAD2MC.shape_children, which
+also walks Group links), groups the objects reachable from the requested roots by their
+depth in that graph (objects without children have depth 0) and converts each level as
+one batch: the primitives first, then the Cut/Fusion/Common features built on them, up
+to the roots. Every object is converted once, however many features share it.
+
+Usage:
+    scheduler = LevelScheduler(CAD2MC.shape_children, CAD2MC.convert_node)
+    results = scheduler.run(vis_objs)    # {obj.Name: converted object}
+    print(scheduler.report())
+
+Remark: The scheduler gives an order, not parallelism. Without an executor the levels
+are converted in the calling thread. The converters are pure Python, so on a
+ThreadPoolExecutor the GIL still runs one conversion at a time; an executor only helps a
+convert that releases the GIL (I/O, a cache on disk). A ProcessPoolExecutor would run in
+parallel, but convert and its arguments would have to be pickled, which FreeCAD
+Part::Feature objects and the openmc surfaces of the converted children cannot (see
+CAD2MC.main).
+"""
+
+__title__ = "conversionscheduler.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import time
+from collections import namedtuple
+import dependencyindex
+
+LevelTiming = namedtuple('LevelTiming', ['depth', 'nodes', 'seconds'])
+
+
+class LevelScheduler:
+    """
+    Converts a DAG level by level, in the calling thread or on an executor.
+    """
+
+    def __init__(self, children, convert, executor=None, progress=None):
+        """
+        :param children: children(obj) -> list of the objects obj is converted from
+        :param convert: convert(obj, converted_children) -> converted obj
+        :param executor: optional concurrent.futures executor; the levels are converted
+                         in the calling thread if None
+        :param progress: optional progress(level_number, number_of_levels, LevelTiming)
+        """
+        self.children = children
+        self.convert = convert
+        self.executor = executor
+        self.progress = progress
+        self.timings = []
+        self._children = {}
+
+    def levels(self, roots):
+        """
+        Finds the objects reachable from roots through children() and groups them by
+        their depth in that graph, so all children of an object are in earlier levels.
+        :param roots: list of FreeCAD objects
+        :return: list of (depth, objects) by increasing depth
+        """
+        depth = {}
+        seen = {}
+        for root in roots:
+            # post-order walk, an object is finished after all of its children
+            stack = [(root, False)]
+            while stack:
+                obj, done = stack.pop()
+                if obj.Name in depth:
+                    continue
+                if done:
+                    depth[obj.Name] = 1 + max((depth[c.Name] for c in self._children[obj.Name]),
+                                              default=-1)
+                    continue
+                if obj.Name not in self._children:
+                    self._children[obj.Name] = list(self.children(obj))
+                    seen[obj.Name] = obj
+                stack.append((obj, True))
+                stack.extend((c, False) for c in self._children[obj.Name] if c.Name not in depth)
+
+        by_depth = {}
+        for name, obj in seen.items():
+            by_depth.setdefault(depth[name], []).append(obj)
+
+        # sorted by document order so that runs are reproducible
+        return [(d, sorted(by_depth[d], key=lambda o: dependencyindex.index_of(o).id(o)))
+                for d in sorted(by_depth)]
+
+    def run(self, roots):
+        """
+        Converts roots and everything they depend on.
+        :param roots: list of FreeCAD objects
+        :return: dict of obj.Name -> converted object for every reachable object
+        """
+        results = {}
+        self.timings = []
+        self._children = {}
+        levels = self.levels(roots)
+
+        run_level = map if self.executor is None else self.executor.map
+        for n, (depth, level) in enumerate(levels):
+            start = time.perf_counter()
+            inputs = [[results[c.Name] for c in self._children[obj.Name]] for obj in level]
+            for obj, result in zip(level, run_level(self.convert, level, inputs)):
+                results[obj.Name] = result
+
+            timing = LevelTiming(depth, len(level), time.perf_counter() - start)
+            self.timings.append(timing)
+            if self.progress is not None:
+                self.progress(n + 1, len(levels), timing)
+
+        return results
+
+    def report(self):
+        """
+        :return: per level node count and time of the last run, as text
+        """
+        lines = ["depth  nodes   seconds"]
+        for t in self.timings:
+            lines.append(f"{t.depth:5d}  {t.nodes:5d}  {t.seconds:8.4f}")
+        lines.append(f"total  {sum(t.nodes for t in self.timings):5d}  "
+                     f"{sum(t.seconds for t in self.timings):8.4f}")
+        return "\n".join(lines)
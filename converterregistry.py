@@ -0,0 +1,130 @@
+"""
+TypeId keyed dispatch tables for the converters.
+
+Every FreeCAD object carries its feature type in TypeId ('Part::Box', 'Part::Cylinder',
+'Part::Cut', 'Part::MultiFuse', ...). A ConverterRegistry maps TypeIds to converter
+functions, so dispatch is a single dict lookup and does not depend on how the user
+named the object (a box labelled 'Cylinder_Box' is still a Part::Box).
+
+Objects of a type nobody registered, and converters that raise NotImplementedError,
+are collected as ConversionErrors instead of stopping the conversion; report() lists
+them once the whole document has been processed. By default they go to the registry's
+own log. A caller converting several documents at once (e.g. one per worker thread)
+passes its own errors list to convert() instead, so a build only sees its own errors.
+
+Usage:
+    primitives = ConverterRegistry('OpenMC primitives')
+
+    @primitives.register('Part::Box')
+    def convert_box(box): ...
+
+    region = primitives.convert(obj)    # None if obj could not be converted
+    print(primitives.report())
+
+    errors = []
+    region = primitives.convert(obj, errors=errors)
+    print(report('OpenMC conversion', errors))
+
+Backends add types the same way, e.g. @CAD2MC.primitives.register('Part::Cone').
+"""
+
+__title__ = "converterregistry.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+from collections import namedtuple
+
+ConversionError = namedtuple('ConversionError', ['name', 'label', 'type_id', 'message'])
+
+
+class ConverterRegistry:
+    """
+    Table of TypeId -> converter with a log of the objects that could not be converted
+    """
+
+    def __init__(self, name):
+        """
+        :param name: what the registry converts, used in the report
+        """
+        self.name = name
+        self.converters = {}
+        self.errors = []
+
+    def register(self, *type_ids):
+        """
+        Decorator registering a converter for one or more TypeIds. A later registration
+        for the same TypeId replaces the earlier one.
+        :param type_ids: FreeCAD TypeIds, e.g. 'Part::Box'
+        :return: decorator returning the function unchanged
+        """
+        def decorator(func):
+            for type_id in type_ids:
+                self.converters[type_id] = func
+            return func
+        return decorator
+
+    def lookup(self, type_id):
+        """
+        :return: converter registered for type_id, or None
+        """
+        return self.converters.get(type_id)
+
+    def __contains__(self, type_id):
+        return type_id in self.converters
+
+    def convert(self, obj, *args, errors=None):
+        """
+        Converts obj with the converter registered for obj.TypeId.
+        :param obj: FreeCAD object
+        :param args: further arguments passed to the converter
+        :param errors: list the error is recorded in; the registry's errors if None
+        :return: converter result, or None if obj is unsupported (the error is recorded)
+        """
+        type_id = getattr(obj, 'TypeId', type(obj).__name__)
+        func = self.converters.get(type_id)
+        if func is None:
+            self.error(obj, "no converter registered", errors)
+            return None
+        try:
+            return func(obj, *args)
+        except NotImplementedError as e:
+            self.error(obj, str(e) or "not implemented", errors)
+            return None
+
+    def error(self, obj, message, errors=None):
+        """
+        Records that obj could not be converted.
+        :param errors: list to record in; the registry's errors if None
+        :return: None
+        """
+        (self.errors if errors is None else errors).append(
+            ConversionError(getattr(obj, 'Name', '?'), getattr(obj, 'Label', '?'),
+                            getattr(obj, 'TypeId', type(obj).__name__), message))
+
+    def clear(self):
+        """
+        Forgets the recorded errors.
+        :return: None
+        """
+        self.errors = []
+
+    def report(self):
+        """
+        :return: the recorded errors as text, '' if there are none
+        """
+        return report(self.name, self.errors)
+
+
+def report(name, errors):
+    """
+    :param name: what was converted, used in the first line
+    :param errors: list of ConversionError
+    :return: the errors as text, '' if there are none
+    """
+    if not errors:
+        return ""
+    lines = [f"{name}: {len(errors)} object(s) not converted"]
+    for e in errors:
+        lines.append(f"    {e.name} ('{e.label}', {e.type_id}): {e.message}")
+    return "\n".join(lines)
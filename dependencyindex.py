@@ -0,0 +1,305 @@
+"""
+Snapshot of the dependency graph of a FreeCAD document.
+
+Walking OutList/InList through the FreeCAD API is slow per call, so the converters and
+the object tree query this index instead. Every object gets an integer id (its position
+in doc.Objects) and the children (OutList) and parents (InList) of all objects are kept
+in CSR form: the ids adjacent to object i are idx[ptr[i]:ptr[i+1]].
+
+Depth is the length of the longest path down to an object without children, so the
+primitives have depth 0 and every feature is deeper than all of its inputs. The
+topological order lists the objects by increasing depth.
+
+A document observer keeps the index up to date: changed adjacency lists are stored in
+an overlay on top of the CSR arrays and the arrays are rebuilt once the overlay grows.
+
+Usage:
+    import dependencyindex
+    index = dependencyindex.get_index(FreeCAD.ActiveDocument)
+    index.children(obj), index.parents(obj), index.depth(obj), index.levels()
+
+Remark: Written to run in both the Python 2 FreeCAD console (objecttree.py) and Python 3.
+"""
+
+__title__ = "dependencyindex.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+from array import array
+
+
+class DependencyIndex(object):
+    """
+    CSR adjacency of a document's OutList/InList graph with depth and topological order
+    """
+
+    # the arrays are rebuilt once the overlay holds more than 1/COMPACT_RATIO of the objects
+    COMPACT_RATIO = 8
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.version = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Takes a new snapshot of the document.
+        :return: None
+        """
+        objs = list(self.doc.Objects)
+        self.objects = objs
+        self.ids = dict((obj.Name, i) for i, obj in enumerate(objs))
+        self.alive = [True] * len(objs)
+
+        child_lists = [self._link_ids(obj) for obj in objs]
+        self.child_ptr, self.child_idx = _to_csr(child_lists)
+        self.parent_ptr, self.parent_idx = _to_csr(_transpose(child_lists, len(objs)))
+
+        self.child_overlay = {}
+        self.parent_overlay = {}
+        self._order = None
+        self._depth = None
+        self.version += 1
+
+    # ---------------------------- queries ----------------------------- #
+
+    def __len__(self):
+        return sum(1 for a in self.alive if a)
+
+    def __contains__(self, obj):
+        return _name(obj) in self.ids
+
+    def id(self, obj):
+        """
+        :param obj: FreeCAD object or its Name
+        :return: integer id of the object
+        """
+        return self.ids[_name(obj)]
+
+    def child_ids(self, i):
+        if i in self.child_overlay:
+            return self.child_overlay[i]
+        if i + 1 < len(self.child_ptr):
+            return self.child_idx[self.child_ptr[i]:self.child_ptr[i + 1]]
+        return ()
+
+    def parent_ids(self, i):
+        if i in self.parent_overlay:
+            return self.parent_overlay[i]
+        if i + 1 < len(self.parent_ptr):
+            return self.parent_idx[self.parent_ptr[i]:self.parent_ptr[i + 1]]
+        return ()
+
+    def children(self, obj):
+        """
+        :return: the objects in the OutList of obj, in OutList order without duplicates
+        """
+        self._maybe_compact()
+        return [self.objects[j] for j in self.child_ids(self.id(obj))]
+
+    def parents(self, obj):
+        """
+        :return: the objects which have obj in their OutList
+        """
+        self._maybe_compact()
+        return [self.objects[j] for j in self.parent_ids(self.id(obj))]
+
+    def child_count(self, obj):
+        return len(self.child_ids(self.id(obj)))
+
+    def parent_count(self, obj):
+        return len(self.parent_ids(self.id(obj)))
+
+    def depth(self, obj):
+        """
+        :return: longest path from obj down to a primitive (0 for primitives)
+        """
+        self._sort()
+        return self._depth[self.id(obj)]
+
+    def topological_order(self):
+        """
+        :return: all objects, every object after all of its children
+        """
+        self._sort()
+        return [self.objects[i] for i in self._order]
+
+    def levels(self):
+        """
+        :return: list of lists; levels()[d] holds the objects of depth d
+        """
+        self._sort()
+        levels = []
+        for i in self._order:
+            d = self._depth[i]
+            while d >= len(levels):
+                levels.append([])
+            levels[d].append(self.objects[i])
+        return levels
+
+    def roots(self):
+        """
+        :return: objects nothing else depends on
+        """
+        return [obj for i, obj in enumerate(self.objects)
+                if self.alive[i] and len(self.parent_ids(i)) == 0]
+
+    # --------------------- document observer slots --------------------- #
+
+    def slotCreatedObject(self, obj):
+        if not self._observes(obj) or obj.Name in self.ids:
+            return
+        i = len(self.objects)
+        self.objects.append(obj)
+        self.alive.append(True)
+        self.ids[obj.Name] = i
+        self._set_children(i, self._link_ids(obj))
+
+    def slotDeletedObject(self, obj):
+        if not self._observes(obj) or obj.Name not in self.ids:
+            return
+        i = self.ids.pop(obj.Name)
+        self._set_children(i, [])
+        for p in list(self.parent_ids(i)):
+            self._set_children(p, [c for c in self.child_ids(p) if c != i])
+        self.alive[i] = False
+
+    def slotChangedObject(self, obj, prop):
+        if not self._observes(obj) or obj.Name not in self.ids:
+            return
+        i = self.ids[obj.Name]
+        new = self._link_ids(obj)
+        if list(new) != list(self.child_ids(i)):
+            self._set_children(i, new)
+
+    # ----------------------------- helpers ----------------------------- #
+
+    def _observes(self, obj):
+        return getattr(obj, 'Document', self.doc) is self.doc
+
+    def _link_ids(self, obj):
+        ids = []
+        for child in obj.OutList:
+            j = self.ids.get(child.Name)
+            if j is not None and j not in ids:
+                ids.append(j)
+        return array('i', ids)
+
+    def _set_children(self, i, new):
+        """
+        Replaces the children of i in the overlay and patches the parents of the
+        children that were added or removed.
+        """
+        old = set(self.child_ids(i))
+        new = array('i', new)
+        self.child_overlay[i] = new
+        for c in old.difference(new):
+            self.parent_overlay[c] = array('i', [p for p in self.parent_ids(c) if p != i])
+        for c in set(new).difference(old):
+            self.parent_overlay[c] = array('i', list(self.parent_ids(c)) + [i])
+        self._order = None
+        self._depth = None
+        self.version += 1
+
+    def _maybe_compact(self):
+        if len(self.child_overlay) + len(self.parent_overlay) > \
+                max(64, len(self.objects) // self.COMPACT_RATIO):
+            self.rebuild()
+
+    def _sort(self):
+        """
+        Computes depth and topological order (Kahn's algorithm from the primitives up).
+        """
+        if self._order is not None:
+            return
+        self._maybe_compact()
+        n = len(self.objects)
+        remaining = array('i', [len(self.child_ids(i)) for i in range(n)])
+        depth = array('i', [0] * n)
+        queue = [i for i in range(n) if self.alive[i] and remaining[i] == 0]
+        order = array('i')
+        for i in queue:
+            order.append(i)
+            for p in self.parent_ids(i):
+                if depth[i] + 1 > depth[p]:
+                    depth[p] = depth[i] + 1
+                remaining[p] -= 1
+                if remaining[p] == 0:
+                    queue.append(p)
+
+        if len(order) != len(self):
+            raise ValueError("Dependency cycle in document '%s'" % getattr(self.doc, 'Name', ''))
+
+        # stable counting sort by depth, so each level is contiguous
+        counts = [0] * (max(depth) + 2 if n else 1)
+        for i in order:
+            counts[depth[i] + 1] += 1
+        for d in range(1, len(counts)):
+            counts[d] += counts[d - 1]
+        by_depth = array('i', [0] * len(order))
+        for i in order:
+            by_depth[counts[depth[i]]] = i
+            counts[depth[i]] += 1
+
+        self._depth = depth
+        self._order = by_depth
+
+
+def _name(obj):
+    return getattr(obj, 'Name', obj)
+
+
+def _to_csr(lists):
+    ptr = array('i', [0])
+    idx = array('i')
+    for l in lists:
+        idx.extend(l)
+        ptr.append(len(idx))
+    return ptr, idx
+
+
+def _transpose(lists, n):
+    out = [array('i') for _ in range(n)]
+    for i, l in enumerate(lists):
+        for j in l:
+            out[j].append(i)
+    return out
+
+
+######################################################
+# ----------------- SHARED INDEXES ----------------- #
+######################################################
+
+_indexes = {}
+
+
+def get_index(doc):
+    """
+    Returns the index of doc, building it and registering it as a document observer
+    the first time.
+    :param doc: FreeCAD document (or anything with .Name and .Objects)
+    :return: DependencyIndex
+    """
+    key = getattr(doc, 'Name', id(doc))
+    index = _indexes.get(key)
+    if index is None or index.doc is not doc:
+        index = DependencyIndex(doc)
+        _indexes[key] = index
+        _observe(doc, index)
+    return index
+
+
+def index_of(obj):
+    """
+    :return: the index of the document obj belongs to
+    """
+    return get_index(obj.Document)
+
+
+def _observe(doc, index):
+    try:
+        import FreeCAD
+    except ImportError:
+        return
+    FreeCAD.addDocumentObserver(index)
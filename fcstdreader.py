@@ -0,0 +1,163 @@
+"""
+Reads FreeCAD .FCStd files without FreeCAD.
+
+An .FCStd file is a zip archive. Document.xml lists the objects (type and name) and
+their properties; GuiDocument.xml holds the view properties, among them Visibility. The
+converters only need the parametric description of the supported features, so those
+two parts are streamed with iterparse and turned into freecadstandin documents:
+
+    Label                       App::PropertyString
+    Placement                   App::PropertyPlacement (Px, Py, Pz, Q0 ... Q3)
+    Length, Width, Height,      App::PropertyLength / PropertyAngle / PropertyFloat
+    Radius, Angle
+    Base, Tool                  App::PropertyLink
+    Shapes, Group               App::PropertyLinkList (Group of the document object groups)
+    Visibility                  App::PropertyBool (GuiDocument.xml or Document.xml)
+
+Everything else (the BREP shapes, attachment, expressions, colors) is skipped. Objects
+of other types are still created so that links to them resolve; the converters report
+them as unsupported.
+
+Usage:
+    import freecadstandin, fcstdreader
+    freecadstandin.install()                        # FreeCAD, FreeCADGui, Part stand-ins
+    doc = fcstdreader.read_fcstd('PinCellOpenMC.FCStd')
+    import CAD2MC
+    CAD2MC.vis_objs_to_OpenMC(CAD2MC.select_all_visible_objects())
+
+    python fcstdreader.py PinCellMPACT.FCStd        # lists the objects
+"""
+
+__title__ = "fcstdreader.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import os
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+import freecadstandin
+
+DIMENSIONS = ('Length', 'Width', 'Height', 'Radius', 'Angle')
+LINKS = ('Base', 'Tool')
+LINK_LISTS = ('Shapes', 'Group')
+
+
+def _placement(element):
+    """
+    :param element: <PropertyPlacement Px= Py= Pz= Q0= Q1= Q2= Q3=/>
+    :return: freecadstandin.Placement
+    """
+    rotation = freecadstandin.Rotation()
+    rotation.Q = tuple(float(element.get(q, '0')) for q in ('Q0', 'Q1', 'Q2')) + \
+        (float(element.get('Q3', '1')),)
+    base = freecadstandin.Vector(*(float(element.get(p, '0')) for p in ('Px', 'Py', 'Pz')))
+    return freecadstandin.Placement(base, rotation)
+
+
+def _read_properties(stream, on_object_start, on_property):
+    """
+    Streams the <Object>/<ViewProvider> sections of a document part.
+    :param on_object_start: f(element) for every <Object> or <ViewProvider> start tag
+    :param on_property: f(owner name, property name, value element) for the value
+                        elements (Float, String, Bool, Link, LinkList, PropertyPlacement)
+    """
+    owner = None
+    prop = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if tag in ('Object', 'ViewProvider'):
+                on_object_start(element)
+                # the <Objects> list entries carry a type and no properties
+                if element.get('type') is None:
+                    owner = element.get('name')
+            elif tag == 'Property':
+                prop = element.get('name')
+            continue
+
+        if tag == 'Property':
+            if owner is not None:
+                for value in element:
+                    on_property(owner, prop, value)
+            prop = None
+            element.clear()
+        elif tag in ('Object', 'ViewProvider') and element.get('type') is None:
+            owner = None
+            element.clear()
+
+
+def read_fcstd(path, name=None):
+    """
+    :param path: .FCStd file
+    :param name: document name; the file name without extension if None
+    :return: freecadstandin.Document (also the stand-in's ActiveDocument)
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    doc = freecadstandin.newDocument(name)
+    objects = {}    # name -> object; Document.getObject is a linear search
+    links = []      # (object, property, [names]) resolved after all objects exist
+
+    def object_start(element):
+        # <Objects> lists type and name; <ObjectData> and GuiDocument only the name
+        if element.tag == 'Object' and element.get('type') is not None:
+            obj = doc.addObject(element.get('type'), element.get('name'))
+            objects[obj.Name] = obj
+
+    def document_property(owner, prop, value):
+        obj = objects.get(owner)
+        if obj is None:
+            return
+        if prop == 'Label' and value.tag == 'String':
+            obj.Label = value.get('value')
+        elif prop == 'Placement' and value.tag == 'PropertyPlacement':
+            obj.Placement = _placement(value)
+        elif prop in DIMENSIONS and value.tag == 'Float':
+            setattr(obj, prop, float(value.get('value')))
+        elif prop in LINKS and value.tag == 'Link':
+            links.append((obj, prop, [value.get('value')]))
+        elif prop in LINK_LISTS and value.tag == 'LinkList':
+            # a Group only on the group objects, which have it from addObject
+            if prop != 'Group' or hasattr(obj, 'Group'):
+                links.append((obj, prop, [link.get('value') for link in value.iter('Link')]))
+        elif prop == 'Visibility' and value.tag == 'Bool':
+            obj.Visibility = value.get('value') == 'true'
+
+    def gui_property(owner, prop, value):
+        obj = objects.get(owner)
+        if obj is not None and prop == 'Visibility' and value.tag == 'Bool':
+            obj.Visibility = value.get('value') == 'true'
+
+    with zipfile.ZipFile(path) as archive:
+        with archive.open('Document.xml') as stream:
+            _read_properties(stream, object_start, document_property)
+        if 'GuiDocument.xml' in archive.namelist():
+            with archive.open('GuiDocument.xml') as stream:
+                _read_properties(stream, lambda element: None, gui_property)
+
+    for obj, prop, names in links:
+        targets = [objects.get(n) for n in names if n]
+        if prop in LINK_LISTS:
+            setattr(obj, prop, [t for t in targets if t is not None])
+        else:
+            setattr(obj, prop, targets[0] if targets else None)
+    return doc
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python fcstdreader.py FILE.FCStd")
+        return 2
+    doc = read_fcstd(argv[0])
+    for obj in doc.Objects:
+        links = ", ".join(o.Name for o in obj.OutList)
+        print(f"{obj.Name:16s} {obj.TypeId:16s} {obj.Label!r:20s} "
+              f"{'visible' if obj.Visibility else 'hidden':8s} {links}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,614 @@
+"""
+Stand-in for the parts of FreeCAD, FreeCADGui and Part the converters use.
+
+A real FreeCAD needs its own environment (and a specific Python 3.6 patch version) and
+seconds to start. This module implements just what CAD2MC, CAD2MPACT, PInCell_CAD and
+dependencyindex touch: Vector, Rotation, Placement, BoundBox, Part shapes from
+makeBox/makeCylinder/makeSphere, and documents of Part::Box/Cylinder/Sphere and
+Part::Cut/Fuse/MultiFuse/Common/MultiCommon objects (and App::DocumentObjectGroup/App::Part
+groups) with Name, Label, TypeId, Placement, OutList, InList, Shape, Visibility and their
+dimension and link properties. Shapes are only
+bounding boxes (exact for axis aligned primitives), which is all the converters read.
+
+install() registers the stand-in as the FreeCAD, FreeCADGui and Part modules, so the
+converters run unchanged; the generators build synthetic documents of any size.
+
+Usage:
+    import freecadstandin
+    freecadstandin.install()
+    doc = freecadstandin.make_lattice(17)          # 17x17 pin assembly
+    import CAD2MC
+    CAD2MC.vis_objs_to_OpenMC(doc.Objects)
+
+    freecadstandin.benchmark(n=17)
+
+Remark: Only for tests and benchmarks; nothing here is written back to FreeCAD files.
+"""
+
+__title__ = "freecadstandin.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import importlib.util
+import math
+import sys
+import time
+import types
+
+
+######################################################
+# ------------------ BASE TYPES -------------------- #
+######################################################
+
+class Vector:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.z)[i]
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __add__(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, s):
+        return Vector(self.x * s, self.y * s, self.z * s)
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Vector ({self.x}, {self.y}, {self.z})"
+
+
+class Rotation:
+    """
+    Rotation as a quaternion Q = (x, y, z, w), like FreeCAD.Rotation
+    """
+
+    def __init__(self, axis=None, angle=0.0):
+        """
+        :param axis: Vector, rotation axis
+        :param angle: degrees
+        """
+        if axis is None or angle == 0.0:
+            self.Q = (0.0, 0.0, 0.0, 1.0)
+            return
+        n = math.sqrt(axis.x ** 2 + axis.y ** 2 + axis.z ** 2)
+        s = math.sin(math.radians(angle) / 2) / n
+        self.Q = (axis.x * s, axis.y * s, axis.z * s, math.cos(math.radians(angle) / 2))
+
+    def multVec(self, v):
+        x, y, z, w = self.Q
+        # v + 2 q x (q x v + w v)
+        cx = y * v.z - z * v.y + w * v.x
+        cy = z * v.x - x * v.z + w * v.y
+        cz = x * v.y - y * v.x + w * v.z
+        return Vector(v.x + 2 * (y * cz - z * cy),
+                      v.y + 2 * (z * cx - x * cz),
+                      v.z + 2 * (x * cy - y * cx))
+
+    def multiply(self, other):
+        x1, y1, z1, w1 = self.Q
+        x2, y2, z2, w2 = other.Q
+        r = Rotation()
+        r.Q = (w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+               w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+               w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+               w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2)
+        return r
+
+
+class Placement:
+    def __init__(self, base=None, rotation=None):
+        self.Base = Vector() if base is None else base
+        self.Rotation = Rotation() if rotation is None else rotation
+
+    def multVec(self, v):
+        return self.Rotation.multVec(v) + self.Base
+
+
+class BoundBox:
+    def __init__(self, xmin=0.0, ymin=0.0, zmin=0.0, xmax=0.0, ymax=0.0, zmax=0.0):
+        self.XMin, self.YMin, self.ZMin = xmin, ymin, zmin
+        self.XMax, self.YMax, self.ZMax = xmax, ymax, zmax
+
+    @property
+    def XLength(self):
+        return self.XMax - self.XMin
+
+    @property
+    def YLength(self):
+        return self.YMax - self.YMin
+
+    @property
+    def ZLength(self):
+        return self.ZMax - self.ZMin
+
+    @property
+    def Center(self):
+        return Vector((self.XMin + self.XMax) / 2, (self.YMin + self.YMax) / 2, (self.ZMin + self.ZMax) / 2)
+
+    @staticmethod
+    def of_points(points):
+        xs, ys, zs = zip(*((p.x, p.y, p.z) for p in points))
+        # rounding hides the 1e-16 noise of rotated corners
+        return BoundBox(*(round(v, 12) for v in (min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))))
+
+    def united(self, other):
+        return BoundBox(min(self.XMin, other.XMin), min(self.YMin, other.YMin), min(self.ZMin, other.ZMin),
+                        max(self.XMax, other.XMax), max(self.YMax, other.YMax), max(self.ZMax, other.ZMax))
+
+    def intersected(self, other):
+        return BoundBox(max(self.XMin, other.XMin), max(self.YMin, other.YMin), max(self.ZMin, other.ZMin),
+                        min(self.XMax, other.XMax), min(self.YMax, other.YMax), min(self.ZMax, other.ZMax))
+
+    def __repr__(self):
+        return (f"BoundBox ({self.XMin}, {self.YMin}, {self.ZMin}, "
+                f"{self.XMax}, {self.YMax}, {self.ZMax})")
+
+
+######################################################
+# -------------------- SHAPES ---------------------- #
+######################################################
+
+def _primitive_box(kind, params, placement):
+    """
+    :return: BoundBox of a Box/Cylinder/Sphere with FreeCAD's local frame conventions
+    """
+    if kind == 'Box':
+        local = [Vector(x, y, z) for x in (0, params['Length']) for y in (0, params['Width'])
+                 for z in (0, params['Height'])]
+    elif kind == 'Cylinder':
+        r, h = params['Radius'], params['Height']
+        local = [Vector(x, y, z) for x in (-r, r) for y in (-r, r) for z in (0, h)]
+    elif kind == 'Sphere':
+        r = params['Radius']
+        local = [Vector(x, y, z) for x in (-r, r) for y in (-r, r) for z in (-r, r)]
+    else:
+        return BoundBox()
+    return BoundBox.of_points([placement.multVec(p) for p in local])
+
+
+class Shape:
+    """
+    Part.Shape stand-in: a primitive with a placement, or a precomputed bounding box
+    """
+
+    def __init__(self, kind=None, params=None, placement=None, boundbox=None):
+        self.kind = kind
+        self.params = dict(params or {})
+        self.Placement = Placement() if placement is None else placement
+        self._boundbox = boundbox
+
+    @property
+    def BoundBox(self):
+        if self._boundbox is not None:
+            return self._boundbox
+        return _primitive_box(self.kind, self.params, self.Placement)
+
+    @property
+    def Length(self):
+        # Part reports the edge length; for a sphere that is its circumference
+        if self.kind == 'Sphere':
+            return 2 * math.pi * self.params['Radius']
+        if self.kind == 'Cylinder':
+            return 2 * (2 * math.pi * self.params['Radius']) + self.params['Height']
+        if self.kind == 'Box':
+            return 4 * (self.params['Length'] + self.params['Width'] + self.params['Height'])
+        return 0.0
+
+    def rotate(self, center, axis, angle):
+        """
+        Rotates the shape by angle degrees around the axis through center.
+        """
+        rot = Rotation(axis, angle)
+        base = rot.multVec(self.Placement.Base - center) + center
+        self.Placement = Placement(base, rot.multiply(self.Placement.Rotation))
+
+    def isNull(self):
+        return self.kind is None and self._boundbox is None
+
+
+def makeBox(length, width, height, pnt=None, dir=None):
+    return Shape('Box', {'Length': length, 'Width': width, 'Height': height}, Placement(pnt or Vector()))
+
+
+def makeCylinder(radius, height, pnt=None, dir=None, angle=360.0):
+    rotation = _rotation_to(dir)
+    return Shape('Cylinder', {'Radius': radius, 'Height': height, 'Angle': angle},
+                 Placement(pnt or Vector(), rotation))
+
+
+def makeSphere(radius, pnt=None):
+    return Shape('Sphere', {'Radius': radius}, Placement(pnt or Vector()))
+
+
+def _rotation_to(direction):
+    """
+    :return: Rotation turning the z-axis onto direction
+    """
+    if direction is None:
+        return Rotation()
+    z = Vector(0, 0, 1)
+    axis = Vector(z.y * direction.z - z.z * direction.y, z.z * direction.x - z.x * direction.z, 0.0)
+    n = math.sqrt(direction.x ** 2 + direction.y ** 2 + direction.z ** 2)
+    angle = math.degrees(math.acos(max(-1.0, min(1.0, direction.z / n))))
+    if axis.x == 0.0 and axis.y == 0.0:
+        return Rotation(Vector(1, 0, 0), angle) if angle else Rotation()
+    return Rotation(axis, angle)
+
+
+######################################################
+# ------------------- DOCUMENTS -------------------- #
+######################################################
+
+_observers = []
+
+
+def addDocumentObserver(observer):
+    _observers.append(observer)
+
+
+def removeDocumentObserver(observer):
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def _notify(slot, *args):
+    for observer in list(_observers):
+        method = getattr(observer, slot, None)
+        if method is not None:
+            method(*args)
+
+
+PRIMITIVES = {
+    'Part::Box': ('Box', {'Length': 10.0, 'Width': 10.0, 'Height': 10.0}),
+    'Part::Cylinder': ('Cylinder', {'Radius': 2.0, 'Height': 10.0, 'Angle': 360.0}),
+    'Part::Sphere': ('Sphere', {'Radius': 5.0}),
+}
+BOOLEANS = ('Part::Cut', 'Part::Fuse', 'Part::MultiFuse', 'Part::Common', 'Part::MultiCommon')
+# only these have a Group (CAD2MC.shape_children tells groups apart with hasattr)
+GROUPS = ('App::DocumentObjectGroup', 'App::Part')
+LINKS = ('Base', 'Tool', 'Shapes', 'Group')
+
+
+class DocumentObject:
+    """
+    Part feature stand-in; setting a property notifies the document observers
+    """
+
+    def __init__(self, doc, type_id, name):
+        d = self.__dict__
+        d['Document'] = doc
+        d['TypeId'] = type_id
+        d['Name'] = name
+        d['Label'] = name
+        d['Visibility'] = True
+        d['Placement'] = Placement()
+        d['_properties'] = []
+        if type_id in PRIMITIVES:
+            for prop, value in PRIMITIVES[type_id][1].items():
+                self._add(prop, value)
+        elif type_id in ('Part::Cut', 'Part::Fuse', 'Part::Common'):
+            self._add('Base', None)
+            self._add('Tool', None)
+        elif type_id in BOOLEANS:
+            self._add('Shapes', [])
+        elif type_id in GROUPS:
+            self._add('Group', [])
+
+    def _add(self, prop, value):
+        self.__dict__[prop] = value
+        self._properties.append(prop)
+
+    @property
+    def PropertiesList(self):
+        return ['Label', 'Placement', 'Visibility'] + self._properties
+
+    def __setattr__(self, prop, value):
+        self.__dict__[prop] = value
+        if prop in LINKS or prop in self._properties or prop in ('Label', 'Placement'):
+            _notify('slotChangedObject', self, prop)
+
+    @property
+    def OutList(self):
+        out = []
+        for prop in LINKS:
+            value = self.__dict__.get(prop)
+            for obj in (value if isinstance(value, list) else [value]):
+                if obj is not None and obj not in out:
+                    out.append(obj)
+        return out
+
+    @property
+    def InList(self):
+        return [obj for obj in self.Document.Objects if self in obj.OutList]
+
+    @property
+    def Shape(self):
+        if self.TypeId in PRIMITIVES:
+            kind, defaults = PRIMITIVES[self.TypeId]
+            return Shape(kind, dict((p, getattr(self, p)) for p in defaults), self.Placement)
+        children = [c.Shape.BoundBox for c in self.OutList]
+        if not children:
+            return Shape()
+        if self.TypeId == 'Part::Cut':
+            box = children[0]
+        elif self.TypeId in ('Part::Common', 'Part::MultiCommon'):
+            box = children[0]
+            for b in children[1:]:
+                box = box.intersected(b)
+        else:
+            box = children[0]
+            for b in children[1:]:
+                box = box.united(b)
+        return Shape(boundbox=box)
+
+    # like Part shapes, so the converters also accept document objects
+    @property
+    def BoundBox(self):
+        return self.Shape.BoundBox
+
+    def __getattr__(self, attr):
+        # only reached for properties the object does not have (e.g. a sphere's Length)
+        if attr == 'Length':
+            return self.Shape.Length
+        raise AttributeError(attr)
+
+    def __repr__(self):
+        return f"<{self.TypeId} object '{self.Name}'>"
+
+
+class Document:
+    def __init__(self, name='Unnamed'):
+        self.Name = name
+        self.Label = name
+        self.Objects = []
+        self._names = {}
+
+    def addObject(self, type_id, name=None):
+        """
+        :return: new object; the name gets a 001, 002, ... suffix if it is taken
+        """
+        name = name or type_id.split('::')[-1]
+        unique = name
+        n = self._names.get(name, 0)
+        while unique in self._names:
+            n += 1
+            unique = f"{name}{n:03d}"
+        self._names[name] = n
+        self._names[unique] = 0
+        obj = DocumentObject(self, type_id, unique)
+        self.Objects.append(obj)
+        _notify('slotCreatedObject', obj)
+        return obj
+
+    def getObject(self, name):
+        for obj in self.Objects:
+            if obj.Name == name:
+                return obj
+        return None
+
+    def getObjectsByLabel(self, label):
+        return [obj for obj in self.Objects if obj.Label == label]
+
+    def removeObject(self, name):
+        obj = self.getObject(name)
+        if obj is not None:
+            _notify('slotDeletedObject', obj)
+            self.Objects.remove(obj)
+
+    def recompute(self):
+        return len(self.Objects)
+
+    def supportedTypes(self):
+        return sorted(PRIMITIVES) + list(BOOLEANS)
+
+
+_documents = {}
+ActiveDocument = None
+
+
+def newDocument(name='Unnamed'):
+    global ActiveDocument
+    unique = name
+    n = 0
+    while unique in _documents:
+        n += 1
+        unique = f"{name}{n}"
+    doc = Document(unique)
+    _documents[unique] = doc
+    ActiveDocument = doc
+    return doc
+
+
+def listDocuments():
+    return dict(_documents)
+
+
+def closeDocument(name):
+    global ActiveDocument
+    doc = _documents.pop(name, None)
+    if doc is ActiveDocument:
+        ActiveDocument = None
+
+
+class _GuiDocument:
+    """
+    FreeCADGui.ActiveDocument stand-in; view objects are the objects themselves
+    """
+    def getObject(self, name):
+        return ActiveDocument.getObject(name) if ActiveDocument is not None else None
+
+
+MODULES = ('FreeCAD', 'FreeCAD.Base', 'FreeCADGui', 'Part')
+_previous = {}      # module name -> what install() replaced (None if it was missing)
+
+
+def install():
+    """
+    Registers the stand-in as the FreeCAD (with FreeCAD.Base), FreeCADGui and Part modules.
+    :return: the FreeCAD module stand-in
+    """
+    this = sys.modules[__name__]
+    if not _previous:
+        for name in MODULES:
+            _previous[name] = sys.modules.get(name)
+
+    base = types.ModuleType('FreeCAD.Base')
+    base.Vector, base.Rotation, base.Placement, base.BoundBox = Vector, Rotation, Placement, BoundBox
+
+    gui = types.ModuleType('FreeCADGui')
+    gui.ActiveDocument = _GuiDocument()
+
+    part = types.ModuleType('Part')
+    part.makeBox, part.makeCylinder, part.makeSphere = makeBox, makeCylinder, makeSphere
+    part.Shape = Shape
+
+    this.Base = base
+    sys.modules['FreeCAD'] = this
+    sys.modules['FreeCAD.Base'] = base
+    sys.modules['FreeCADGui'] = gui
+    sys.modules['Part'] = part
+    return this
+
+
+def uninstall():
+    """
+    Puts back the modules install() replaced.
+    :return: None
+    """
+    for name, module in _previous.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    _previous.clear()
+
+
+######################################################
+# ------------------- GENERATORS ------------------- #
+######################################################
+
+def make_pin(doc, x=0.0, y=0.0, pitch=1.26, radii=(0.39, 0.40, 0.46), height=1.0, prefix=''):
+    """
+    Adds a pin cell (fuel, gap, clad and water regions built with Part::Cut) to doc.
+    :return: the visible objects [fuel, gap, clad, water]
+    """
+    z0 = -height / 2
+    cyls = []
+    for r in radii:
+        c = doc.addObject('Part::Cylinder', prefix + 'Cylinder')
+        c.Radius, c.Height = r, height
+        c.Placement = Placement(Vector(x, y, z0))
+        c.Visibility = False
+        cyls.append(c)
+
+    box = doc.addObject('Part::Box', prefix + 'Box')
+    box.Length = box.Width = pitch
+    box.Height = height
+    box.Placement = Placement(Vector(x - pitch / 2, y - pitch / 2, z0))
+    box.Visibility = False
+
+    regions = [cyls[0]]
+    for label, outer, inner in (('gap', cyls[1], cyls[0]), ('clad', cyls[2], cyls[1]), ('water', box, cyls[2])):
+        cut = doc.addObject('Part::Cut', prefix + 'Cut')
+        cut.Base, cut.Tool = outer, inner
+        cut.Label = prefix + label
+        regions.append(cut)
+    cyls[0].Label = prefix + 'fuel'
+    cyls[0].Visibility = True
+    return regions
+
+
+def make_lattice(n=17, pitch=1.26, doc=None, **pin):
+    """
+    :param n: the document holds n x n pins centered at the origin
+    :return: the document
+    """
+    doc = newDocument('Lattice') if doc is None else doc
+    offset = (n - 1) * pitch / 2
+    for i in range(n):
+        for j in range(n):
+            make_pin(doc, i * pitch - offset, j * pitch - offset, pitch, prefix=f"p{i}_{j}_", **pin)
+    return doc
+
+
+def make_chain(depth=100, doc=None):
+    """
+    :return: document with a chain of depth nested cuts of coaxial cylinders (deep DAG)
+    """
+    doc = newDocument('Chain') if doc is None else doc
+    current = doc.addObject('Part::Cylinder')
+    current.Radius = depth + 1.0
+    for k in range(depth):
+        tool = doc.addObject('Part::Cylinder')
+        tool.Radius = depth - k
+        tool.Visibility = False
+        current.Visibility = False
+        cut = doc.addObject('Part::Cut')
+        cut.Base, cut.Tool = current, tool
+        current = cut
+    return doc
+
+
+def visible(doc):
+    return [obj for obj in doc.Objects if obj.Visibility]
+
+
+def benchmark(n=17, repeat=3):
+    """
+    Times the converter core on an n x n lattice without FreeCAD. The stand-in is only
+    installed for the run; the OpenMC stage is skipped if openmc is not installed.
+    :return: dict stage -> best time in seconds over repeat runs
+    """
+    installed = bool(_previous)
+    install()
+    import dependencyindex
+    import CAD2MC
+    import CAD2MPACT
+
+    debug = CAD2MC.DEBUG, CAD2MPACT.DEBUG
+    CAD2MC.DEBUG = CAD2MPACT.DEBUG = False
+    timings = {}
+
+    def timed(stage, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            t = time.perf_counter() - start
+            best = t if best is None or t < best else best
+        timings[stage] = best
+
+    try:
+        timed('build document', lambda: make_lattice(n))
+        doc = make_lattice(n)
+        vis_objs = visible(doc)
+        timed('dependency index', lambda: dependencyindex.DependencyIndex(doc).levels())
+        if importlib.util.find_spec('openmc') is not None:
+            timed('OpenMC conversion', lambda: CAD2MC.vis_objs_to_OpenMC(vis_objs))
+        pin = newDocument('Pin')
+        make_pin(pin)
+        # MPACT levels are built from the primitives
+        primitives = [o for o in pin.Objects if o.TypeId in PRIMITIVES]
+        timed('MPACT model (pin)', lambda: CAD2MPACT.create_model(primitives))
+    finally:
+        CAD2MC.DEBUG, CAD2MPACT.DEBUG = debug
+        if not installed:
+            uninstall()
+
+    timings['objects'] = len(doc.Objects)
+    return timings
+
+
+if __name__ == '__main__':
+    for stage, value in benchmark().items():
+        print(f"{stage:20s} {value}")
@@ -0,0 +1,373 @@
+"""
+Structural diff of two geometry exports (OpenMC geometry.xml or an MPACT ParameterList deck).
+
+Surface IDs are renumbered on every export, so a text diff of two geometry.xml files
+shows changes everywhere. Here every surface is identified by its content (type,
+boundary, coefficients) and every cell region is hashed bottom-up over its expression
+tree with halfspaces referring to surface content, not to IDs. Intersections and unions
+hash their operands in sorted order, so '-5 -4 3' and '3 -5 -4' are the same region.
+Cells are matched by name (repeated names by order of appearance), so the diff is
+linear in the size of the files. A fill is hashed through the cells of the filled
+universe (or lattice), a material by its name and composition when a materials.xml lies
+next to both files. Surfaces that only changed coefficients are reported as modified:
+they are paired by their position in the regions of matched cells, or by type and
+boundary condition when that is unambiguous.
+
+For MPACT decks every ParameterList gets a Merkle hash over its Parameters and child
+lists; equal sub-trees are skipped without looking inside.
+
+Usage:
+    python geomdiff.py old/geometry.xml new/geometry.xml
+    (exit status 0 if the geometries are equal, 1 if they differ)
+
+    import geomdiff
+    diff = geomdiff.diff_files('old.xml', 'new.xml')
+    print(geomdiff.format_diff(diff))
+"""
+
+__title__ = "geomdiff.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import hashlib
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+Diff = namedtuple('Diff', ['kind', 'added', 'removed', 'modified'])
+
+
+def _hash(*parts):
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(str(p).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+######################################################
+# ------------------- OPENMC ----------------------- #
+######################################################
+
+_TOKEN = re.compile(r'\s*(\d+|[-+~()|])')
+
+
+def surface_key(element):
+    """
+    :param element: <surface> element
+    :return: canonical description of the surface, independent of its id
+             (e.g. 'z-plane reflective 0.5')
+    """
+    coeffs = " ".join(repr(round(float(c), 9)) for c in element.get('coeffs', '').split())
+    return f"{element.get('type')} {element.get('boundary', 'transmission')} {coeffs}"
+
+
+def region_hash(region, surfaces):
+    """
+    Hashes a geometry.xml region expression by surface content.
+    :param region: region string, e.g. '-5 -4 3 ~(-8 | 7)'
+    :param surfaces: dict surface id (str) -> surface_key
+    :return: hash, '' for an empty region
+    """
+    tokens = [t for t in _TOKEN.findall(region)]
+    pos = [0]
+
+    def peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else None
+
+    def take():
+        pos[0] += 1
+        return tokens[pos[0] - 1]
+
+    def union():
+        nodes = [intersection()]
+        while peek() == '|':
+            take()
+            nodes.append(intersection())
+        return nodes[0] if len(nodes) == 1 else _hash('|', *sorted(nodes))
+
+    def intersection():
+        nodes = [factor()]
+        while peek() not in (None, '|', ')'):
+            nodes.append(factor())
+        return nodes[0] if len(nodes) == 1 else _hash('&', *sorted(nodes))
+
+    def factor():
+        t = take()
+        if t == '(':
+            node = union()
+            take()      # ')'
+            return node
+        if t == '~':
+            return _hash('~', factor())
+        side = '+'
+        if t in '+-':
+            side, t = t, take()
+        return _hash(side, surfaces.get(t, 'missing surface ' + t))
+
+    return union() if tokens else ''
+
+
+def material_hashes(root):
+    """
+    :param root: <materials> element
+    :return: dict material id -> hash of its name and composition
+    """
+    out = {}
+    for m in root.iter('material'):
+        content = sorted((c.tag, tuple(sorted(c.attrib.items()))) for c in m)
+        out[m.get('id')] = _hash('material', m.get('name', ''), *content)
+    return out
+
+
+def openmc_summary(root, materials=None):
+    """
+    :param root: <geometry> element
+    :param materials: material_hashes() of the materials.xml next to it; without it
+                      materials are compared by ID
+    :return: dict with 'cells' (key -> hash), 'surfaces' (surface_key -> count),
+             'keys' (surface id -> surface_key) and 'regions' (cell key -> region string)
+    """
+    surfaces = {}
+    counts = {}
+    for s in root.iter('surface'):
+        h = surface_key(s)
+        surfaces[s.get('id')] = h
+        counts[h] = counts.get(h, 0) + 1
+
+    universes = {}
+    for c in root.iter('cell'):
+        universes.setdefault(c.get('universe', '0'), []).append(c)
+    lattices = dict((l.get('id'), l) for l in root.iter('lattice'))
+    memo = {}
+
+    def fill_hash(fill):
+        # fills are compared by what they contain, the universe IDs are renumbered too
+        if fill in memo:
+            return memo[fill]
+        memo[fill] = 'cyclic fill ' + fill
+        if fill in universes:
+            h = _hash('universe', *sorted(cell_hash(c) for c in universes[fill]))
+        elif fill in lattices:
+            l = lattices[fill]
+            items = [(e.tag, (e.text or '').split()) for e in l if e.tag != 'universes']
+            inner = [fill_hash(u) for e in l if e.tag == 'universes' for u in (e.text or '').split()]
+            h = _hash('lattice', l.get('type', 'rectangular'), items, *inner)
+        else:
+            h = 'missing fill ' + fill
+        memo[fill] = h
+        return h
+
+    def cell_hash(c):
+        fill = c.get('fill')
+        if fill is not None:
+            content = ('fill', fill_hash(fill))
+        else:
+            material = c.get('material', 'void')
+            content = ('material', material if materials is None or material == 'void'
+                       else materials.get(material, 'missing material ' + material))
+        return _hash('cell', region_hash(c.get('region', ''), surfaces), *content)
+
+    cells = {}
+    regions = {}
+    seen = {}
+    for c in root.iter('cell'):
+        name = c.get('name', '')
+        # repeated names (e.g. the same pin in many universes) are told apart by order
+        n = seen[name] = seen.get(name, 0) + 1
+        key = name if n == 1 else f"{name} #{n}"
+        cells[key] = cell_hash(c)
+        regions[key] = c.get('region', '')
+    return {'cells': cells, 'surfaces': counts, 'keys': surfaces, 'regions': regions}
+
+
+def modified_surfaces(old, new, added, removed):
+    """
+    Pairs added and removed surfaces that are the same surface with new coefficients.
+    Surfaces are paired position by position in the regions of cells with the same key
+    and the same region structure; what is left is paired by (type, boundary) when that
+    leaves no choice.
+    :param old, new: openmc_summary() results
+    :param added, removed: dict surface_key -> count; the pairs are taken out of them
+    :return: list of 'old key -> new key'
+    """
+    modified = []
+
+    def pair(a, b):
+        if a != b and removed.get(a, 0) > 0 and added.get(b, 0) > 0:
+            removed[a] -= 1
+            added[b] -= 1
+            modified.append(f"{a} -> {b}")
+
+    for key, region in old['regions'].items():
+        other = new['regions'].get(key)
+        if other is None:
+            continue
+        a, b = _TOKEN.findall(region), _TOKEN.findall(other)
+        if len(a) != len(b) or any(x != y for x, y in zip(a, b) if not (x.isdigit() and y.isdigit())):
+            continue
+        for x, y in zip(a, b):
+            if x.isdigit():
+                pair(old['keys'].get(x), new['keys'].get(y))
+
+    def kind(k):
+        return tuple(k.split()[:2])
+
+    for a in sorted(k for k, n in removed.items() if n > 0):
+        candidates = [b for b, n in added.items() if n > 0 and kind(b) == kind(a)]
+        rivals = [r for r, n in removed.items() if n > 0 and kind(r) == kind(a)]
+        if len(candidates) == 1 and len(rivals) == 1 and added[candidates[0]] == 1 and removed[a] == 1:
+            pair(a, candidates[0])
+    return sorted(modified)
+
+
+def diff_openmc(old, new, old_materials=None, new_materials=None):
+    """
+    :param old, new: <geometry> elements
+    :param old_materials, new_materials: optional material_hashes() of their materials
+    :return: list of Diff ('cell' and 'surface')
+    """
+    a = openmc_summary(old, old_materials)
+    b = openmc_summary(new, new_materials)
+    added = dict((h, n - a['surfaces'].get(h, 0)) for h, n in b['surfaces'].items()
+                 if n > a['surfaces'].get(h, 0))
+    removed = dict((h, n - b['surfaces'].get(h, 0)) for h, n in a['surfaces'].items()
+                   if n > b['surfaces'].get(h, 0))
+    modified = modified_surfaces(a, b, added, removed)
+    return [_diff_dicts('cell', a['cells'], b['cells']),
+            Diff('surface',
+                 sorted(h for h, n in added.items() if n > 0),
+                 sorted(h for h, n in removed.items() if n > 0),
+                 modified)]
+
+
+######################################################
+# ------------------- MPACT ------------------------ #
+######################################################
+
+def parameter_list_hash(element, memo):
+    """
+    Merkle hash of a ParameterList; memo maps elements to their hashes
+    """
+    parts = []
+    for child in element:
+        if child.tag == 'Parameter':
+            parts.append(_hash('P', child.get('name'), child.get('type'), child.get('value')))
+        elif child.tag == 'ParameterList':
+            parts.append(_hash('L', child.get('name'), parameter_list_hash(child, memo)))
+    memo[element] = h = _hash(*parts)
+    return h
+
+
+def diff_parameter_lists(old, new, path, memo, out):
+    """
+    Compares two ParameterLists, descending only into sub-trees whose hashes differ.
+    :param out: Diff('parameter') lists to append 'path/name' entries to
+    """
+    if memo[old] == memo[new]:
+        return
+
+    def children(e):
+        return dict(((c.tag, c.get('name')), c) for c in e if c.tag in ('Parameter', 'ParameterList'))
+
+    a, b = children(old), children(new)
+    for key in b:
+        if key not in a:
+            out.added.append(f"{path}/{key[1]}")
+    for key, c in a.items():
+        p = f"{path}/{key[1]}"
+        if key not in b:
+            out.removed.append(p)
+        elif key[0] == 'Parameter':
+            if (c.get('type'), c.get('value')) != (b[key].get('type'), b[key].get('value')):
+                out.modified.append(f"{p}: {c.get('value')} -> {b[key].get('value')}")
+        else:
+            diff_parameter_lists(c, b[key], p, memo, out)
+
+
+def diff_mpact(old, new):
+    """
+    :param old, new: root ParameterList elements
+    :return: list with one Diff ('parameter')
+    """
+    memo = {}
+    parameter_list_hash(old, memo)
+    parameter_list_hash(new, memo)
+    out = Diff('parameter', [], [], [])
+    if old.get('name') != new.get('name'):
+        out.modified.append(f"/: {old.get('name')} -> {new.get('name')}")
+    diff_parameter_lists(old, new, "/" + (new.get('name') or ''), memo, out)
+    return [out]
+
+
+######################################################
+# -------------------- DRIVER ---------------------- #
+######################################################
+
+def _diff_dicts(kind, old, new):
+    return Diff(kind,
+                sorted(k for k in new if k not in old),
+                sorted(k for k in old if k not in new),
+                sorted(k for k in old if k in new and old[k] != new[k]))
+
+
+def _sibling_materials(path):
+    """
+    :return: material_hashes() of the materials.xml next to path, None if there is none
+    """
+    materials = os.path.join(os.path.dirname(os.path.abspath(path)), 'materials.xml')
+    if not os.path.exists(materials):
+        return None
+    return material_hashes(ET.parse(materials).getroot())
+
+
+def diff_files(old_path, new_path):
+    """
+    :return: list of Diff; all lists empty if the geometries are equal
+    """
+    old = ET.parse(old_path).getroot()
+    new = ET.parse(new_path).getroot()
+    if old.tag != new.tag:
+        raise ValueError(f"Cannot compare a <{old.tag}> with a <{new.tag}> file")
+    if old.tag == 'geometry':
+        materials = _sibling_materials(old_path), _sibling_materials(new_path)
+        # materials are compared by content only if both sides have a materials.xml
+        if None in materials:
+            materials = None, None
+        return diff_openmc(old, new, *materials)
+    if old.tag == 'ParameterList':
+        return diff_mpact(old, new)
+    raise ValueError(f"Unknown geometry format <{old.tag}>")
+
+
+def is_equal(diffs):
+    return not any(d.added or d.removed or d.modified for d in diffs)
+
+
+def format_diff(diffs):
+    """
+    :return: text report of diffs
+    """
+    lines = []
+    for d in diffs:
+        for label, entries in (('added', d.added), ('removed', d.removed), ('modified', d.modified)):
+            for e in entries:
+                lines.append(f"{label:8s} {d.kind} {e}")
+    return "\n".join(lines) if lines else "geometries are equal"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: python geomdiff.py OLD.xml NEW.xml")
+        return 2
+    diffs = diff_files(argv[0], argv[1])
+    print(format_diff(diffs))
+    return 0 if is_equal(diffs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
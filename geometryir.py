@@ -0,0 +1,323 @@
+"""
+Lightweight internal representation of OpenMC geometry.
+
+openmc.Surface, Halfspace, Intersection and Union objects are heavy and register global
+IDs the moment they are created, so the converters do not build them. They work on
+
+    SurfaceTable: the unique surfaces of a model, entry i = (type, boundary type,
+                  ((coefficient, value), ...)); equal surfaces are added only once
+    Region:       a region program, an array of ints in postfix order; a token t >= 0 is
+                  the halfspace of surface t // 2 (t odd: positive side, t even: negative
+                  side), the negative tokens AND, OR and NOT combine the last one or two
+                  operands
+
+e.g. +fuel_or & -clad_ir with fuel_or = 0 and clad_ir = 1 is [1, 2, AND]. Regions support
+the operators of openmc regions (&, |, ~) and table surfaces support + and -.
+
+The OpenMC objects are only created at export by a Materializer, once per surface and
+once per distinct region. The table and programs are also plain JSON (to_data), which
+is what the conversion cache (conversioncache.py) stores.
+
+Usage:
+    surfaces = SurfaceTable()
+    cyl = surfaces.add('ZCylinder', x0=0.0, y0=0.0, R=0.39)
+    top = surfaces.add('ZPlane', z0=0.5, boundary_type='reflective')
+    fuel = -cyl & -top
+    cell.region = Materializer(surfaces).region(fuel)
+"""
+
+__title__ = "geometryir.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import threading
+from array import array
+from collections import namedtuple
+
+from lazyimport import LazyModule
+
+openmc = LazyModule('openmc')
+
+AND, OR, NOT = -1, -2, -3
+
+# self-contained region: its own surface entries and a program indexing them
+RegionIR = namedtuple('RegionIR', ['surfaces', 'program'])
+
+
+class SurfaceRef(namedtuple('SurfaceRef', ['index'])):
+    """
+    Surface of a SurfaceTable; +ref and -ref are its halfspaces
+    """
+    __slots__ = ()
+
+    def __pos__(self):
+        return Region([2 * self.index + 1])
+
+    def __neg__(self):
+        return Region([2 * self.index])
+
+
+class Region:
+    """
+    Region program over the surfaces of a SurfaceTable
+    """
+    __slots__ = ('program',)
+
+    def __init__(self, program):
+        self.program = array('i', program)
+
+    def _combine(self, other, op):
+        program = array('i', self.program)
+        program.extend(other.program)
+        program.append(op)
+        return Region(program)
+
+    def __and__(self, other):
+        return self._combine(other, AND)
+
+    def __or__(self, other):
+        return self._combine(other, OR)
+
+    def __invert__(self):
+        # the complement of a halfspace is the other halfspace
+        if len(self.program) == 1:
+            return Region([self.program[0] ^ 1])
+        program = array('i', self.program)
+        program.append(NOT)
+        return Region(program)
+
+    def halfspaces(self):
+        """
+        :return: the halfspace tokens if the region is an intersection of halfspaces, else None
+        """
+        if all(t >= 0 or t == AND for t in self.program):
+            return [t for t in self.program if t >= 0]
+        return None
+
+    def surfaces(self):
+        """
+        :return: set of the surface indices the region uses
+        """
+        return set(t // 2 for t in self.program if t >= 0)
+
+    def key(self):
+        """
+        :return: hashable identity of the program
+        """
+        return self.program.tobytes()
+
+    def __repr__(self):
+        stack = []
+        for t in self.program:
+            if t >= 0:
+                stack.append(('+' if t % 2 else '-') + str(t // 2))
+            elif t == NOT:
+                stack.append('~(' + stack.pop() + ')')
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(f"({left} {right})" if t == AND else f"({left} | {right})")
+        return f"Region{stack[0] if len(stack) == 1 else stack}"
+
+
+class SurfaceTable:
+    """
+    Unique surfaces of a model
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, i):
+        return self.entries[i]
+
+    def add(self, kind, boundary_type='transmission', **coeffs):
+        """
+        :param kind: OpenMC surface class name ('ZPlane', 'ZCylinder', ...)
+        :param boundary_type: OpenMC boundary type
+        :param coeffs: keyword coefficients of the class (x0=, R=, ...)
+        :return: SurfaceRef, the same for equal surfaces
+        """
+        entry = (kind, boundary_type, tuple(sorted((k, round(float(v), 9)) for k, v in coeffs.items())))
+        i = self.ids.get(entry)
+        if i is None:
+            with self._lock:
+                i = self.ids.get(entry)
+                if i is None:
+                    i = len(self.entries)
+                    self.entries.append(entry)
+                    self.ids[entry] = i
+        return SurfaceRef(i)
+
+    def export(self, region):
+        """
+        :param region: Region over this table
+        :return: RegionIR with only the surfaces region uses, renumbered
+        """
+        local = {}
+        surfaces = []
+        program = []
+        for t in region.program:
+            if t >= 0:
+                i = local.get(t // 2)
+                if i is None:
+                    i = local[t // 2] = len(surfaces)
+                    surfaces.append(self.entries[t // 2])
+                t = 2 * i + t % 2
+            program.append(t)
+        return RegionIR(surfaces, program)
+
+    def load(self, ir):
+        """
+        Inverse of export: adds the surfaces of ir to the table.
+        :param ir: RegionIR
+        :return: Region over this table
+        """
+        ids = [self.add(kind, boundary, **dict(coeffs)).index for kind, boundary, coeffs in ir.surfaces]
+        return Region(t if t < 0 else 2 * ids[t // 2] + t % 2 for t in ir.program)
+
+
+class Materializer:
+    """
+    Creates the OpenMC objects of a SurfaceTable's surfaces and regions, each only once
+    """
+
+    def __init__(self, table, ids=None):
+        """
+        :param table: SurfaceTable
+        :param ids: optional idallocator.IDBlock for the surface IDs. Surfaces are numbered
+                    in the order they are materialized (the export order), not in table
+                    order, so the IDs do not depend on which worker added a surface first.
+        """
+        self.table = table
+        self.ids = ids
+        self.surfaces = {}
+        self.regions = {}
+
+    def surface(self, i):
+        """
+        :return: openmc.Surface of table entry i
+        """
+        surface = self.surfaces.get(i)
+        if surface is None:
+            kind, boundary, coeffs = self.table[i]
+            surface_id = self.ids.next() if self.ids is not None else None
+            surface = getattr(openmc, kind)(surface_id=surface_id, boundary_type=boundary, **dict(coeffs))
+            self.surfaces[i] = surface
+        return surface
+
+    def region(self, region):
+        """
+        :param region: Region over the table
+        :return: openmc.Region
+        """
+        key = region.key()
+        result = self.regions.get(key)
+        if result is not None:
+            return result
+
+        stack = []
+        for t in region.program:
+            if t >= 0:
+                surface = self.surface(t // 2)
+                stack.append(+surface if t % 2 else -surface)
+            elif t == NOT:
+                stack.append(~stack.pop())
+            else:
+                # flatten chains of the same operator into one Intersection/Union
+                cls = openmc.Intersection if t == AND else openmc.Union
+                right = stack.pop()
+                left = stack.pop()
+                nodes = []
+                for node in (left, right):
+                    nodes.extend(getattr(node, 'nodes', node) if isinstance(node, cls) else [node])
+                stack.append(cls(nodes))
+
+        if len(stack) != 1:
+            raise ValueError("Malformed region program")
+        self.regions[key] = stack[0]
+        return stack[0]
+
+
+######################################################
+# ------------------ XML TEXT ---------------------- #
+######################################################
+
+# OpenMC geometry.xml type and coefficient order of the surface classes
+SURFACE_XML = {
+    'XPlane': ('x-plane', ('x0',)),
+    'YPlane': ('y-plane', ('y0',)),
+    'ZPlane': ('z-plane', ('z0',)),
+    'Plane': ('plane', ('A', 'B', 'C', 'D')),
+    'XCylinder': ('x-cylinder', ('y0', 'z0', 'R')),
+    'YCylinder': ('y-cylinder', ('x0', 'z0', 'R')),
+    'ZCylinder': ('z-cylinder', ('x0', 'y0', 'R')),
+    'Sphere': ('sphere', ('x0', 'y0', 'z0', 'R')),
+}
+
+
+def surface_xml(surface_id, entry):
+    """
+    Writes a surface table entry as a geometry.xml element without creating openmc objects.
+    :param surface_id: ID of the surface
+    :param entry: (type, boundary type, coefficients) of a SurfaceTable
+    :return: '<surface ... />' line
+    """
+    kind, boundary, coeffs = entry
+    xml_type, order = SURFACE_XML[kind]
+    coeffs = dict(coeffs)
+    boundary = '' if boundary == 'transmission' else f'boundary="{boundary}" '
+    values = " ".join(repr(float(coeffs.get(c, 0.0))) for c in order)
+    return f'  <surface {boundary}coeffs="{values}" id="{surface_id}" type="{xml_type}" />\n'
+
+
+def region_text(program, surface_id):
+    """
+    Writes a region program in the infix notation of geometry.xml.
+    :param program: region program (ints)
+    :param surface_id: surface_id(surface index) -> ID written to the file
+    :return: e.g. '-5 -4 3' or '(1 | -2) ~(3 -4)'
+    """
+    # entries are (text, operator) so that only nested unions need parentheses
+    stack = []
+    for t in program:
+        if t >= 0:
+            stack.append((('' if t % 2 else '-') + str(surface_id(t // 2)), None))
+        elif t == NOT:
+            stack.append((f"~({stack.pop()[0]})", None))
+        else:
+            right = stack.pop()
+            left = stack.pop()
+            if t == AND:
+                parts = [f"({s})" if op == OR else s for s, op in (left, right)]
+                stack.append((" ".join(parts), AND))
+            else:
+                stack.append((f"{left[0]} | {right[0]}", OR))
+    if len(stack) != 1:
+        raise ValueError("Malformed region program")
+    return stack[0][0]
+
+
+def to_data(ir):
+    """
+    :return: ir as JSON-serializable lists
+    """
+    return {'surfaces': [[kind, boundary, [list(c) for c in coeffs]]
+                         for kind, boundary, coeffs in ir.surfaces],
+            'program': list(ir.program)}
+
+
+def from_data(data):
+    """
+    :param data: output of to_data
+    :return: RegionIR
+    """
+    return RegionIR([(kind, boundary, tuple(tuple(c) for c in coeffs))
+                     for kind, boundary, coeffs in data['surfaces']],
+                    list(data['program']))
@@ -0,0 +1,73 @@
+"""
+Deferred imports for the converter backends.
+
+openmc, FreeCAD, FreeCADGui, Part and lxml take seconds to import and a worker that only
+writes one output format needs just one of them. A LazyModule stands in for a module at
+import time and imports the real one on first attribute access, so
+    openmc = LazyModule('openmc')
+    openmc.ZPlane(...)    # openmc is imported here
+costs nothing until a conversion actually runs, and the module is never imported if the
+code path that uses it is not taken.
+
+Usage:
+    from lazyimport import LazyModule
+    etree = LazyModule('lxml.etree')
+    Base = LazyModule('FreeCAD.Base', lambda: FreeCAD.Base)
+    LazyModule.loaded(etree)   # -> False until first use
+
+Remark: Python 3.6 has no module level __getattr__ (PEP 562), hence the proxy object.
+"""
+
+__title__ = "lazyimport.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Proxy that imports a module on first attribute access
+    """
+
+    def __init__(self, name, loader=None, setup=None):
+        """
+        :param name: dotted module name
+        :param loader: optional loader() -> module, instead of importlib.import_module(name)
+        :param setup: optional setup() called once right before the import (e.g. to
+                      extend sys.path)
+        """
+        types.ModuleType.__init__(self, name)
+        self.__dict__['_loader'] = loader
+        self.__dict__['_setup'] = setup
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            if self.__dict__['_setup'] is not None:
+                self.__dict__['_setup']()
+            loader = self.__dict__['_loader']
+            module = loader() if loader is not None else importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        # only called for attributes the proxy itself does not have
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return "<lazy module '%s' (%s)>" % (self.__name__, state)
+
+    @staticmethod
+    def loaded(module):
+        """
+        :return: False only for a LazyModule that has not been imported yet
+        """
+        return not isinstance(module, LazyModule) or module.__dict__['_module'] is not None
@@ -0,0 +1,246 @@
+"""
+Bulk per-cell material clones for depletion models.
+
+Depletion needs its own material in every fuel pin, i.e. thousands of materials that
+only differ in ID, name and volume. Building each one as an openmc.Material with
+add_nuclide/add_element is slow and keeps a full copy of the composition per pin.
+Instead the composition of the base material is read once into a Composition (density
+and the nuclide/element/sab entries) and every MaterialClone refers to that same
+Composition. A clone gets a private copy only when it is modified (copy on write):
+
+    base = Composition.from_material(uo2)
+    pins = clone(base, 264, name='uo2 pin {i}', ids=ids.block('material', 'pins'))
+    pins[7].set_density('g/cm3', 10.1)          # only pins[7] copies the composition
+    write_materials('materials.xml', [zirconium, water], pins)
+
+write_materials streams the file: each composition's XML body is formatted once and
+written for every clone that shares it, no element tree is built.
+
+Remark: clones are not openmc.Material objects and cannot fill an openmc.Cell. Give the
+clone's id as the 'material' of a cell of CAD2MC.export_sharded, which writes cells from
+plain data, or create the openmc object of a single clone with to_material().
+"""
+
+__title__ = "materialclones.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+from xml.sax.saxutils import quoteattr
+
+from lazyimport import LazyModule
+
+openmc = LazyModule('openmc')
+
+MATERIALS_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<materials>\n"
+MATERIALS_FOOTER = "</materials>\n"
+
+
+def _element(tag, attrs, indent="    "):
+    text = " ".join(f"{k}={quoteattr(str(v))}" for k, v in attrs)
+    return f"{indent}<{tag} {text} />\n"
+
+
+class Composition:
+    """
+    Density and composition entries shared by many materials
+    """
+    __slots__ = ('density', 'entries', 'attrs', 'name', '_body')
+
+    def __init__(self, density, entries, attrs=(), name=''):
+        """
+        :param density: (units, value), e.g. ('g/cm3', 10.0)
+        :param entries: tuple of (tag, ((attribute, value), ...)) for the <nuclide>,
+                        <element>, <sab>, ... children of <material>
+        :param attrs: (attribute, value) pairs of <material> shared by the clones,
+                      e.g. (('temperature', '900.0'),)
+        :param name: name of the base material
+        """
+        self.density = density
+        self.entries = tuple(entries)
+        self.attrs = tuple(attrs)
+        self.name = name
+        self._body = None
+
+    @staticmethod
+    def from_material(material):
+        """
+        :param material: openmc.Material
+        :return: its Composition
+        """
+        element = material.to_xml_element()
+        density = None
+        entries = []
+        for child in element:
+            if child.tag == 'density':
+                density = (child.get('units'), child.get('value'))
+            else:
+                entries.append((child.tag, tuple(sorted(child.attrib.items()))))
+        attrs = tuple(sorted((k, v) for k, v in element.attrib.items()
+                             if k not in ('id', 'name', 'volume')))
+        return Composition(density, entries, attrs, material.name or '')
+
+    def body(self):
+        """
+        :return: XML text of the children of <material>, formatted once
+        """
+        if self._body is None:
+            lines = []
+            if self.density is not None:
+                units, value = self.density
+                attrs = (('units', units),) if value is None else (('units', units), ('value', value))
+                lines.append(_element('density', attrs))
+            lines.extend(_element(tag, attrs) for tag, attrs in self.entries)
+            self._body = "".join(lines)
+        return self._body
+
+    def copy(self):
+        return Composition(self.density, self.entries, self.attrs, self.name)
+
+
+class MaterialClone:
+    """
+    Material with its own ID, name and volume and a possibly shared Composition
+    """
+    __slots__ = ('id', 'name', 'volume', 'composition', '_shared')
+
+    def __init__(self, material_id, name, composition, volume=None):
+        self.id = material_id
+        self.name = name
+        self.volume = volume
+        self.composition = composition
+        self._shared = True
+
+    def _own(self):
+        # copy on write: the first modification detaches the clone from the shared composition
+        if self._shared:
+            self.composition = self.composition.copy()
+            self._shared = False
+        return self.composition
+
+    def set_density(self, units, density=None):
+        c = self._own()
+        c.density = (units, None if density is None else str(density))
+        c._body = None
+
+    def add_nuclide(self, nuclide, percent, percent_type='ao'):
+        self.remove_nuclide(nuclide)
+        c = self.composition
+        c.entries += (('nuclide', ((percent_type, str(percent)), ('name', nuclide))),)
+        c._body = None
+
+    def remove_nuclide(self, nuclide):
+        c = self._own()
+        c.entries = tuple(e for e in c.entries if not (e[0] == 'nuclide' and dict(e[1]).get('name') == nuclide))
+        c._body = None
+
+    @property
+    def nuclides(self):
+        """
+        :return: list of (name, percent, percent_type) of the <nuclide> entries
+        """
+        out = []
+        for tag, attrs in self.composition.entries:
+            if tag == 'nuclide':
+                d = dict(attrs)
+                kind = 'wo' if 'wo' in d else 'ao'
+                out.append((d['name'], float(d[kind]), kind))
+        return out
+
+    def to_xml(self):
+        """
+        :return: <material> element text
+        """
+        c = self.composition
+        attrs = [('id', self.id), ('name', self.name)] + list(c.attrs)
+        if self.volume is not None:
+            attrs.append(('volume', self.volume))
+        head = " ".join(f"{k}={quoteattr(str(v))}" for k, v in sorted(attrs))
+        return f"  <material {head}>\n{c.body()}  </material>\n"
+
+    def to_material(self):
+        """
+        :return: openmc.Material equal to the clone (nuclides, elements and sab only)
+        """
+        material = openmc.Material(self.id, self.name)
+        c = self.composition
+        if c.density is not None:
+            units, value = c.density
+            material.set_density(units, None if value is None else float(value))
+        for tag, attrs in c.entries:
+            d = dict(attrs)
+            kind = 'wo' if 'wo' in d else 'ao'
+            if tag == 'nuclide':
+                material.add_nuclide(d['name'], float(d[kind]), kind)
+            elif tag == 'element':
+                material.add_element(d['name'], float(d[kind]), kind)
+            elif tag == 'sab':
+                material.add_s_alpha_beta(d['name'], float(d.get('fraction', 1.0)))
+        if self.volume is not None:
+            material.volume = self.volume
+        return material
+
+
+def clone(base, n, name='{name} {i}', ids=None, start=None, volume=None):
+    """
+    :param base: Composition or openmc.Material
+    :param n: number of clones
+    :param name: format string of the clone names ({name}: base name, {i}: 0 ... n-1)
+    :param ids: idallocator.IDBlock for the material IDs; else IDs count up from start
+    :param start: first ID without ids (1 if None)
+    :param volume: volume of every clone (cm3), e.g. for depletion
+    :return: list of n MaterialClone sharing one Composition
+    """
+    composition = base if isinstance(base, Composition) else Composition.from_material(base)
+    first = 1 if start is None else start
+    return [MaterialClone(ids.next() if ids is not None else first + i,
+                          name.format(name=composition.name, i=i), composition, volume)
+            for i in range(n)]
+
+
+def write_materials(path, materials=(), clones=()):
+    """
+    Writes materials.xml in one streaming pass.
+    :param path: output file
+    :param materials: openmc.Material objects written as openmc formats them
+    :param clones: MaterialClone objects
+    :return: number of materials written
+    :raises ValueError: if two of the materials and clones have the same ID
+    """
+    seen = set()
+    for m in list(materials) + list(clones):
+        if m.id in seen:
+            raise ValueError(f"Material ID {m.id} is used twice ({m.name!r})")
+        seen.add(m.id)
+
+    count = 0
+    with open(path, 'w') as f:
+        f.write(MATERIALS_HEADER)
+        if materials:
+            import xml.etree.ElementTree as ET
+            for material in materials:
+                element = material.to_xml_element()
+                _indent(element, 1)
+                f.write("  " + ET.tostring(element, encoding='unicode'))
+                count += 1
+        buffer = []
+        for c in clones:
+            buffer.append(c.to_xml())
+            if len(buffer) >= 1024:
+                f.write("".join(buffer))
+                buffer = []
+            count += 1
+        f.write("".join(buffer))
+        f.write(MATERIALS_FOOTER)
+    return count
+
+
+def _indent(element, level):
+    pad = "\n" + "  " * level
+    if len(element):
+        element.text = pad + "  "
+        for child in element:
+            _indent(child, level + 1)
+            child.tail = pad + "  "
+        child.tail = pad
+    element.tail = "\n"
@@ -0,0 +1,225 @@
+"""
+Rule based assignment of materials to CAD objects.
+
+A rule maps object Labels, or group paths ('Core/Assembly_3/Pin_12/fuel', the Labels of
+the enclosing App::DocumentObjectGroups and the object), to a material and a cell name.
+Rules are kept in a JSON file:
+
+    {
+        "ignore_case": false,
+        "rules": [
+            {"match": "*fuel*", "material": "uo2", "cell": "fuel"},
+            {"match": "Core/*/GuideTube*/*", "on": "path", "material": "h2o"},
+            {"match": "clad(ding)?_\\d+", "regex": true, "material": "zirconium"},
+            {"match": "*gap*", "material": null}
+        ],
+        "materials": {
+            "uo2": {"density": ["g/cm3", 10.0],
+                    "nuclides": [["U235", 0.03], ["U238", 0.97], ["O16", 2.0]]},
+            "h2o": {"density": ["g/cm3", 1.0], "nuclides": [["H1", 2.0]],
+                    "elements": [["O", 1.0]], "sab": ["c_H_in_H2O"]}
+        }
+    }
+
+    match     glob pattern (or regular expression with "regex": true) for the whole
+              Label or path
+    on        "label" (default) or "path"
+    material  material name, null for a void cell
+    cell      cell name, the object's Label if missing
+
+The optional "materials" section defines the materials the rules refer to by name:
+density [units, value], and lists of nuclides and elements [name, percent(, percent
+type)] and of S(a,b) tables. Without it the converter falls back to DEFAULT_MATERIALS.
+
+The first rule in file order that matches wins. All patterns of one kind are compiled
+into a single regular expression, so every object is matched in one pass, however many
+rules there are. Objects no rule matches are collected and reported together.
+
+Usage:
+    rules = MaterialRules.load('materials.json')
+    assignments, unmatched = rules.assign(vis_objs)
+    print(rules.report(unmatched)) if unmatched else None
+"""
+
+__title__ = "materialrules.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import fnmatch
+import json
+import re
+from collections import namedtuple
+
+Rule = namedtuple('Rule', ['match', 'on', 'regex', 'material', 'cell'])
+Assignment = namedtuple('Assignment', ['index', 'obj', 'material', 'cell', 'rule'])
+
+MATERIAL_KEYS = ('density', 'nuclides', 'elements', 'sab')
+
+# the materials CAD2MC.script used to define in code
+DEFAULT_MATERIALS = {
+    'uo2': {'density': ['g/cm3', 10.0], 'nuclides': [['U235', 0.03], ['U238', 0.97], ['O16', 2.0]]},
+    'zirconium': {'density': ['g/cm3', 6.6], 'elements': [['Zr', 1.0]]},
+    'h2o': {'density': ['g/cm3', 1.0], 'nuclides': [['H1', 2.0]], 'elements': [['O', 1.0]],
+            'sab': ['c_H_in_H2O']},
+}
+
+# the fuel/gap/clad/water pin cell CAD2MC.script was written for
+DEFAULT_RULES = {
+    'rules': [
+        {'match': '*fuel*', 'material': 'uo2', 'cell': 'fuel'},
+        {'match': '*gap*', 'material': None, 'cell': 'air gap'},
+        {'match': '*clad*', 'material': 'zirconium', 'cell': 'clad'},
+        {'match': '*water*', 'material': 'h2o', 'cell': 'moderator'},
+    ]
+}
+
+
+def check_materials(materials):
+    """
+    :param materials: dict material name -> definition (see the module docstring)
+    :return: materials as a new dict
+    :raises ValueError: if a definition has unknown keys or no density
+    """
+    for name, definition in materials.items():
+        unknown = set(definition).difference(MATERIAL_KEYS)
+        if unknown:
+            raise ValueError(f"Material {name!r}: unknown keys {sorted(unknown)}")
+        if 'density' not in definition:
+            raise ValueError(f"Material {name!r}: no density")
+    return dict(materials)
+
+
+def group_paths(objs):
+    """
+    :param objs: document objects
+    :return: dict object Name -> 'Group/SubGroup/Label' path
+    """
+    parents = {}
+    docs = []
+    for obj in objs:
+        doc = getattr(obj, 'Document', None)
+        if doc is not None and doc not in docs:
+            docs.append(doc)
+    for doc in docs:
+        for group in doc.Objects:
+            for child in getattr(group, 'Group', None) or []:
+                parents[child.Name] = group
+
+    memo = {}
+
+    def path(obj):
+        p = memo.get(obj.Name)
+        if p is None:
+            parent = parents.get(obj.Name)
+            p = obj.Label if parent is None else path(parent) + '/' + obj.Label
+            memo[obj.Name] = p
+        return p
+
+    return dict((obj.Name, path(obj)) for obj in objs)
+
+
+class MaterialRules:
+    """
+    Compiled rule table
+    """
+
+    def __init__(self, rules, ignore_case=False, materials=None):
+        """
+        :param rules: list of Rule or of rule dicts (see the module docstring)
+        :param ignore_case: match patterns case insensitively
+        :param materials: dict material name -> definition (see the module docstring)
+        """
+        self.materials = check_materials(materials or {})
+        self.rules = [r if isinstance(r, Rule) else
+                      Rule(r['match'], r.get('on', 'label'), r.get('regex', False),
+                           r.get('material'), r.get('cell'))
+                      for r in rules]
+        flags = re.IGNORECASE if ignore_case else 0
+        self.patterns = {}
+        self._rule_of_group = {}    # kind -> {group number of a rule's alternative: rule index}
+        for on in ('label', 'path'):
+            parts = []
+            groups = {}
+            group = 1
+            for i, rule in enumerate(self.rules):
+                if rule.on not in ('label', 'path'):
+                    raise ValueError(f"Rule {i} ({rule.match!r}): 'on' must be 'label' or 'path'")
+                if rule.on != on:
+                    continue
+                # the group anchors every alternative of a regex, not only the last one
+                pattern = f"(?:{rule.match})\\Z" if rule.regex else fnmatch.translate(rule.match)
+                try:
+                    compiled = re.compile(pattern, flags)
+                except re.error as e:
+                    raise ValueError(f"Rule {i} ({rule.match!r}): {e}")
+                if compiled.groupindex:
+                    raise ValueError(f"Rule {i} ({rule.match!r}): named groups are not supported")
+                # alternatives are tried in order, so the first matching rule wins
+                parts.append(f"({pattern})")
+                groups[group] = i
+                group += 1 + compiled.groups
+            self.patterns[on] = re.compile("|".join(parts), flags) if parts else None
+            self._rule_of_group[on] = groups
+
+    @staticmethod
+    def from_data(data):
+        """
+        :param data: dict with 'rules' and optionally 'ignore_case' and 'materials'
+        :return: MaterialRules
+        """
+        return MaterialRules(data['rules'], data.get('ignore_case', False), data.get('materials'))
+
+    @staticmethod
+    def load(path):
+        """
+        :param path: JSON rule file
+        :return: MaterialRules
+        """
+        with open(path) as f:
+            return MaterialRules.from_data(json.load(f))
+
+    def _first(self, on, text):
+        pattern = self.patterns[on]
+        if pattern is None:
+            return None
+        m = pattern.match(text)
+        # the group of the rule's alternative closes last, so it is m.lastindex
+        return None if m is None else self._rule_of_group[on][m.lastindex]
+
+    def match(self, label, path=None):
+        """
+        :return: index of the first rule matching label or path, None if there is none
+        """
+        hits = [i for i in (self._first('label', label),
+                            self._first('path', path) if path is not None else None)
+                if i is not None]
+        return min(hits) if hits else None
+
+    def assign(self, objs):
+        """
+        :param objs: document objects with a Label
+        :return: (assignments, unmatched); assignments: list of Assignment in the order
+                 of objs, unmatched: list of (index, obj)
+        """
+        paths = group_paths(objs) if self.patterns['path'] is not None else {}
+        assignments = []
+        unmatched = []
+        for index, obj in enumerate(objs):
+            i = self.match(obj.Label, paths.get(obj.Name))
+            if i is None:
+                unmatched.append((index, obj))
+                continue
+            rule = self.rules[i]
+            assignments.append(Assignment(index, obj, rule.material, rule.cell or obj.Label, i))
+        return assignments, unmatched
+
+    def report(self, unmatched):
+        """
+        :param unmatched: second value returned by assign
+        :return: text listing the objects no rule matched
+        """
+        lines = [f"{len(unmatched)} object(s) matched no material rule:"]
+        for index, obj in unmatched:
+            lines.append(f"    [{index}] {obj.Label} ({obj.Name}, {obj.TypeId})")
+        return "\n".join(lines)
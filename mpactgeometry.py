@@ -1,12 +1,19 @@
+import hashlib
+import json
 import math
 
+from lazyimport import LazyModule
+
+np = LazyModule('numpy')
+
 
 class MeshParams:
     """
     Parameters for a Mesh (for a Geometry)
     """
-    def __init__(self, nrad=1):
-        self.nRad = nrad
+    def __init__(self, nrad=1, nazi=1):
+        self.nRad = nrad  # number of (equal area) rings the region is split into
+        self.nAzi = nazi  # number of azimuthal sectors the region is split into
 
 
 class Geom:
@@ -55,10 +62,10 @@ class Level:
     specific level. Each level can have different numbers of geometries (for now we
     assume each level will only have a single geometry). Each level itself is unique
     """
-    def __index__(self, ngeom=0, geoms=None, name=None):
+    def __init__(self, ngeom=0, geoms=None, name=None):
         self.name = name  # The level number
-        self.nGeom = ngeom
-        self.geoms = [] if geoms is None else geoms
+        self.geoms = [] if geoms is None else list(geoms)
+        self.nGeom = len(self.geoms)
 
     def add_geom(self, geom):
         if geom in self.geoms:
@@ -74,7 +81,7 @@ class GeneralMeshType:
     sub-objects. Acts as the root of the XML tree.
     """
     def __init__(self, name="GenPinMeshType", id=None, nlevels=0, xpitch=0.0,
-                 ypitch=0.0, zpitch=0.0, split=0, levels=None):
+                 ypitch=0.0, zpitch=0.0, split=0, levels=None, symmetry=1, symmetryplanes=()):
         self.name = name
         self.ID = id
         self.NLevels = nlevels
@@ -82,7 +89,15 @@ class GeneralMeshType:
         self.YPitch = ypitch
         self.ZPitch = zpitch
         self.Split = split
-        self.Levels = {} if levels is None else levels
+        self.Levels = {}
+        # levels may be given as a dict (level number -> Level) or as a list
+        for level in (levels.values() if isinstance(levels, dict) else levels or []):
+            self.Levels[level.name] = level
+        self.NLevels = max(nlevels, len(self.Levels))
+        # 1, 4 or 8: only 1/Symmetry of the pin is modelled, the pitches stay those of the
+        # full pin. The planes ('x', 'y', 'diagonal') through the pin center are reflective.
+        self.Symmetry = symmetry
+        self.SymmetryPlanes = tuple(symmetryplanes)
 
     def add_level(self, level):
         if level.name in self.Levels:
@@ -93,10 +108,291 @@ class GeneralMeshType:
             self.NLevels += 1
 
     def remove_level(self, level_num):
-        if level_num in self.Levels:
+        if level_num not in self.Levels:
             print("Error: Specified level is not in the model")
             return
         else:
             del self.Levels[level_num]
+            self.NLevels -= 1
+
+    def fsr_areas(self):
+        """
+        Computes the flat source regions (FSRs) implied by the levels without running MPACT.
+
+        The level geometries are nested: sorted by enclosed area, the region between a
+        geometry and the next smaller one is split into MeshParams.nRad equal area
+        rings times MeshParams.nAzi azimuthal sectors of the geometry's angle range.
+        The region between the largest geometry and the pitch box is one more region
+        (cut into the nAzi sectors of the largest geometry).
+
+        :return: dict of NumPy arrays with one entry per FSR
+                 'area', 'level' (level number, 0 for the region outside all levels),
+                 'ring', 'sector'; and 'summary' (count, total, min, max, mean, std)
+        """
+        geoms = [(name, geom) for name, level in sorted(self.Levels.items()) for geom in level.geoms]
+
+        names = np.array([name for name, _ in geoms], dtype=int)
+        span = np.array([_angle_span(g) for _, g in geoms], dtype=float)
+        enclosed = np.array([_enclosed_area(g) for _, g in geoms], dtype=float) * span / (2 * math.pi)
+        nrad = np.array([_mesh_param(g, 'nRad') for _, g in geoms], dtype=int)
+        nazi = np.array([_mesh_param(g, 'nAzi') for _, g in geoms], dtype=int)
+
+        order = np.argsort(-enclosed, kind='mergesort')
+        names, span, enclosed, nrad, nazi = names[order], span[order], enclosed[order], nrad[order], nazi[order]
+
+        # region k lies between geometry k and geometry k+1 (the innermost one is full)
+        region = enclosed - np.append(enclosed[1:], 0.0)
+
+        # outside all levels: the pitch box, reduced to the sector of the outermost geometry
+        outer_span = span[0] if len(span) else 2 * math.pi
+        outer_nazi = nazi[0] if len(nazi) else 1
+        outer = self.XPitch * self.YPitch * outer_span / (2 * math.pi) - (enclosed[0] if len(enclosed) else 0.0)
+
+        region = np.append(outer, region)
+        names = np.append(0, names)
+        nrad = np.append(1, nrad)
+        nazi = np.append(outer_nazi, nazi)
+
+        # one entry per FSR: region k repeated nrad[k] * nazi[k] times
+        per_region = nrad * nazi
+        fsr_region = np.repeat(np.arange(len(region)), per_region)
+        first = np.repeat(np.cumsum(per_region) - per_region, per_region)
+        local = np.arange(len(fsr_region)) - first
+
+        area = region[fsr_region] / per_region[fsr_region]
+        table = {'area': area,
+                 'level': names[fsr_region],
+                 'ring': local // nazi[fsr_region],
+                 'sector': local % nazi[fsr_region]}
+
+        table['summary'] = {'count': int(area.size),
+                            'total': float(area.sum()),
+                            'min': float(area.min()) if area.size else 0.0,
+                            'max': float(area.max()) if area.size else 0.0,
+                            'mean': float(area.mean()) if area.size else 0.0,
+                            'std': float(area.std()) if area.size else 0.0}
+        return table
+
+    def structure_key(self):
+        """
+        :return: hash of the pitches, symmetry and level geometries (not of name and ID);
+                 mesh types with equal keys describe the same geometry
+        """
+        data = [self.XPitch, self.YPitch, self.ZPitch, self.Split, self.Symmetry,
+                list(self.SymmetryPlanes),
+                [[geom_to_data(g) for g in self.Levels[k].geoms] for k in sorted(self.Levels)]]
+        return hashlib.sha1(json.dumps(_rounded(data), sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class AxialStack:
+    """
+    Axial stack of GeneralMeshTypes from bottom to top. A zone is one mesh type repeated
+    Multiplier times, so identical consecutive slices are stored once.
+    """
+    def __init__(self, z0=0.0):
+        self.Z0 = z0        # bottom of the stack
+        self.Zones = []     # list of [GeneralMeshType, multiplier]
+
+    def add(self, mesh_type, multiplier=1):
+        """
+        Appends multiplier slices of mesh_type; merged into the top zone if it has the
+        same mesh type.
+        """
+        if self.Zones and self.Zones[-1][0] is mesh_type:
+            self.Zones[-1][1] += multiplier
+        else:
+            self.Zones.append([mesh_type, multiplier])
+
+    def mesh_types(self):
+        """
+        :return: the distinct mesh types, in order of first appearance
+        """
+        out = []
+        for mesh_type, _ in self.Zones:
+            if not any(m is mesh_type for m in out):
+                out.append(mesh_type)
+        return out
+
+    @property
+    def NSlices(self):
+        return sum(m for _, m in self.Zones)
+
+    @property
+    def Height(self):
+        return sum(t.ZPitch * m for t, m in self.Zones)
+
+    def zone_bounds(self):
+        """
+        :return: list of (z bottom, z top, mesh type, multiplier) of the zones
+        """
+        out = []
+        z = self.Z0
+        for mesh_type, multiplier in self.Zones:
+            top = z + mesh_type.ZPitch * multiplier
+            out.append((z, top, mesh_type, multiplier))
+            z = top
+        return out
+
+    def expand(self):
+        """
+        :return: the mesh type of every slice, bottom to top
+        """
+        return [mesh_type for mesh_type, multiplier in self.Zones for _ in range(multiplier)]
 
 
+class PinLibrary:
+    """
+    The unique pin mesh types of a model. Pins are compared by structure_key() (ring
+    radii, angles, mesh params and pitches, in pin local coordinates); every unique pin
+    gets one ID and equal pins share it.
+    """
+    def __init__(self):
+        self.MeshTypes = []  # unique GeneralMeshTypes, MeshTypes[i].ID == i + 1
+        self._ids = {}       # structure_key -> ID
+
+    def __len__(self):
+        return len(self.MeshTypes)
+
+    def add(self, mesh_type):
+        """
+        :return: ID of mesh_type; a new ID only if no equal pin was added before
+        """
+        key = mesh_type.structure_key()
+        pin_id = self._ids.get(key)
+        if pin_id is None:
+            pin_id = self._ids[key] = len(self.MeshTypes) + 1
+            mesh_type.ID = pin_id
+            self.MeshTypes.append(mesh_type)
+        return pin_id
+
+    def __getitem__(self, pin_id):
+        return self.MeshTypes[pin_id - 1]
+
+
+class Lattice:
+    """
+    Assembly: a square lattice of pins referenced by their PinLibrary ID. Map[j][i] is
+    the pin in row j (top row first, as the map is printed) and column i.
+    """
+    def __init__(self, pitch=0.0, pin_map=None, id=None, name="Assembly"):
+        self.name = name
+        self.ID = id
+        self.Pitch = pitch
+        self.Map = [list(row) for row in pin_map or []]
+
+    @property
+    def NX(self):
+        return len(self.Map[0]) if self.Map else 0
+
+    @property
+    def NY(self):
+        return len(self.Map)
+
+    def pin_counts(self):
+        """
+        :return: dict pin ID -> number of positions using it
+        """
+        counts = {}
+        for row in self.Map:
+            for pin_id in row:
+                counts[pin_id] = counts.get(pin_id, 0) + 1
+        return counts
+
+    def key(self):
+        """
+        :return: hash of pitch and pin map; equal lattices describe the same assembly
+        """
+        data = [round(float(self.Pitch), 9), self.Map]
+        return hashlib.sha1(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+class Core:
+    """
+    Core map of assemblies. Pins and assemblies are stored once each, lattices and the
+    map only hold IDs, so the model grows with the number of unique pins and assemblies.
+    """
+    def __init__(self, pins=None, name="Core"):
+        self.name = name
+        self.Pins = PinLibrary() if pins is None else pins
+        self.Assemblies = []    # unique Lattices, Assemblies[i].ID == i + 1
+        self.Map = []           # assembly IDs, top row first; 0 for an empty position
+        self._ids = {}
+
+    def add_assembly(self, lattice):
+        """
+        :return: ID of lattice; equal lattices share one ID
+        """
+        key = lattice.key()
+        assembly_id = self._ids.get(key)
+        if assembly_id is None:
+            assembly_id = self._ids[key] = len(self.Assemblies) + 1
+            lattice.ID = assembly_id
+            self.Assemblies.append(lattice)
+        return assembly_id
+
+
+def _rounded(value, digits=9):
+    # floats from different slices or pins differ in the last bits (and in the sign of 0)
+    if isinstance(value, float):
+        return round(value, digits) + 0.0
+    if isinstance(value, dict):
+        return dict((k, _rounded(v, digits)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_rounded(v, digits) for v in value]
+    return value
+
+
+def _angle_span(geom):
+    if isinstance(geom, CircleGeom):
+        return (geom.StopAngle - geom.StartAngle) % (2 * math.pi) or 2 * math.pi
+    return 2 * math.pi
+
+
+def _enclosed_area(geom):
+    """
+    Area enclosed by the full (360 degree) geometry
+    """
+    if isinstance(geom, CircleGeom):
+        return math.pi * geom.Radius ** 2
+    if isinstance(geom, BoxGeom) and geom.Extent is not None:
+        v1, v2 = geom.Vector1, geom.Vector2
+        return abs(v1[0] * v2[1] - v1[1] * v2[0]) * geom.Extent[0] * geom.Extent[1]
+    return 0.0
+
+
+def _mesh_param(geom, name):
+    return max(1, getattr(geom.MeshParams, name, 1)) if geom.MeshParams is not None else 1
+
+
+GEOM_TYPES = {'CircleGeom': CircleGeom, 'BoxGeom': BoxGeom}
+
+
+def geom_to_data(geom):
+    """
+    Returns a JSON-serializable dict of a Geom (used by the conversion cache)
+    :param geom: CircleGeom or BoxGeom
+    :return: dict
+    """
+    data = dict(vars(geom))
+    if geom.MeshParams is not None:
+        data['MeshParams'] = dict(vars(geom.MeshParams))
+    return data
+
+
+def geom_from_data(data):
+    """
+    Inverse of geom_to_data
+    :param data: dict
+    :return: CircleGeom or BoxGeom
+    """
+    geom = GEOM_TYPES[data['Name']]()
+    for attr, value in data.items():
+        setattr(geom, attr, value)
+    if data.get('MeshParams') is not None:
+        geom.MeshParams = MeshParams()
+        vars(geom.MeshParams).update(data['MeshParams'])
+    if 'Centroid' in data:
+        geom.Centroid = tuple(data['Centroid'])
+    if 'CornerPoint' in data:
+        geom.CornerPoint = tuple(data['CornerPoint'])
+    return geom
@@ -13,8 +13,8 @@ from PySide import QtCore, QtGui, QtSvg
 global QtGui,QtCore
 
 
-global fullRefresh, parentsView, childrensView, familyView, renderWidget
-global doSomething,search, createTree, sayWidgetTree,cm,vlines,TypeIcon
+global fullRefresh, rebuild, parentsView, childrensView, familyView, renderWidget
+global doSomething,search, createTree, loadSubs, cm,TypeIcon
 global w, refresh
 
 import os
@@ -23,6 +23,7 @@ global __version__
 __version__ = "(version 0.10 2015-06-18)"
 
 from configmanager import ConfigManager
+import dependencyindex
 
 
 
@@ -58,103 +59,94 @@ def TypeIcon(typeId='Part::Cut'):
 	return QtGui.QIcon('icons:freecad.svg')
 
 
-def createTree(obj,n,mode):
-	if n<2: 
-		tree={'obj':obj,'subs':[],'subtyp':n,'status':'normal','a_label':obj.Label,'a_typeId':obj.TypeId} 
-	else:
-		tree={'obj':obj,'subs':[],'subtyp':n,'status':'hide','a_label':obj.Label,'a_typeId':obj.TypeId} 
-	
-	print "--------------------"
-	print obj.Label
-	k=obj.OutList
-	print "--------------------"
-	for it in k:
-		print it.Label, " => ",it.TypeId
-	print "--------------------"
+global treeCache
+treeCache={}
+
+def createTree(obj,mode):
+	'''tree node of obj, its subs are loaded by loadSubs on demand.
+	there is one node per object and mode, shared by every path that reaches the object;
+	the nodes are kept in treeCache over refreshes, the cache is cleared by rebuild.
+	the view state (column, expanded or not) belongs to the rows, see TreeItem'''
+	key=(obj,mode)
+	if treeCache.has_key(key):
+		return treeCache[key]
+	tree={'obj':obj,'subs':[],'a_label':obj.Label,'a_typeId':obj.TypeId} 
+	tree['mode']=mode
+	tree['loaded']=False
+	treeCache[key]=tree
+	return tree
+
+def loadSubs(tree):
+	'''compute the subs of a tree node once'''
+	if tree.get('loaded',True):
+		return tree['subs']
+	tree['loaded']=True
+	obj=tree['obj']
+	mode=tree['mode']
+	index=dependencyindex.index_of(obj)
 	
 	if mode == 'parents':
 		if obj.TypeId=='PartDesign::Mirrored' or obj.TypeId=='PartDesign::LinearPattern':
-			k=obj.OutList
-			for el in k:
-				FreeCAD.Console.PrintMessage("\n: "+el.Label + "--"+el.TypeId + "\n")
-			FreeCAD.Console.PrintMessage("\n size:" + str(len(k)) + "\n")
+			k=index.children(obj)
 			#if len(k)>1:
 			ske=k[-1]
-			FreeCAD.Console.PrintMessage("Sonder: "+ske.Label)
 			#else:
 			#	stske=[]
 			pad=k[0]
-			stske=createTree(pad,n+2,mode)
-			FreeCAD.Console.PrintMessage(" pad "+ pad.Label)
-			tree1={'obj':ske,'subs':[stske],'subtyp':n+1,'status':'normal'} 
+			stske=createTree(pad,mode)
+			tree1={'obj':ske,'subs':[stske],'loaded':True} 
 			tree['subs']=[tree1]
 		elif obj.TypeId=='PartDesign::MultiTransform':
-			k=obj.OutList
-			for el in k:
-				FreeCAD.Console.PrintMessage("\n: "+el.Label + "--"+el.TypeId + "\n")
-			FreeCAD.Console.PrintMessage("\n size:" + str(len(k)) + "\n")
+			k=index.children(obj)
 			#if len(k)>1:
 			ske=k[0]
-			FreeCAD.Console.PrintMessage("Sonder: "+ske.Label)
 			# hier fehlt die hierarchie ...
 			#else:
 			#	stske=[]
 			
 			pad=k[-1]
-			stske=createTree(pad,n+len(k)+0,mode)
-			FreeCAD.Console.PrintMessage(" pad "+ pad.Label)
-			treealt={'obj':ske,'subs':[stske],'subtyp':n+len(k)-1,'status':'normal'} 
+			stske=createTree(pad,mode)
+			treealt={'obj':ske,'subs':[stske],'loaded':True} 
 			# tree['subs']=[treealt]
 			k.pop()
 			# k.reverse()
 			
-			# treealt=["intitree-----------------------------------"]
-			print "#######"
-			m=n+len(k)
 			for it in k:
-				print "++++++++++++++++"
-				print it.Label," " ,it.TypeId," m",m
-				treeneu={'obj':it,'subs':[treealt],'subtyp':m,'status':'normal','a_label':it.Label} 
-				m -= 1
+				treeneu={'obj':it,'subs':[treealt],'a_label':it.Label,'loaded':True} 
 				treealt=treeneu
-				import pprint
-				pprint.pprint(treealt)
-			print "########"
 			tree['subs']=[treealt]
-			tree['subtyp']=n
-
-
 
 		else:
-			for s in obj.OutList:
-				st=createTree(s,n+1,mode)
-				#st[s]['subtyp']=n
+			for s in index.children(obj):
+				st=createTree(s,mode)
 				tree['subs'].append(st)
 	elif mode == 'children':
-		for s in obj.InList:
-			st=createTree(s,n+1,mode)
-			#st[s]['subtyp']=n
+		for s in index.parents(obj):
+			st=createTree(s,mode)
 			tree['subs'].append(st)
 	else:
 		FreeCAD.Console.PrintError("unknown mode:" + mode + "\n")
 		raise Exception
-	#FreeCAD.Console.PrintMessage(str(n) + " " + obj.Label +" typeId=")
-	#FreeCAD.Console.PrintMessage(obj.TypeId +"\n")
 	
-	return tree
-
-def sayTree(ot):
+	return tree['subs']
+
+def hasSubs(ot):
+	'''True if the node has subs, without loading them'''
+	if ot.get('loaded',True):
+		return len(ot['subs'])>0
+	index=dependencyindex.index_of(ot['obj'])
+	if ot['mode'] == 'children':
+		return index.parent_count(ot['obj'])>0
+	return index.child_count(ot['obj'])>0
+
+def sayTree(ot,n=0):
 	'''	print output of the tree structure for testing'''
 	
-	ss="#"
-	for k in ot.keys():
-		if k=='subtyp': 
-			ss= "* " * ot[k]
-		if k == 'obj':
-			name = ot[k].Label
+	ss= "* " * n
+	name = ot['obj'].Label
 #	print ss + name
 	for s in ot['subs']:
-			sayTree(s)
+			sayTree(s,n+1)
 
 #------------------------------------------
 
@@ -193,6 +185,47 @@ if False:
 	for s in [App.ActiveDocument.Box001, App.ActiveDocument.Sphere001,App.ActiveDocument.Cone001]:
 		FreeCADGui.Selection.addSelection(s)
 
+global ViewScheduler
+class ViewScheduler(object):
+	'''collects ViewObject property changes and applies them once per event loop tick.
+	later changes of the same property replace earlier ones, unchanged values are not written
+	and the document is not recomputed'''
+
+	def __init__(self):
+		self.pending={}
+		self.timer=QtCore.QTimer()
+		self.timer.setSingleShot(True)
+		self.timer.setInterval(0)
+		self.timer.timeout.connect(self.flush)
+
+	def set(self,obj,**props):
+		if not self.pending.has_key(obj):
+			self.pending[obj]={}
+		self.pending[obj].update(props)
+		if not self.timer.isActive():
+			self.timer.start()
+
+	def get(self,obj,prop):
+		'''value the property will have after the next flush'''
+		if self.pending.has_key(obj) and self.pending[obj].has_key(prop):
+			return self.pending[obj][prop]
+		return getattr(obj.ViewObject,prop)
+
+	def flush(self):
+		pending=self.pending
+		self.pending={}
+		for obj in pending.keys():
+			try:
+				vo=obj.ViewObject
+				for prop,val in pending[obj].items():
+					if getattr(vo,prop) != val:
+						setattr(vo,prop,val)
+			except:
+				say(obj.Label + " view not updated")
+
+global viewScheduler
+viewScheduler=ViewScheduler()
+
 global buff
 
 buff={}
@@ -204,8 +237,7 @@ def initBuff():
 			v=obj.ViewObject.Visibility
 			t=obj.ViewObject.Transparency
 			buff[obj]=[v,t]
-			say("!" +obj.Label + ":"+str(obj.ViewObject.Transparency) + "-- "+ str(obj.ViewObject.Visibility))
-			v=obj.ViewObject.Visibility=False
+			viewScheduler.set(obj,Visibility=False)
 		except:
 			say (obj.Label + "not init buff") 
 
@@ -226,6 +258,31 @@ try:
 except:
 	pass
 
+global hoverColor
+hoverColor={}
+
+def hoverEnter(obj):
+	global lastObj
+	import random
+	if not hoverColor.has_key(obj):
+		hoverColor[obj]=viewScheduler.get(obj,'ShapeColor')
+	viewScheduler.set(obj,ShapeColor=(1.0,0.5,1.0),Transparency=0,DisplayMode="Flat Lines",Visibility=True)
+	try:
+		if lastObj:
+			lo=lastObj[0]
+			loc=lastObj[1]
+			viewScheduler.set(lo,ShapeColor=(random.random(),random.random(),random.random()))
+			lastObj=[obj,hoverColor[obj]]
+			#FreeCADGui.SendMsgToActiveView("ViewFit")
+	except:
+		sayexc("hk2")
+
+def hoverLeave(obj):
+	try:
+		viewScheduler.set(obj,ShapeColor=hoverColor.pop(obj),Transparency=90,DisplayMode="Shaded",Visibility=True)
+	except:
+		sayexc("hu44")
+
 class MyBut(QtGui.QPushButton):
 	def __init__(self,icon,name):
 		QtGui.QPushButton.__init__(self,icon,name)
@@ -233,40 +290,10 @@ class MyBut(QtGui.QPushButton):
 		# self.obj=FreeCAD.ActiveDocument.Box
 
 	def enterEvent(self,ev):
-		global lastObj
-		import random
-		self.obvisi=self.obj.ViewObject.Visibility
-		self.color=self.obj.ViewObject.ShapeColor
-		self.obj.ViewObject.ShapeColor=(1.0,0.5,1.0)
-		self.obj.ViewObject.Transparency=0
-		self.obj.ViewObject.DisplayMode = "Flat Lines"
-		self.obj.ViewObject.Visibility=True
-		say("mouse enter A " + self.obj.Label)
-		try:
-			if lastObj:
-				lo=lastObj[0]
-				loc=lastObj[1]
-				lo.ViewObject.ShapeColor=(random.random(),random.random(),random.random())
-				lastObj=[self.obj,self.color]
-				#FreeCADGui.SendMsgToActiveView("ViewFit")
-				FreeCAD.ActiveDocument.recompute()
-				say(lo.ViewObject.ShapeColor)
-		except:
-			sayexc("hk2")
+		hoverEnter(self.obj)
 
 	def leaveEvent(self,ev):
-		say("mouse Leave A " + self.obj.Label) 
-		try:
-			self.obj.ViewObject.Visibility=False
-			self.obj.ViewObject.ShapeColor=self.color
-			self.obj.ViewObject.Transparency=90
-			self.obj.ViewObject.DisplayMode = "Shaded"
-			if context.has_key(self.obj) and context[self.obj]:
-				pass
-			self.obj.ViewObject.Visibility=True
-		except:
-			sayexc("hu44")
-		FreeCAD.ActiveDocument.recompute()
+		hoverLeave(self.obj)
 
 	def mousePressEvent(self, ev):
 		#FreeCAD.Console.PrintMessage("k mouse press")
@@ -288,10 +315,7 @@ global hideall
 def hideall():
 	os=FreeCAD.ActiveDocument.Objects
 	for obj in os:
-		FreeCAD.Console.PrintMessage("!# ")
-		obj.ViewObject.Transparency=90
-		self.obj.ViewObject.DisplayMode = "Shaded"
-		obj.ViewObject.Visibility=False
+		viewScheduler.set(obj,Transparency=90,DisplayMode="Shaded",Visibility=False)
 
 
 global showall2
@@ -301,9 +325,7 @@ def showall2():
 	# say(os)
 	for obj in os:
 #		say("show all")
-		obj.ViewObject.Visibility=buff[obj][0]
-		obj.ViewObject.Transparency=buff[obj][1]
-		obj.ViewObject.DisplayMode = "Flat Lines"
+		viewScheduler.set(obj,Visibility=buff[obj][0],Transparency=buff[obj][1],DisplayMode="Flat Lines")
 #		obj.ViewObject.Visibility=buff[obj][0]
 #		say("!" +obj.Label + ":"+str(obj.ViewObject.Transparency) + "-- "+ str(obj.ViewObject.Visibility))
 	#FreeCADGui.SendMsgToActiveView("ViewFit")
@@ -387,10 +409,7 @@ class MyWindow2(QtGui.QWidget) :
 		except:
 			sayexc("huhu")
 		for obj in context.keys():
-			say("show all context -- " + obj.Label)
-			obj.ViewObject.Visibility=True
-			obj.ViewObject.Transparency=80
-			obj.ViewObject.DisplayMode = "Shaded"
+			viewScheduler.set(obj,Visibility=True,Transparency=80,DisplayMode="Shaded")
 
 		say("showall2 done")
 
@@ -446,30 +465,296 @@ class MyButA(QtGui.QPushButton):
 			FreeCADGui.Selection.addSelection(s)
 #--------------------------
 
+global iconCache
+iconCache={}
+
+def objIcon(obj):
+	if not iconCache.has_key(obj):
+		try:
+			iconCache[obj]=QtGui.QIcon(obj.ViewObject.Proxy.getIcon())
+		except:
+			iconCache[obj]=TypeIcon(obj.TypeId)
+	return iconCache[obj]
+
+
+class TreeItem(object):
+	'''a row of the view; a node shared in the DAG gets one item for each path to it.
+	the expansion state is kept here, per row, not in the shared node'''
+
+	def __init__(self,ot,parent=None,row=0):
+		self.ot=ot
+		self.parent=parent
+		self.row=row
+		self.children=None
+		# the first two columns start expanded
+		self.expanded=self.depth()<2
+
+	def depth(self):
+		d=0
+		p=self.parent
+		while p is not None:
+			d += 1
+			p=p.parent
+		return d
+
+	def hasNext(self):
+		if self.parent is None:
+			return False
+		return self.row < len(self.parent.children)-1
+
+
+class ObjectTreeModel(QtCore.QAbstractItemModel):
+	'''item model over the createTree nodes, rows of a node are fetched when it is expanded'''
+
+	def __init__(self,parent=None):
+		QtCore.QAbstractItemModel.__init__(self,parent)
+		self.root=None
+
+	def setTree(self,ot):
+		if ot is not None and self.root is not None:
+			self.syncItem(self.index(0,0),self.root,ot)
+			return
+		self.beginResetModel()
+		self.root=None
+		if ot is not None:
+			self.root=TreeItem(ot)
+		self.endResetModel()
+
+	def syncItem(self,index,it,ot):
+		'''update the rows below it to the node ot, the rows of unchanged objects are kept'''
+		if it.ot is not ot:
+			# a new node: another object, or the object was edited and its node rebuilt
+			it.ot=ot
+			self.dataChanged.emit(index,index)
+		if it.children is None:
+			return
+		old=it.children
+		new=loadSubs(ot)
+		n=min(len(old),len(new))
+		a=0
+		while a<n and old[a].ot['obj'] is new[a]['obj']:
+			a += 1
+		b=0
+		while b<n-a and old[len(old)-1-b].ot['obj'] is new[len(new)-1-b]['obj']:
+			b += 1
+		if a+b<len(old):
+			self.beginRemoveRows(index,a,len(old)-b-1)
+			del old[a:len(old)-b]
+			self.renumber(it)
+			self.endRemoveRows()
+		if a+b<len(new):
+			self.beginInsertRows(index,a,len(new)-b-1)
+			old[a:a]=[TreeItem(s,it) for s in new[a:len(new)-b]]
+			self.renumber(it)
+			self.endInsertRows()
+		for i in range(len(old)):
+			self.syncItem(self.index(i,0,index),old[i],new[i])
+
+	def renumber(self,it):
+		for i,c in enumerate(it.children):
+			c.row=i
+
+	def item(self,index):
+		if index.isValid():
+			return index.internalPointer()
+		return None
+
+	def index(self,row,column,parent=QtCore.QModelIndex()):
+		if column != 0:
+			return QtCore.QModelIndex()
+		p=self.item(parent)
+		if p is None:
+			if self.root is not None and row == 0:
+				return self.createIndex(0,0,self.root)
+			return QtCore.QModelIndex()
+		if p.children is None or row >= len(p.children):
+			return QtCore.QModelIndex()
+		return self.createIndex(row,0,p.children[row])
+
+	def parent(self,index):
+		it=self.item(index)
+		if it is None or it.parent is None:
+			return QtCore.QModelIndex()
+		return self.createIndex(it.parent.row,0,it.parent)
+
+	def rowCount(self,parent=QtCore.QModelIndex()):
+		p=self.item(parent)
+		if p is None:
+			if self.root is None:
+				return 0
+			return 1
+		if p.children is None:
+			return 0
+		return len(p.children)
+
+	def columnCount(self,parent=QtCore.QModelIndex()):
+		return 1
+
+	def hasChildren(self,parent=QtCore.QModelIndex()):
+		p=self.item(parent)
+		if p is None:
+			return self.root is not None
+		if p.children is not None:
+			return len(p.children)>0
+		return hasSubs(p.ot)
+
+	def canFetchMore(self,parent):
+		p=self.item(parent)
+		return p is not None and p.children is None and hasSubs(p.ot)
+
+	def fetchMore(self,parent):
+		p=self.item(parent)
+		subs=loadSubs(p.ot)
+		if len(subs)==0:
+			p.children=[]
+			return
+		self.beginInsertRows(parent,0,len(subs)-1)
+		p.children=[TreeItem(s,p,i) for i,s in enumerate(subs)]
+		self.endInsertRows()
+
+	def data(self,index,role=QtCore.Qt.DisplayRole):
+		it=self.item(index)
+		if it is None:
+			return None
+		obj=it.ot['obj']
+		if role == QtCore.Qt.DisplayRole:
+			return obj.Label
+		if role == QtCore.Qt.DecorationRole:
+			return objIcon(obj)
+		if role == QtCore.Qt.ToolTipRole:
+			return obj.TypeId
+		if role == QtCore.Qt.BackgroundRole and it.parent is None:
+			return QtGui.QBrush(QtGui.QColor('yellow'))
+		return None
+
+
+def paintBranches(painter,rect,it,expandable,expanded,ind,rtl):
+	'''connector lines and expand box of the row of item it in rect'''
+	def colx(k):
+		if rtl:
+			return rect.right()-k*ind-ind/2
+		return rect.left()+k*ind+ind/2
+	top=rect.top()
+	bottom=rect.bottom()
+	mid=rect.center().y()
+	d=it.depth()
+	painter.save()
+	painter.setPen(QtGui.QColor(128,128,128))
+	a=it.parent
+	k=d-1
+	while a is not None:
+		if a.hasNext():
+			painter.drawLine(colx(k),top,colx(k),bottom)
+		a=a.parent
+		k -= 1
+	x=colx(d)
+	if it.parent is not None:
+		if it.hasNext():
+			painter.drawLine(x,top,x,bottom)
+		else:
+			painter.drawLine(x,top,x,mid)
+		if rtl:
+			painter.drawLine(x,mid,rect.left(),mid)
+		else:
+			painter.drawLine(x,mid,rect.right(),mid)
+	if expandable:
+		painter.fillRect(x-4,mid-4,8,8,QtCore.Qt.white)
+		painter.drawRect(x-4,mid-4,8,8)
+		painter.drawLine(x-2,mid,x+2,mid)
+		if not expanded:
+			painter.drawLine(x,mid-2,x,mid+2)
+	painter.restore()
+
+
+class ObjectTreeView(QtGui.QTreeView):
+	'''tree view which paints its own connector lines; only the visible rows are painted'''
+
+	def __init__(self,*args):
+		QtGui.QTreeView.__init__(self,*args)
+		self.setHeaderHidden(True)
+		self.setUniformRowHeights(True)
+		self.setIndentation(20)
+		self.setMouseTracking(True)
+		self.setModel(ObjectTreeModel(self))
+		self.hovered=None
+		self.clicked.connect(self.itemClicked)
+		self.entered.connect(self.itemEntered)
+		self.expanded.connect(self.itemExpanded)
+		self.collapsed.connect(self.itemCollapsed)
+
+	def setTree(self,ot):
+		self.model().setTree(ot)
+		self.syncExpanded(self.model().index(0,0))
+
+	def syncExpanded(self,index):
+		'''expand or collapse the rows below index to their expansion state'''
+		if not index.isValid():
+			return
+		it=index.internalPointer()
+		if it.expanded:
+			model=self.model()
+			# the rows are created lazily, load them before walking them
+			if model.canFetchMore(index):
+				model.fetchMore(index)
+			self.expand(index)
+			for r in range(model.rowCount(index)):
+				self.syncExpanded(model.index(r,0,index))
+		else:
+			self.collapse(index)
+
+	def drawBranches(self,painter,rect,index):
+		paintBranches(painter,rect,index.internalPointer(),self.model().hasChildren(index),
+				self.isExpanded(index),self.indentation(),self.isRightToLeft())
+
+	def itemClicked(self,index):
+		w.labelClick(index.internalPointer().ot)
+
+	def itemEntered(self,index):
+		obj=index.internalPointer().ot['obj']
+		if obj is self.hovered:
+			return
+		if self.hovered is not None:
+			hoverLeave(self.hovered)
+		self.hovered=obj
+		hoverEnter(obj)
+
+	def leaveEvent(self,ev):
+		if self.hovered is not None:
+			hoverLeave(self.hovered)
+			self.hovered=None
+		QtGui.QTreeView.leaveEvent(self,ev)
+
+	def itemExpanded(self,index):
+		index.internalPointer().expanded=True
+
+	def itemCollapsed(self,index):
+		index.internalPointer().expanded=False
+
+
 class MyWidget(QtGui.QWidget):
 	def __init__(self, master,*args):
 		QtGui.QWidget.__init__(self, *args)
 		
 		self.master=master
 		FreeCAD.mywidget=self
-		self.printed=[]
-		#self.printed2=[]
+		self.mode='family'
+		self.indexVersion=None
 #		
 #	def myinit(self):
-		layout = QtGui.QGridLayout()
-		
-		self.layout=layout
-		self.layout.setAlignment(QtCore.Qt.AlignLeft)
-		line=4
-		self.mw=QtGui.QWidget()
+		# children grow to the left, parents to the right of the selected object
+		self.childTree=ObjectTreeView()
+		self.childTree.setLayoutDirection(QtCore.Qt.RightToLeft)
+		self.parentTree=ObjectTreeView()
+		layout = QtGui.QHBoxLayout()
 		layout.setSpacing(0)
-		
+		layout.addWidget(self.childTree)
+		layout.addWidget(self.parentTree)
+		self.mw=QtGui.QWidget()
 		self.mw.setLayout(layout)
 		self.setWindowTitle("Object Design Workflow Tree " + __version__)
 		self.setStyleSheet("* {background-color:white;} *:focus { color:red;background-color:white;}")
 
 		self.layout=layout
-		self.line=line
 		mlayout=QtGui.QVBoxLayout()
 		self.mlayout=mlayout
 		hlayout=QtGui.QHBoxLayout()
@@ -478,7 +763,7 @@ class MyWidget(QtGui.QWidget):
 		self.hw.setLayout(self.hlayout)
 		
 		butti= QtGui.QPushButton(QtGui.QIcon('icons:view-refresh.svg'),"Refesh")
-		butti.clicked.connect(fullRefresh) 
+		butti.clicked.connect(rebuild) 
 		self.hlayout.addWidget(butti)
 		butti.clearFocus()
 		butti= QtGui.QPushButton(QtGui.QIcon("icons:button_down.svg"),"Parents")
@@ -530,11 +815,6 @@ class MyWidget(QtGui.QWidget):
 		
 		
 		self.setLayout(mlayout)
-		self.mw.setStyleSheet("QListWidget,QPushButton {border:none;text-align:left;}\
-				QPushButton {border:0px solid red;text-align:left;}\
-				QPushButton#mainLabel {border:0px solid green;text-align:left;background-color:yellow;padding:0px  5px 0px 0px;margin-right:10px;}\
-				QPushButton#mainIcon {border:0px solid green;text-align:left;background-color:yellow;padding:0px  0px 0px 5px;}\
-			QWidget2 {border:2px solid green;background-color:transparent}")
 		# self.butti2.installEventFilter(self)
 		FreeCAD.Console.PrintMessage('myinint done installed ')
 
@@ -576,123 +856,14 @@ class MyWidget(QtGui.QWidget):
 
 
 
-	def addObj(self,ot,obj,row,count,mode,dir):
-		global filled
-		
-		ox=cm.get('ox',1000)
-		oy=cm.get('oy',1000)
-		ax=cm.get('ax',1)
-		ay=cm.get('ay',1)
-		
-		
-		if dir == '-x':
-			ax=-1
-		
-#		pushButt = QtGui.QPushButton()
-#		try:
-#			butti= QtGui.QPushButton(QtGui.QIcon(obj.ViewObject.Proxy.getIcon()),"") 
-#		except:
-#			butti= QtGui.QPushButton(TypeIcon(obj.TypeId),"")
-
-
-		pushButt = MyBut(None,"")
-		pushButt.obj=obj
-		pushButt.ot=ot
-		try:
-			butti= MyBut(QtGui.QIcon(obj.ViewObject.Proxy.getIcon()),"") 
-		except:
-			butti= MyBut(TypeIcon(obj.TypeId),"")
-		butti.obj=obj
-
-		tt="-: "+ str(oy+ay*self.line)
-		tt=''
-		if row==0:
-			pushButt.setText(""+ obj.Label + "" + tt)
-			pushButt.setObjectName("mainLabel")
-			butti.setObjectName("mainIcon")
-		else:
-			pushButt.setText(obj.Label + tt)	
-		
-		lc=lambda: self.labelClick(ot)
-		
-		pushButt.clicked.connect(lc) 
-		butti.clicked.connect(lc) 
-		
-		if obj in self.printed:
-		#	pushButt.setText(obj.Label + "!")
-			# butti= QtGui.QPushButton(QtGui.QIcon('/usr/lib/freecad/Mod/mylib/icons/mars.png'),"")
-			
-			pass 
-		
-		
-		#pushButt.setStyleSheet("{border:2px solid green;color:green;}")
-		
-		self.printed.append(obj)
-		if ax== -1:
-			self.layout.addWidget(butti, oy+ay*self.line, ox+ax*3*row-1+1)
-		else:
-			self.layout.addWidget(butti, oy+ay*self.line, ox+ax*3*row)
-		if ax== -1:
-			self.layout.addWidget(pushButt, oy+ay*self.line, ox+ax*3*row+1)
-		else:
-			self.layout.addWidget(pushButt, oy+ay*self.line, ox+ax*3*row+1)
-		subst=str(count)
-#		if False and count >0:
-#			butte= QtGui.QPushButton(QtGui.QIcon('/usr/lib/freecad/Mod/mylib/icons/mars.png'),subst)
-#			self.layout.addWidget(butte, oy+self.line, ox+3*row+2)
-
-		
-		say(AppHomePath)
-		if row >0:
-			if mode ==1  :
-				butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/single.png'),"")
-			elif mode ==0 :
-				butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/start.png'),"")
-			elif mode == -1:
-				if ax== -1:
-					butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/end2.png'),"")
-				else:
-					butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/end.png'),"")
-			else:
-				if ax== -1:
-					butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/downl-l.png'),"" )
-				else:
-					butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/downl-r.png'),"" )
-			if ax== -1:
-				self.layout.addWidget(butte, oy+ay*self.line, ox+ax*3*row-1+2+1)
-			else:
-				self.layout.addWidget(butte, oy+ay*self.line, ox+ax*3*row-1)
-			
-			f=lambda: self.collapsTree(ot)
-			
-			if len(ot['subs']) >0 :
-				butte.clicked.connect(f) 
-
-			g=lambda: self.expandTree(ot)
-			if ot['status'] == 'hide' and dir != '-x':
-				if len(ot['subs']):
-					buttx= QtGui.QPushButton(QtGui.QIcon('icons:add.svg'),"" )
-					self.layout.addWidget(buttx, oy+ay*self.line, ox+ax*3*row+2)
-					buttx.clicked.connect(g) 
-			if ot['status'] == 'hide' and dir == '-x':
-				if len(ot['subs']):
-					buttx= QtGui.QPushButton(QtGui.QIcon('icons:add.svg'),"" )
-					self.layout.addWidget(buttx, oy+ay*self.line, ox+ax*3*row+2-4)
-					#buttx.clicked.connect(g) 
-					buttx.clicked.connect(lc) 
-			
-			filled[self.line][3*row-1]=1
-	
-	def collapsTree(self,ot):
-		ot['status']='hide'
-		FreeCAD.Console.PrintMessage("collapsTree " +  ot['obj'].Label + "\n")
-		FreeCAD.Console.PrintMessage("collapsTree " +  ot['status'] + "\n")
+	def collapsTree(self,it):
+		it.expanded=False
+		FreeCAD.Console.PrintMessage("collapsTree " +  it.ot['obj'].Label + "\n")
 		refresh()
 
-	def expandTree(self,ot):
-		ot['status']='normal'
-		FreeCAD.Console.PrintMessage("expandTree " +  ot['obj'].Label + "\n")
-		FreeCAD.Console.PrintMessage("expandTree " +  ot['status'] + "\n")
+	def expandTree(self,it):
+		it.expanded=True
+		FreeCAD.Console.PrintMessage("expandTree " +  it.ot['obj'].Label + "\n")
 		refresh()
 
 	def labelClick(self,ot):
@@ -701,73 +872,73 @@ class MyWidget(QtGui.QWidget):
 		FreeCADGui.Selection.addSelection(ot['obj'])
 		fullRefresh('family')
 
-vlines={}
-vflines={}
-
-def sayWidgetTree(w,ot,mode=0,dir='+x'):
-	pos=ot['subtyp']
-	
-	w.addObj(ot,ot['obj'],pos,len(ot['subs']),mode,dir)
-	#if obj in w.printed2:
-	#	return
-	#	pass
-	# w.printed2.append(obj)
-	for p in vlines.keys():
-		if vlines[p]:
-			if vlines[p]==1 and filled[w.line][3*p+2]<>1:
-				butte= QtGui.QPushButton(QtGui.QIcon(AppHomePath+'/Mod/plugins/objecttree/icons/down.png'),"" )
-	anz=len(ot['subs'])
-	startline=w.line
-	if ot['status']=='normal':
-		for s in range(anz):
-			# print (s)
-			if s==0 and anz==1:
-				mode2=1
-				vlines[pos]=0
-			elif s ==0: 
-				mode2=0
-				vlines[pos]=1
-			elif s == anz -1:
-				mode2= -1
-				vlines[pos]=0
-				w.line += 1
-			else:
-				mode2 = 2
-				vlines[pos]=22
-				w.line += 1
-			sayWidgetTree(w,ot['subs'][s],mode2,dir)
-			#w.line += 1
-			endline=w.line
-	
+global TreeChanges
+class TreeChanges(object):
+	'''document observer collecting the objects edited since the last refresh'''
 
+	def __init__(self):
+		self.objs={}
+		FreeCAD.addDocumentObserver(self)
+
+	def slotChangedObject(self,obj,prop):
+		self.objs[obj]=True
+
+	def take(self):
+		objs=self.objs.keys()
+		self.objs={}
+		return objs
+
+global treeChanges
+treeChanges=TreeChanges()
+
+def invalidate(objs):
+	'''drop the cached nodes of objs and of all nodes whose sub-trees contain them,
+	so they are rebuilt with the current labels'''
+	for mode in ('parents','children'):
+		stack=list(objs)
+		seen={}
+		while stack:
+			obj=stack.pop()
+			if seen.has_key(obj):
+				continue
+			seen[obj]=True
+			treeCache.pop((obj,mode),None)
+			try:
+				index=dependencyindex.index_of(obj)
+				# the subs are the children in parents mode, the parents in children mode
+				if mode == 'parents':
+					stack.extend(index.parents(obj))
+				else:
+					stack.extend(index.children(obj))
+			except:
+				pass
 
 def refresh():
-	#global otlist
-	for k in w.mw.findChildren(QtGui.QPushButton):
-		k.deleteLater()
-	w.line=4
-	#for ot in otlist:
-	sayWidgetTree(w,w.ot,0)
-	w.hide();w.show()
+	for tv in [w.parentTree,w.childTree]:
+		tv.syncExpanded(tv.model().index(0,0))
+
+
+def rebuild():
+	'''refresh with the dependency trees computed from scratch'''
+	treeCache.clear()
+	fullRefresh(w.mode)
 
 
 def fullRefresh(mode='parents'):
-	global w,filled,ot,otlist
+	'''show the trees of the selected object; the displayed rows are updated, not recreated'''
+	global w,ot,otlist
 	ot=None
 	w.ot=None
-	w.printed=[]
-	#w.printed2=[]
-	w.line=4
-	filled={}
-	
-	for x in range(100):
-		filled[x]={}
-		for y in range(100):
-			#print x,y
-			filled[x][y]=0
-	
-	for k in w.mw.findChildren(QtGui.QPushButton):
-		k.deleteLater()
+	w.mode=mode
+	# the cached trees are stale once the document's dependencies changed
+	version=dependencyindex.get_index(FreeCAD.ActiveDocument).version
+	if version != w.indexVersion:
+		treeCache.clear()
+		treeChanges.take()
+		w.indexVersion=version
+	else:
+		# Label/Visibility edits do not change the index, rebuild the sub-trees above them
+		invalidate(treeChanges.take())
 	#obs= [App.ActiveDocument.Fusion002,App.ActiveDocument.Cut001]
 	#obs= [App.ActiveDocument.Cut001]
 	#obs= [App.ActiveDocument.Fusion]
@@ -790,32 +961,28 @@ def fullRefresh(mode='parents'):
 	ob1=obs[len(obs)-1]
 	if True:
 		if mode== 'children':
-			ot=createTree(ob1,0,mode)
-			dir = '-x'
-			w.layout.setAlignment(QtCore.Qt.AlignLeft)
-			sayWidgetTree(w,ot,0,dir)
+			ot=createTree(ob1,mode)
+			w.parentTree.hide()
+			w.childTree.setTree(ot)
+			w.childTree.show()
 		elif mode == 'parents':
-			ot=createTree(ob1,0,mode)
-			dir = '+x'
-			w.layout.setAlignment(QtCore.Qt.AlignRight)
-			sayWidgetTree(w,ot,0,dir)
+			ot=createTree(ob1,mode)
+			w.childTree.hide()
+			w.parentTree.setTree(ot)
+			w.parentTree.show()
 		else:
-			ot=createTree(ob1,0,'parents')
-			sayWidgetTree(w,ot,0,'+x')
-			ot2=createTree(ob1,0,'children')
-			w.line=4
-			w.printed=[]
-			#w.printed2=[]
-			w.layout.setAlignment(QtCore.Qt.AlignCenter)
-			sayWidgetTree(w,ot2,0,'-x')
+			ot=createTree(ob1,'parents')
+			w.parentTree.setTree(ot)
+			ot2=createTree(ob1,'children')
+			w.childTree.setTree(ot2)
+			w.parentTree.show()
+			w.childTree.show()
 	w.ot=ot
 	# w.hide();w.show()
 	w.update()
 	
 	for obj in context.keys():
-		say("show all context -- " + obj.Label)
-		obj.ViewObject.Visibility=True
-		obj.ViewObject.Transparency=30
+		viewScheduler.set(obj,Visibility=True,Transparency=30)
 
 
 
@@ -835,6 +1002,96 @@ def familyView():
 #-----------------------
 
 import re
+from collections import OrderedDict
+
+global LabelIndex
+class LabelIndex(object):
+	'''labels and TypeIds of the objects of a document; registered as document observer
+	so it follows created, deleted and relabeled objects'''
+
+	special=re.compile(r'[.^$*+?{}\[\]\\|()]')
+	# compiled patterns kept, the least recently used is dropped beyond
+	maxPatterns=64
+
+	def __init__(self,doc):
+		self.doc=doc
+		self.objs=[]
+		self.entries={}
+		self.patterns=OrderedDict()
+		self.version=0
+		for obj in doc.Objects:
+			self.add(obj)
+		FreeCAD.addDocumentObserver(self)
+
+	def close(self):
+		FreeCAD.removeDocumentObserver(self)
+
+	def add(self,obj):
+		if not self.entries.has_key(obj):
+			self.objs.append(obj)
+		self.entries[obj]=(obj.Label,obj.TypeId)
+		self.version += 1
+
+	def slotCreatedObject(self,obj):
+		if obj.Document == self.doc:
+			self.add(obj)
+
+	def slotDeletedObject(self,obj):
+		if self.entries.has_key(obj):
+			del self.entries[obj]
+			self.objs.remove(obj)
+			self.version += 1
+
+	def slotChangedObject(self,obj,prop):
+		if prop == 'Label' and self.entries.has_key(obj):
+			self.add(obj)
+
+	def compile(self,pat):
+		'''compiled pattern or None for an invalid one'''
+		if self.patterns.has_key(pat):
+			rx=self.patterns.pop(pat)
+		else:
+			try:
+				rx=re.compile(pat)
+			except re.error:
+				rx=None
+			if len(self.patterns) >= self.maxPatterns:
+				self.patterns.popitem(last=False)
+		self.patterns[pat]=rx
+		return rx
+
+	def isLiteral(self,pat):
+		return self.special.search(pat) is None
+
+	def search(self,pat,last=None):
+		'''objects whose label or TypeId matches pat; last is the (pattern,version,result)
+		of the previous search, it is narrowed when pat only extends a literal pattern'''
+		rx=self.compile(pat)
+		if rx is None:
+			return None
+		cands=self.objs
+		if last is not None:
+			(lpat,lversion,lres)=last
+			if lversion == self.version and pat.startswith(lpat) and self.isLiteral(pat):
+				cands=lres
+		res=[]
+		for obj in cands:
+			(label,typeId)=self.entries[obj]
+			if rx.search(label) or rx.search(typeId):
+				res.append(obj)
+		return res
+
+
+global labelIndex
+labelIndex=None
+
+def getLabelIndex():
+	global labelIndex
+	if labelIndex is None or labelIndex.doc != FreeCAD.ActiveDocument:
+		if labelIndex is not None:
+			labelIndex.close()
+		labelIndex=LabelIndex(FreeCAD.ActiveDocument)
+	return labelIndex
 
 
 class searchWidget(QtGui.QWidget):
@@ -847,22 +1104,17 @@ class searchWidget(QtGui.QWidget):
 		#self.listWidget.setSelectionMode(QtGui.QAbstractItemView.MultiSelection)
 		self.pat = QtGui.QLineEdit(self)
 		self.pat.setText(".*")
-		self.getlist()
-		self.pat.textChanged.connect(self.run)
+		self.last=None
+		self.res=[]
+		self.run()
+
+		# the list is filtered once the typing pauses
+		self.timer=QtCore.QTimer(self)
+		self.timer.setSingleShot(True)
+		self.timer.setInterval(cm.get('searchDelay',150))
+		self.timer.timeout.connect(self.run)
+		self.pat.textChanged.connect(lambda t: self.timer.start())
 
-		for k in self.res:
-			#if not self.config[k]['status'] == "ignore":
-			
-				# item = QtGui.QListWidgetItem(QtGui.QIcon('/usr/lib/freecad/Mod/plugins/icons/master.png'),k.Label)
-				
-				try:
-					item= QtGui.QListWidgetItem(QtGui.QIcon(k.ViewObject.Proxy.getIcon()),k.Label) 
-				except:
-					item= QtGui.QListWidgetItem(TypeIcon(k.TypeId),k.Label)
-				
-				
-				
-				self.listWidget.addItem(item)
 		layout = QtGui.QGridLayout()
 		
 		layout.addWidget(self.vollabel2, 1, 0,1,4)
@@ -884,51 +1136,25 @@ class searchWidget(QtGui.QWidget):
 
 
 	def getlist(self):
-		os=FreeCAD.ActiveDocument.Objects
-		res=[]
-		FreeCAD.Console.PrintMessage("pat:+++++++++++++\n")
+		index=getLabelIndex()
 		pat=str(self.pat.text())
-		FreeCAD.Console.PrintMessage("pat:"+pat+"!\n")
-		for oj in os:
-			# print oj.Label
-			
-			
-			if re.search(pat, oj.Label):
-				FreeCAD.Console.PrintMessage(oj.Label)
-				print oj.Label," okay" 
-				res.append(oj)
+		res=index.search(pat,self.last)
+		if res is None:
+			return False
+		self.last=(pat,index.version,res)
 		self.res=res
+		return True
 
 
 	def run(self):
-		FreeCAD.Console.PrintMessage("k--------------- \n")
-		# self.res=self.res[0]
-		FreeCAD.Console.PrintMessage("k--------------- \n")
-		k=True
-		while  k:
-			k=None
-			k=self.listWidget.takeItem(0)
-			
-			
-		#		FreeCAD.Console.PrintMessage("yy--------------- \n")
-		#		FreeCAD.Console.PrintMessage(k)
-		#		k.deleteLater()
-		FreeCAD.Console.PrintMessage("k----dfd----------- \n")
-		self.getlist()
-		# self.res=[self.res[0]]
-		for k in self.res:
-			#if not self.config[k]['status'] == "ignore":
-				# item = QtGui.QListWidgetItem(k.Label )
-				
-				try:
-					item= QtGui.QListWidgetItem(QtGui.QIcon(k.ViewObject.Proxy.getIcon()),k.Label) 
-				except:
-					item= QtGui.QListWidgetItem(TypeIcon(k.TypeId),k.Label)
-				
-				
-				self.listWidget.addItem(item)
-		self.hide()
-		self.show()
+		if not self.getlist():
+			return
+		self.listWidget.setUpdatesEnabled(False)
+		self.listWidget.clear()
+		self.listWidget.addItems([k.Label for k in self.res])
+		for i,k in enumerate(self.res):
+			self.listWidget.item(i).setIcon(objIcon(k))
+		self.listWidget.setUpdatesEnabled(True)
 
 	def runresult(self):
 		
@@ -964,47 +1190,187 @@ def search():
 #-----------------------
 
 
+def treeRows(view):
+	'''indexes of the rows shown by view, from top to bottom'''
+	model=view.model()
+	stack=[model.index(0,0)]
+	while stack:
+		index=stack.pop()
+		if not index.isValid():
+			continue
+		yield index
+		if view.isExpanded(index):
+			for r in range(model.rowCount(index)-1,-1,-1):
+				stack.append(model.index(r,0,index))
+
+
+class SvgPainter(object):
+	'''the QPainter calls used by paintRow, written as svg elements to a stream'''
+
+	def __init__(self,out):
+		self.out=out
+		self.pen='#000000'
+		self.pens=[]
+
+	def save(self):
+		self.pens.append(self.pen)
+
+	def restore(self):
+		self.pen=self.pens.pop()
+
+	def setPen(self,color):
+		self.pen=str(QtGui.QColor(color).name())
+
+	def drawLine(self,x1,y1,x2,y2):
+		self.out.write('<line x1="%g" y1="%g" x2="%g" y2="%g" stroke="%s"/>\n' % (x1,y1,x2,y2,self.pen))
+
+	def drawRect(self,x,y,wd,ht):
+		self.out.write('<rect x="%g" y="%g" width="%g" height="%g" fill="none" stroke="%s"/>\n' % (x,y,wd,ht,self.pen))
+
+	def fillRect(self,x,y,wd,ht,color):
+		self.out.write('<rect x="%g" y="%g" width="%g" height="%g" fill="%s"/>\n' % (x,y,wd,ht,str(QtGui.QColor(color).name())))
+
+	def drawText(self,x,y,text):
+		from xml.sax.saxutils import escape
+		if isinstance(text,unicode):
+			text=text.encode('utf-8')
+		self.out.write('<text x="%g" y="%g" fill="%s">%s</text>\n' % (x,y,self.pen,escape(text)))
+
+
+class TreeSnapshot(object):
+	'''layout of the visible trees side by side, one row per line; rows are painted
+	on demand so the exported image is never held in memory as a whole'''
+
+	def __init__(self,views):
+		self.views=views
+		self.fm=QtGui.QFontMetrics(views[0].font())
+		self.iconSize=16
+		self.rowHeight=max(self.fm.height(),self.iconSize)+4
+		self.widths=[]
+		self.rows=0
+		for tv in views:
+			n=0
+			width=0
+			for index in treeRows(tv):
+				it=index.internalPointer()
+				label=it.ot['obj'].Label
+				width=max(width,(it.depth()+1)*tv.indentation()+self.iconSize+8+self.fm.width(label))
+				n += 1
+			self.widths.append(width+8)
+			self.rows=max(self.rows,n)
+		self.width=max(1,sum(self.widths))
+		self.height=max(1,self.rows*self.rowHeight)
+
+	def rowIters(self):
+		return [treeRows(tv) for tv in self.views]
+
+	def paintRows(self,painter,iters,count,icons=True):
+		'''paint the next count rows of the row iterators iters from the top of painter'''
+		x0=0
+		for tv,width,rows in zip(self.views,self.widths,iters):
+			rtl=tv.isRightToLeft()
+			ind=tv.indentation()
+			for n in range(count):
+				index=next(rows,None)
+				if index is None:
+					break
+				it=index.internalPointer()
+				label=it.ot['obj'].Label
+				y=n*self.rowHeight
+				bw=(it.depth()+1)*ind
+				if rtl:
+					rect=QtCore.QRect(x0+width-bw,y,bw,self.rowHeight)
+					ix=rect.left()-self.iconSize-2
+					tx=ix-4-self.fm.width(label)
+				else:
+					rect=QtCore.QRect(x0,y,bw,self.rowHeight)
+					ix=rect.right()+2
+					tx=ix+self.iconSize+4
+				paintBranches(painter,rect,it,tv.model().hasChildren(index),tv.isExpanded(index),ind,rtl)
+				if icons:
+					objIcon(it.ot['obj']).paint(painter,ix,y+2,self.iconSize,self.iconSize)
+				painter.setPen(QtGui.QColor(0,0,0))
+				painter.drawText(tx,y+2+self.fm.ascent(),label)
+			x0 += width
+
+	def writePng(self,filename,tileRows=64):
+		'''render tiles of tileRows rows and stream their scanlines into one png'''
+		import struct, zlib
+		def chunk(f,typ,data):
+			f.write(struct.pack('>I',len(data))+typ+data)
+			f.write(struct.pack('>I',zlib.crc32(typ+data) & 0xffffffff))
+		f=open(filename,'wb')
+		f.write('\x89PNG\r\n\x1a\n')
+		chunk(f,'IHDR',struct.pack('>IIBBBBB',self.width,self.height,8,2,0,0,0))
+		z=zlib.compressobj()
+		buf=[]
+		size=0
+		iters=self.rowIters()
+		for first in range(0,self.height,tileRows*self.rowHeight):
+			th=min(tileRows*self.rowHeight,self.height-first)
+			tile=QtGui.QImage(self.width,th,QtGui.QImage.Format_RGB888)
+			tile.fill(QtGui.QColor(255,255,255).rgb())
+			painter=QtGui.QPainter(tile)
+			painter.setFont(self.views[0].font())
+			self.paintRows(painter,iters,tileRows)
+			painter.end()
+			data=bytes(tile.constBits())
+			bpl=tile.bytesPerLine()
+			for y in range(th):
+				buf.append(z.compress('\x00'+data[y*bpl:y*bpl+3*self.width]))
+				size += len(buf[-1])
+				if size > 1<<16:
+					chunk(f,'IDAT',''.join(buf))
+					buf=[]
+					size=0
+		buf.append(z.flush())
+		chunk(f,'IDAT',''.join(buf))
+		chunk(f,'IEND','')
+		f.close()
+
+	def writeSvg(self,filename):
+		'''write the trees as vector graphics, row by row'''
+		f=open(filename,'w')
+		f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+		f.write('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" font-family="%s" font-size="%dpx">\n'
+				% (self.width,self.height,str(self.views[0].font().family()),self.fm.height()-2))
+		f.write('<rect width="100%" height="100%" fill="white"/>\n')
+		self.paintRows(SvgPainter(f),self.rowIters(),self.rows,icons=False)
+		f.write('</svg>\n')
+		f.close()
+
+
 def renderWidget():
-	child=w
-	child=w.mw
-	image = QtGui.QPixmap(child.size())
-	child.render(image)
-	imagename=cm.get('imageName','c:/t2.jpg')
-	imageformat=cm.get('imageFormat','JPG')
-	image.save( 'c:/t.jpg', 'JPG')
-	
-	#displaymode=cm.get('displayMode','extern')
+	'''snapshot of the displayed trees, as png rendered in tiles or as svg'''
+	import os, sys, tempfile
+	imageformat=cm.get('imageFormat','PNG').upper()
+	imagename=cm.get('imageName','')
 	displaymode=cm.get('displayMode','intern')
 	displayCmd=cm.get('displayCmd','eog')
 	
-	displaymode='intern'
-	displayCmd="c:/i_view32.exe"
+	if imagename == '':
+		imagename=tempfile.mkdtemp() + '/tree.' + imageformat.lower()
 	
-	if displaymode=='intern':
-		import os, tempfile
-		d=tempfile.mktemp()
-		os.makedirs(d)
-		imagename = d + '/tree.' + imageformat
-		FreeCAD.Console.PrintMessage("tempfile !" + imagename +'!\n')
-		
-	image.save(imagename,imageformat)
+	views=[tv for tv in [w.childTree,w.parentTree] if tv.isVisible()]
+	snap=TreeSnapshot(views)
+	if imageformat == 'SVG':
+		snap.writeSvg(imagename)
+	else:
+		snap.writePng(imagename,cm.get('tileRows',64))
+	FreeCAD.Console.PrintMessage("Image saved to:" +str(imagename) + "\n")
 	
 	if displaymode == 'extern':
-		image.save( '/tmp/snapshot.png', 'PNG')
-		import os
-		#os.system("eog /tmp/snapshot.png &")
 		import subprocess
-		DETACHED_PROCESS = 0x00000008
-
-		pid = subprocess.Popen([displayCmd,"c:\\t3.jpg"],creationflags=DETACHED_PROCESS).pid
-		#subprocess.call(["c:/i_view32.exe","c:\\t3.jpg"])
-		
-		
-	else:
+		if sys.platform == 'win32':
+			DETACHED_PROCESS = 0x00000008
+			subprocess.Popen([displayCmd,imagename],creationflags=DETACHED_PROCESS)
+		else:
+			subprocess.Popen([displayCmd,imagename])
+	elif imageformat != 'SVG':
 		import ImageGui
 		ImageGui.open(imagename)
-		FreeCAD.Console.PrintMessage("Image saved to:" +str(imagename))
 	
+
  
 	
 
@@ -1036,7 +1402,7 @@ if 1 or False:
 if False:
 	ob1= App.ActiveDocument.MultiTransform
 	mode='parents'
-	ot=createTree(ob1,0,mode)
+	ot=createTree(ob1,mode)
 	print ot
 	sayTree(ot)
 	import pprint
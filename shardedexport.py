@@ -0,0 +1,156 @@
+"""
+Sharded export of large models.
+
+Writing a full core as one geometry.xml from one process is slow, and changing a single
+assembly rewrites everything. Instead every assembly universe (or MPACT mesh type) is
+written to its own shard file, in parallel, and the shards are stitched into the final
+file by copying their bytes between a header and a footer; no shard is parsed again.
+
+Each shard is described by a key (a hash of everything it is written from). The
+manifest (manifest.json in the shard directory) remembers the key of every shard, so a
+shard is only rewritten when its key changes and rebuilding one assembly only touches
+that assembly's shard (and the merge).
+
+The manifest also gives every shard name a slot, a small number kept for as long as the
+shard exists. Writers number the IDs of a shard from its slot, so the IDs of an assembly
+do not change when other assemblies are added, removed or reordered.
+
+Usage:
+    shards = ShardSet('shards', header, footer)
+    base = shards.slot(name) * stride                               # first ID of the shard
+    shards.write([(name, key, write_func, args), ...], executor)   # write_func(path, *args)
+    shards.merge('geometry.xml')
+
+Remark: with a ProcessPoolExecutor write_func and its arguments must be picklable, i.e.
+module level functions and plain data.
+"""
+
+__title__ = "shardedexport.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+
+def content_key(data):
+    """
+    :param data: anything json.dumps accepts
+    :return: hex digest of data, usable as a shard key
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ShardSet:
+    """
+    Directory of shard files with a manifest of their keys
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory, header, footer):
+        """
+        :param directory: where the shards and the manifest are kept
+        :param header, footer: text written before and after the shards by merge()
+        """
+        self.directory = directory
+        self.header = header
+        self.footer = footer
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self._path(self.MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except (IOError, ValueError):
+            self.manifest = {'shards': {}, 'order': []}
+        self.manifest.setdefault('slots', {})
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def filename(self, name):
+        """
+        :return: file name of the shard called name; the readable part is sanitized, the
+                 hash of the name keeps names that sanitize alike ('a b', 'a_b') apart
+        """
+        safe = "".join(c if c.isalnum() or c in '-_.' else '_' for c in str(name))
+        digest = hashlib.sha256(str(name).encode('utf-8')).hexdigest()[:16]
+        return f"{safe}-{digest}.shard"
+
+    def slot(self, name):
+        """
+        :return: slot of the shard called name; a new name gets the smallest slot no other
+                 shard uses. The slot is kept until the shard is removed by write().
+        """
+        slots = self.manifest['slots']
+        if name not in slots:
+            used = set(slots.values())
+            slots[name] = next(n for n in range(len(used) + 1) if n not in used)
+        return slots[name]
+
+    def is_current(self, name, key):
+        """
+        :return: True if the shard exists and was written from the same key
+        """
+        entry = self.manifest['shards'].get(name)
+        return entry is not None and entry['key'] == key and \
+            os.path.exists(self._path(entry['file']))
+
+    def write(self, jobs, executor=None):
+        """
+        Writes the shards whose key changed and records the order for merge().
+        :param jobs: list of (name, key, write_func, args); write_func(path, *args) writes
+                     the shard body to path
+        :param executor: concurrent.futures executor, a ThreadPoolExecutor if None
+        :return: names of the shards that were (re)written
+        """
+        names = [name for name, _, _, _ in jobs]
+        if len(set(names)) != len(names):
+            raise ValueError("Shard names must be unique")
+        stale = [(name, key, func, args) for name, key, func, args in jobs
+                 if not self.is_current(name, key)]
+
+        own = executor is None
+        executor = ThreadPoolExecutor() if own else executor
+        try:
+            futures = []
+            for name, key, func, args in stale:
+                # write to a temporary file so that an interrupted run leaves no half shard
+                tmp = self._path(self.filename(name) + '.tmp')
+                futures.append((name, key, tmp, executor.submit(func, tmp, *args)))
+            for name, key, tmp, future in futures:
+                future.result()
+                os.replace(tmp, self._path(self.filename(name)))
+                self.manifest['shards'][name] = {'key': key, 'file': self.filename(name)}
+        finally:
+            if own:
+                executor.shutdown()
+
+        for name in set(self.manifest['shards']).difference(names):
+            # shards of removed assemblies
+            entry = self.manifest['shards'].pop(name)
+            if os.path.exists(self._path(entry['file'])):
+                os.remove(self._path(entry['file']))
+        for name in set(self.manifest['slots']).difference(names):
+            del self.manifest['slots'][name]
+        self.manifest['order'] = names
+
+        with open(self._path(self.MANIFEST), 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        return [name for name, _, _, _ in stale]
+
+    def merge(self, out_path, chunk=1 << 20):
+        """
+        Concatenates header, shards (in the order of the last write()) and footer.
+        :param out_path: merged file
+        :return: None
+        """
+        with open(out_path, 'wb') as out:
+            out.write(self.header.encode('utf-8'))
+            for name in self.manifest['order']:
+                with open(self._path(self.manifest['shards'][name]['file']), 'rb') as f:
+                    shutil.copyfileobj(f, out, chunk)
+            out.write(self.footer.encode('utf-8'))
@@ -0,0 +1,114 @@
+"""
+Detection of the quarter and eighth symmetry of a CAD model.
+
+Most pins and assemblies are symmetric under mirroring at the x and y axes through
+their center (1/4 symmetry) and often also at the diagonal (1/8 symmetry). A converter
+can then emit only the sector 0 <= angle <= 90 (or 45) degrees with reflective
+boundaries on the cut planes, which reduces the model by the symmetry order.
+
+Every primitive is reduced to a feature (TypeId, centroid and extents of its bounding
+box relative to the model center, and its z range); the model is symmetric under a
+mirror if the set of features is mapped onto itself. The mirrors are vertical planes, so
+a part and its mirror image must also have the same z range.
+
+Usage:
+    sym = detect_symmetry(primitives(vis_objs), boundary.Shape.BoundBox)
+    sym.order              # 1, 4 or 8
+    in_sector(x, y, sym)   # is (x, y) inside the reduced wedge
+"""
+
+__title__ = "symmetry.py"
+__author__ = "K. Faryab Haye"
+__version__ = "00.00"
+__date__    = "19/10/2026"
+
+import math
+from collections import namedtuple
+
+import dependencyindex
+
+Symmetry = namedtuple('Symmetry', ['order', 'center', 'start', 'stop', 'mirrors'])
+
+NO_SYMMETRY = Symmetry(1, (0.0, 0.0), 0.0, 2 * math.pi, ())
+
+
+def primitives(objs):
+    """
+    :param objs: FreeCAD objects
+    :return: the objects without children reachable from objs, each once
+    """
+    seen = {}
+    stack = list(objs)
+    while stack:
+        obj = stack.pop()
+        if obj.Name in seen:
+            continue
+        children = dependencyindex.index_of(obj).children(obj)
+        seen[obj.Name] = obj if not children else None
+        stack.extend(children)
+    return [obj for obj in seen.values() if obj is not None]
+
+
+def features(objs, center, tol=1e-6):
+    """
+    :param objs: FreeCAD objects with a Shape
+    :param center: (x, y) of the model center
+    :param tol: length below which two values are considered equal
+    :return: list of (TypeId, x, y, dx, dy, zmin, zmax) in units of tol, x and y relative
+             to center
+    """
+    def q(v):
+        return int(round(v / tol))
+
+    out = []
+    for obj in objs:
+        b = obj.Shape.BoundBox
+        x = (b.XMin + b.XMax) / 2 - center[0]
+        y = (b.YMin + b.YMax) / 2 - center[1]
+        out.append((obj.TypeId, q(x), q(y), q(b.XLength), q(b.YLength), q(b.ZMin), q(b.ZMax)))
+    return out
+
+
+MIRRORS = {
+    'x': lambda f: (f[0], -f[1], f[2], f[3], f[4]) + f[5:],          # x -> -x
+    'y': lambda f: (f[0], f[1], -f[2], f[3], f[4]) + f[5:],          # y -> -y
+    'diagonal': lambda f: (f[0], f[2], f[1], f[4], f[3]) + f[5:],    # x <-> y
+}
+
+
+def detect_symmetry(objs, bounds, tol=1e-6):
+    """
+    :param objs: primitive FreeCAD objects of the model (see primitives())
+    :param bounds: BoundBox of the model boundary; its center is the symmetry center
+    :param tol: geometric tolerance
+    :return: Symmetry; order 8 if mirrored at x, y and the diagonal, 4 if at x and y,
+             else NO_SYMMETRY (with the center set)
+    """
+    center = ((bounds.XMin + bounds.XMax) / 2, (bounds.YMin + bounds.YMax) / 2)
+    feats = features(objs, center, tol)
+    counts = {}
+    for f in feats:
+        counts[f] = counts.get(f, 0) + 1
+
+    def invariant(mirror):
+        return all(counts.get(MIRRORS[mirror](f), 0) == n for f, n in counts.items())
+
+    if not (invariant('x') and invariant('y')):
+        return NO_SYMMETRY._replace(center=center)
+    # the diagonal only maps the boundary onto itself if it is square
+    if abs(bounds.XLength - bounds.YLength) <= tol and invariant('diagonal'):
+        return Symmetry(8, center, 0.0, math.pi / 4, ('x', 'y', 'diagonal'))
+    return Symmetry(4, center, 0.0, math.pi / 2, ('x', 'y'))
+
+
+def in_sector(x, y, symmetry, tol=1e-6):
+    """
+    :return: True if the point (x, y) lies in the reduced wedge of symmetry (boundary included)
+    """
+    if symmetry.order == 1:
+        return True
+    dx = x - symmetry.center[0]
+    dy = y - symmetry.center[1]
+    if dx < -tol or dy < -tol:
+        return False
+    return symmetry.order == 4 or dy <= dx + tol
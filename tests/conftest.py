@@ -0,0 +1,33 @@
+"""
+Runs the converters on the FreeCAD stand-in (freecadstandin.py), so the tests need
+neither FreeCAD nor its Python. Tests that need openmc skip without it.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import freecadstandin
+freecadstandin.install()
+
+import fcstdreader
+
+
+@pytest.fixture
+def pin_openmc():
+    """
+    :return: the visible objects of PinCellOpenMC.FCStd (the active document)
+    """
+    return freecadstandin.visible(fcstdreader.read_fcstd(os.path.join(ROOT, 'PinCellOpenMC.FCStd')))
+
+
+@pytest.fixture
+def pin_mpact():
+    """
+    :return: the visible objects of PinCellMPACT.FCStd (the active document)
+    """
+    return freecadstandin.visible(fcstdreader.read_fcstd(os.path.join(ROOT, 'PinCellMPACT.FCStd')))
@@ -0,0 +1,123 @@
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import CAD2MC
+import freecadstandin
+import geometryir
+from idallocator import IDAllocator
+
+
+def reflective_planes(region):
+    ir = geometryir.to_data(CAD2MC.surfaces.export(region))
+    return sorted(kind for kind, boundary, coeffs in ir['surfaces']
+                  if boundary == 'reflective' and kind in ('XPlane', 'YPlane', 'Plane')
+                  and all(v == 0.0 for name, v in coeffs if name in ('x0', 'y0', 'D')))
+
+
+def test_vis_objs_to_openmc_keeps_the_full_model(pin_openmc):
+    vis_objs_CAD, vis_objs_MC = CAD2MC.vis_objs_to_OpenMC(pin_openmc)
+    assert vis_objs_CAD == pin_openmc
+    assert all(region is not None for region in vis_objs_MC)
+    assert all(reflective_planes(region) == [] for region in vis_objs_MC)
+
+
+def test_reduce_to_symmetry(pin_openmc):
+    vis_objs_CAD, vis_objs_MC, sym = CAD2MC.reduce_to_symmetry(*CAD2MC.vis_objs_to_OpenMC(pin_openmc))
+    assert sym.order == 8
+    assert len(vis_objs_CAD) == len(vis_objs_MC) == 4
+    for region in vis_objs_MC:
+        assert reflective_planes(region) == ['Plane', 'XPlane', 'YPlane']
+
+
+def test_axially_different_mirror_images_are_kept(pin_openmc):
+    doc = pin_openmc[0].Document
+    rods = []
+    for x, y, height in ((0.3, 0.0, 1.0), (-0.3, 0.0, 0.5), (0.0, 0.3, 1.0), (0.0, -0.3, 1.0)):
+        rod = doc.addObject('Part::Cylinder', 'Rod')
+        rod.Radius, rod.Height = 0.05, height
+        rod.Placement = freecadstandin.Placement(freecadstandin.Vector(x, y, -0.5))
+        rods.append(rod)
+    vis_objs_CAD, vis_objs_MC, sym = CAD2MC.reduce_to_symmetry(
+        *CAD2MC.vis_objs_to_OpenMC(pin_openmc + rods))
+    assert sym.order == 1
+    assert vis_objs_CAD == pin_openmc + rods
+
+
+def test_build_model_reduced(pin_openmc, tmp_path):
+    pytest.importorskip('openmc')
+    ids = IDAllocator()
+    model = CAD2MC.build_model(ids, vis_objs=pin_openmc, reduce_symmetry=True)
+    assert model.symmetry.order == 8
+    CAD2MC.export_models([model], ids, directory=str(tmp_path))
+    geometry = ET.parse(os.path.join(str(tmp_path), 'geometry.xml')).getroot()
+    diagonal = [s for s in geometry.iter('surface') if s.get('type') == 'plane']
+    assert len(diagonal) == 1 and diagonal[0].get('boundary') == 'reflective'
+
+
+def export(directory, owners, threaded, vis_objs):
+    openmc = pytest.importorskip('openmc')
+    ids = IDAllocator()
+    models = {}
+
+    def build(owner):
+        models[owner] = CAD2MC.build_model(ids, owner, vis_objs=vis_objs)
+
+    if threaded:
+        workers = [threading.Thread(target=build, args=(o,)) for o in owners]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    else:
+        for o in owners:
+            build(o)
+
+    # the root holds one cell per document, filled with that document's universe
+    root_cells = ids.block('cell', None)
+    cells = []
+    for owner in sorted(models):
+        cell = openmc.Cell(root_cells.next(), owner)
+        cell.fill = models[owner].universe
+        cells.append(cell)
+    root = openmc.Universe(universe_id=ids.block('universe', None).next(), cells=cells)
+    directory.mkdir()
+    CAD2MC.export_models([models[o] for o in sorted(models)], ids, root, str(directory))
+    return str(directory)
+
+
+def test_export_models_compacts_ids_deterministically(pin_openmc, tmp_path):
+    serial = export(tmp_path / 'serial', ['b', 'a'], False, pin_openmc)
+    threaded = export(tmp_path / 'threaded', ['a', 'b'], True, pin_openmc)
+    for name in ('geometry.xml', 'materials.xml'):
+        assert open(os.path.join(serial, name)).read() == open(os.path.join(threaded, name)).read()
+
+    geometry = ET.parse(os.path.join(serial, 'geometry.xml')).getroot()
+    cells = list(geometry.iter('cell'))
+    assert len(cells) == 2 + 2 * len(pin_openmc)
+    assert sorted(int(c.get('id')) for c in cells) == list(range(1, len(cells) + 1))
+    surfaces = [int(s.get('id')) for s in geometry.iter('surface')]
+    assert sorted(surfaces) == list(range(1, len(surfaces) + 1))
+
+    # the root (owner None) is numbered first, then the documents in owner order
+    root_cells = [c for c in cells if c.get('fill') is not None]
+    assert [(c.get('name'), c.get('id'), c.get('universe'), c.get('fill')) for c in root_cells] == \
+        [('a', '1', '1', '2'), ('b', '2', '1', '3')]
+    assert set(c.get('universe') for c in cells if c.get('fill') is None) == {'2', '3'}
+
+    materials = [int(m.get('id')) for m in ET.parse(os.path.join(serial, 'materials.xml')).getroot()]
+    assert sorted(materials) == list(range(1, len(materials) + 1))
+
+
+def test_build_model_keeps_its_own_errors(pin_openmc):
+    pytest.importorskip('openmc')
+    cone = pin_openmc[0].Document.addObject('Part::Cone', 'Cone')
+    registered = list(CAD2MC.primitives.errors)
+    failed = CAD2MC.build_model(IDAllocator(), 'a', vis_objs=pin_openmc + [cone])
+    clean = CAD2MC.build_model(IDAllocator(), 'b', vis_objs=pin_openmc)
+    assert [e.name for e in failed.errors] == [cone.Name]
+    assert clean.errors == []
+    assert CAD2MC.primitives.errors == registered
+    assert cone.Name in CAD2MC.conversion_report(failed.errors)
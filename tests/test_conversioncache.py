@@ -0,0 +1,45 @@
+import freecadstandin
+from conversioncache import ConversionCache, subtree_key
+
+
+def children(obj):
+    return obj.OutList
+
+
+def test_keys_follow_the_geometry():
+    doc = freecadstandin.newDocument('Keys')
+    fuel, gap, clad, water = freecadstandin.make_pin(doc)
+    other = freecadstandin.newDocument('Other')
+    fuel2, gap2, clad2, water2 = freecadstandin.make_pin(other, prefix='copy_')
+    # equal parts get equal keys, whatever they are called
+    assert subtree_key(water, children, 'openmc') == subtree_key(water2, children, 'openmc')
+    assert subtree_key(water, children, 'openmc') != subtree_key(water, children, 'mpact-geom')
+    key = subtree_key(gap, children, 'openmc')
+    # changing a primitive changes the key of every feature built on it
+    gap.Tool.Radius = 0.38
+    assert subtree_key(gap, children, 'openmc') != key
+
+
+def test_hits_and_eviction(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache.sqlite'), max_bytes=100)
+    assert cache.get('a') is None
+    cache.put('a', {'region': [1, 2, 3]})
+    assert cache.get('a') == {'region': [1, 2, 3]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    for i in range(10):
+        cache.put(str(i), 'x' * 20)
+    stats = cache.stats()
+    assert stats['bytes'] <= 100
+    # the least recently used entries went first
+    assert cache.get('a') is None and cache.get('9') == 'x' * 20
+    cache.put('9', 'y')
+    assert cache.stats()['bytes'] == stats['bytes'] - 19
+    cache.close()
+
+    # the running total survives a reopen and clear resets it
+    cache = ConversionCache(str(tmp_path / 'cache.sqlite'), max_bytes=100)
+    assert cache.stats()['bytes'] == stats['bytes'] - 19
+    cache.clear()
+    assert cache.stats() == {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0}
+    cache.close()
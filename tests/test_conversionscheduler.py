@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import freecadstandin
+from conversionscheduler import LevelScheduler
+
+
+def children(obj):
+    return obj.OutList
+
+
+def label(obj, converted):
+    return f"{obj.Name}({','.join(converted)})"
+
+
+def test_levels_follow_the_children_function():
+    doc = freecadstandin.newDocument('Pin')
+    fuel, gap, clad, water = freecadstandin.make_pin(doc)
+    calls = []
+
+    def convert(obj, converted):
+        calls.append(obj.Name)
+        return label(obj, converted)
+
+    scheduler = LevelScheduler(children, convert)
+    results = scheduler.run([gap, clad, water])
+    # the cylinders are shared by two cuts each and converted once
+    assert sorted(calls) == sorted(set(calls))
+    assert results[gap.Name] == f"{gap.Name}({gap.Base.Name}(),{gap.Tool.Name}())"
+    assert [t.nodes for t in scheduler.timings] == [4, 3]
+    assert 'total' in scheduler.report()
+
+
+def test_children_outside_the_out_list():
+    # the children function may return objects the document index puts on the same
+    # level (e.g. CAD2MC.shape_children following Group links)
+    doc = freecadstandin.newDocument('Group')
+    boxes = [doc.addObject('Part::Box', f'Box{i}') for i in range(3)]
+    links = {'Box2': [boxes[1]], 'Box1': [boxes[0]]}
+    scheduler = LevelScheduler(lambda o: links.get(o.Name, []), label)
+    results = scheduler.run([boxes[2]])
+    assert results['Box2'] == 'Box2(Box1(Box0()))'
+    assert [t.depth for t in scheduler.timings] == [0, 1, 2]
+
+
+def test_executor_gives_the_same_results():
+    doc = freecadstandin.make_lattice(2)
+    roots = freecadstandin.visible(doc)
+    serial = LevelScheduler(children, label).run(roots)
+    with ThreadPoolExecutor(4) as executor:
+        threaded = LevelScheduler(children, label, executor).run(roots)
+    assert serial == threaded
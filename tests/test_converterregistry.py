@@ -0,0 +1,45 @@
+import CAD2MC
+import freecadstandin
+from converterregistry import ConverterRegistry
+
+
+def test_dispatch_by_type_id():
+    registry = ConverterRegistry('test')
+
+    @registry.register('Part::Box', 'Part::Sphere')
+    def convert(obj):
+        return obj.Name
+
+    doc = freecadstandin.newDocument('Registry')
+    box = doc.addObject('Part::Box', 'Cylinder_Box')
+    assert 'Part::Box' in registry and 'Part::Cylinder' not in registry
+    assert registry.convert(box) == 'Cylinder_Box'
+    assert registry.report() == ""
+
+
+def test_unknown_type_id_is_reported():
+    registry = ConverterRegistry('test')
+    doc = freecadstandin.newDocument('Registry')
+    cone = doc.addObject('Part::Cone', 'Cone')
+    assert registry.convert(cone) is None
+    assert [(e.name, e.type_id, e.message) for e in registry.errors] == \
+        [('Cone', 'Part::Cone', 'no converter registered')]
+    assert "Cone ('Cone', Part::Cone)" in registry.report()
+    registry.clear()
+    assert registry.report() == ""
+
+
+def test_unsupported_cylinder_is_reported():
+    doc = freecadstandin.newDocument('Registry')
+    # height equal to the diameter: the axis cannot be told from the bounds
+    cylinder = doc.addObject('Part::Cylinder', 'Cylinder')
+    cylinder.Radius, cylinder.Height = 1.0, 2.0
+    box = doc.addObject('Part::Box', 'Box')
+    cut = doc.addObject('Part::Cut', 'Cut')
+    cut.Base, cut.Tool = box, cylinder
+
+    CAD2MC.clear_conversion_errors()
+    assert CAD2MC.object_to_OpenMC(cut) is None
+    report = CAD2MC.conversion_report()
+    assert "Cylinder ('Cylinder', Part::Cylinder): cylinder axis not recognized" in report
+    CAD2MC.clear_conversion_errors()
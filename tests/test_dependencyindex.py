@@ -0,0 +1,37 @@
+import dependencyindex
+import freecadstandin
+
+
+def test_depth_and_levels():
+    doc = freecadstandin.newDocument('Pin')
+    fuel, gap, clad, water = freecadstandin.make_pin(doc)
+    index = dependencyindex.DependencyIndex(doc)
+    assert index.depth(fuel) == 0
+    assert [index.depth(o) for o in (gap, clad, water)] == [1, 1, 1]
+    assert index.children(gap) == [gap.Base, gap.Tool]
+    assert sorted(o.Name for o in index.parents(fuel)) == sorted(o.Name for o in fuel.InList)
+    order = index.topological_order()
+    for obj in order:
+        assert all(order.index(c) < order.index(obj) for c in index.children(obj))
+    assert [len(level) for level in index.levels()] == [4, 3]
+
+
+def test_observer_follows_the_document():
+    doc = freecadstandin.newDocument('Edit')
+    box = doc.addObject('Part::Box', 'Box')
+    cylinder = doc.addObject('Part::Cylinder', 'Cylinder')
+    index = dependencyindex.get_index(doc)
+    version = index.version
+    assert index.depth(box) == 0
+
+    cut = doc.addObject('Part::Cut', 'Cut')
+    cut.Base, cut.Tool = box, cylinder
+    assert index.version > version
+    assert index.children(cut) == [box, cylinder]
+    assert index.parents(cylinder) == [cut]
+    assert index.depth(cut) == 1
+
+    cut.Tool = None
+    assert index.parents(cylinder) == []
+    assert index.children(cut) == [box]
+    assert dependencyindex.index_of(box) is index
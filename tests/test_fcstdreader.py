@@ -0,0 +1,47 @@
+import zipfile
+
+import fcstdreader
+import freecadstandin
+
+
+def test_pin_cell_openmc(pin_openmc):
+    labels = sorted(o.Label for o in pin_openmc)
+    assert labels == ['clad region', 'fuel region', 'gap region', 'water region']
+    cuts = [o for o in pin_openmc if o.TypeId == 'Part::Cut']
+    assert len(cuts) == 3
+    # links resolve to the (hidden) primitives of the file
+    for cut in cuts:
+        assert cut.Base is not None and cut.Tool is not None
+        assert not cut.Tool.Visibility
+        assert cut in cut.Tool.InList
+
+
+def test_pin_cell_mpact(pin_mpact):
+    kinds = sorted(o.TypeId for o in pin_mpact)
+    assert kinds == ['Part::Box', 'Part::Cylinder', 'Part::Cylinder', 'Part::Cylinder']
+    fuel = next(o for o in pin_mpact if o.Label == 'fuel region')
+    assert fuel.Radius == 0.39
+    assert fuel.Placement.Base.x == 0.63
+    assert freecadstandin.ActiveDocument is fuel.Document
+
+
+def test_group_link_list(tmp_path):
+    document = (
+        '<Document><Objects Count="2">'
+        '<Object type="App::DocumentObjectGroup" name="Core"/><Object type="Part::Box" name="Box"/>'
+        '</Objects><ObjectData Count="2">'
+        '<Object name="Core"><Properties><Property name="Group" type="App::PropertyLinkList">'
+        '<LinkList count="1"><Link value="Box"/></LinkList></Property></Properties></Object>'
+        '<Object name="Box"><Properties><Property name="Label" type="App::PropertyString">'
+        '<String value="fuel"/></Property></Properties></Object>'
+        '</ObjectData></Document>')
+    path = str(tmp_path / 'group.FCStd')
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('Document.xml', document)
+
+    doc = fcstdreader.read_fcstd(path)
+    core, box = doc.getObject('Core'), doc.getObject('Box')
+    assert core.Group == [box]
+    assert core.OutList == [box]
+    # CAD2MC.shape_children tells groups apart with hasattr(obj, 'Group')
+    assert not hasattr(box, 'Group')
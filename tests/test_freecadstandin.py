@@ -0,0 +1,38 @@
+import sys
+
+import dependencyindex
+import freecadstandin
+
+
+def test_make_pin():
+    doc = freecadstandin.newDocument('Pin')
+    regions = freecadstandin.make_pin(doc)
+    assert [r.Label for r in regions] == ['fuel', 'gap', 'clad', 'water']
+    assert freecadstandin.visible(doc) == regions
+    water = regions[3].Shape.BoundBox
+    assert (round(water.XLength, 9), round(water.YLength, 9)) == (1.26, 1.26)
+
+
+def test_make_lattice_and_chain():
+    doc = freecadstandin.make_lattice(3)
+    assert len(freecadstandin.visible(doc)) == 3 * 3 * 4
+    chain = freecadstandin.make_chain(20)
+    levels = dependencyindex.DependencyIndex(chain).levels()
+    assert len(levels) == 21
+
+
+def test_benchmark_restores_the_modules(monkeypatch):
+    for name in freecadstandin.MODULES:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.setattr(freecadstandin, '_previous', {})
+    part = object()
+    monkeypatch.setitem(sys.modules, 'Part', part)
+
+    timings = freecadstandin.benchmark(n=2, repeat=1)
+    assert sys.modules['Part'] is part
+    assert 'FreeCAD' not in sys.modules
+    assert timings['objects'] == 2 * 2 * 7
+    try:
+        import openmc
+    except ImportError:
+        assert 'OpenMC conversion' not in timings
@@ -0,0 +1,82 @@
+import pytest
+
+import CAD2MC
+import geomdiff
+from idallocator import IDAllocator
+
+OLD = """<geometry>
+  <surface id="1" type="z-cylinder" coeffs="0 0 0.4"/>
+  <surface id="2" type="z-cylinder" coeffs="0 0 0.5"/>
+  <cell id="1" name="fuel" material="1" region="-1" universe="5"/>
+  <cell id="2" name="clad" material="2" region="1 -2" universe="5"/>
+  <cell id="3" name="root" fill="5"/>
+</geometry>"""
+
+# the same geometry renumbered, with the operands of the clad region swapped
+RENUMBERED = """<geometry>
+  <surface id="12" type="z-cylinder" coeffs="0 0 0.5"/>
+  <surface id="11" type="z-cylinder" coeffs="0 0 0.4"/>
+  <cell id="7" name="fuel" material="8" region="-11" universe="9"/>
+  <cell id="8" name="clad" material="9" region="-12 11" universe="9"/>
+  <cell id="9" name="root" fill="9"/>
+</geometry>"""
+
+MATERIALS = """<materials>
+  <material id="{0}" name="uo2"><density units="g/cm3" value="{2}"/></material>
+  <material id="{1}" name="zirconium"><density units="g/cm3" value="6.6"/></material>
+</materials>"""
+
+
+def write(directory, geometry, materials=None):
+    directory.mkdir()
+    (directory / 'geometry.xml').write_text(geometry)
+    if materials is not None:
+        (directory / 'materials.xml').write_text(materials)
+    return str(directory / 'geometry.xml')
+
+
+def test_renumbered_geometry_is_equal(tmp_path):
+    old = write(tmp_path / 'old', OLD, MATERIALS.format(1, 2, 10.0))
+    new = write(tmp_path / 'new', RENUMBERED, MATERIALS.format(8, 9, 10.0))
+    assert geomdiff.is_equal(geomdiff.diff_files(old, new))
+
+
+def test_changed_radius_is_a_modified_surface(tmp_path):
+    old = write(tmp_path / 'old', OLD)
+    new = write(tmp_path / 'new', OLD.replace('0 0 0.4', '0 0 0.41'))
+    cells, surfaces = geomdiff.diff_files(old, new)
+    assert surfaces.added == [] and surfaces.removed == []
+    assert surfaces.modified == ['z-cylinder transmission 0.0 0.0 0.4 -> '
+                                 'z-cylinder transmission 0.0 0.0 0.41']
+    # the filled universe changed, so does the cell it fills
+    assert cells.modified == ['clad', 'fuel', 'root']
+
+
+def test_materials_are_compared_by_content(tmp_path):
+    old = write(tmp_path / 'old', OLD, MATERIALS.format(1, 2, 10.0))
+    new = write(tmp_path / 'new', RENUMBERED, MATERIALS.format(8, 9, 10.5))
+    cells, surfaces = geomdiff.diff_files(old, new)
+    assert cells.modified == ['fuel', 'root']
+    assert surfaces == geomdiff.Diff('surface', [], [], [])
+
+
+def test_added_cell_and_surface(tmp_path):
+    extra = OLD.replace('</geometry>', '  <surface id="3" type="x-plane" coeffs="1"/>\n'
+                                       '  <cell id="4" name="water" material="2" region="-3"/>\n'
+                                       '</geometry>')
+    cells, surfaces = geomdiff.diff_files(write(tmp_path / 'old', OLD), write(tmp_path / 'new', extra))
+    assert cells.added == ['water']
+    assert surfaces.added == ['x-plane transmission 1.0']
+
+
+def test_exports_of_one_document_are_equal(pin_openmc, tmp_path):
+    pytest.importorskip('openmc')
+    paths = []
+    for name in ('first', 'second'):
+        ids = IDAllocator()
+        model = CAD2MC.build_model(ids, vis_objs=pin_openmc)
+        directory = tmp_path / name
+        directory.mkdir()
+        CAD2MC.export_models([model], ids, directory=str(directory))
+        paths.append(str(directory / 'geometry.xml'))
+    assert geomdiff.is_equal(geomdiff.diff_files(*paths))
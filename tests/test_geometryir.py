@@ -0,0 +1,59 @@
+import pytest
+
+import geometryir
+from geometryir import AND, OR, NOT, Materializer, Region, SurfaceTable
+
+
+def pin_table():
+    surfaces = SurfaceTable()
+    fuel = surfaces.add('ZCylinder', x0=0.0, y0=0.0, R=0.39)
+    clad = surfaces.add('ZCylinder', x0=0.0, y0=0.0, R=0.46)
+    top = surfaces.add('ZPlane', z0=0.5, boundary_type='reflective')
+    return surfaces, fuel, clad, top
+
+
+def test_equal_surfaces_are_added_once():
+    surfaces, fuel, clad, top = pin_table()
+    assert surfaces.add('ZCylinder', R=0.39, y0=0, x0=0) == fuel
+    assert surfaces.add('ZPlane', z0=0.5) != top
+    assert len(surfaces) == 4
+
+
+def test_region_program():
+    surfaces, fuel, clad, top = pin_table()
+    assert list((+fuel & -clad).program) == [1, 2, AND]
+    assert list((-fuel | +top).program) == [0, 5, OR]
+    assert list((~+fuel).program) == [0]
+    assert list((~(-fuel & -top)).program) == [0, 4, AND, NOT]
+    assert (+fuel & -clad).halfspaces() == [1, 2]
+    assert (~(-fuel & -top)).halfspaces() is None
+
+
+def test_export_and_load_round_trip():
+    surfaces, fuel, clad, top = pin_table()
+    ir = surfaces.export(+clad & -top)
+    assert [entry[0] for entry in ir.surfaces] == ['ZCylinder', 'ZPlane']
+    assert ir.program == [1, 2, AND]
+
+    other = SurfaceTable()
+    other.add('XPlane', x0=1.0)
+    region = other.load(geometryir.from_data(geometryir.to_data(ir)))
+    assert list(region.program) == [3, 4, AND]
+    assert other[2] == surfaces[top.index]
+
+
+def test_region_text():
+    assert geometryir.region_text([0, 1, OR, 2, AND, 3, 4, AND, NOT, AND],
+                                  lambda i: i + 10) == '(-10 | 10) -11 ~(11 -12)'
+
+
+def test_materializer_creates_each_surface_and_region_once():
+    openmc = pytest.importorskip('openmc')
+    surfaces, fuel, clad, top = pin_table()
+    materializer = Materializer(surfaces)
+    gap = materializer.region(+fuel & -clad & -top)
+    assert isinstance(gap, openmc.Intersection) and len(gap.nodes) == 3
+    assert materializer.region(+fuel & -clad & -top) is gap
+    assert materializer.region(-clad).surface is gap.nodes[1].surface
+    assert materializer.surface(top.index).boundary_type == 'reflective'
+    assert len(materializer.surfaces) == 3
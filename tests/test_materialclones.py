@@ -0,0 +1,49 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import CAD2MC
+from materialclones import Composition, clone, write_materials
+
+
+def test_write_materials_shares_the_composition(tmp_path):
+    base = Composition(('g/cm3', '10.0'), [('nuclide', (('ao', '0.03'), ('name', 'U235'))),
+                                           ('nuclide', (('ao', '0.97'), ('name', 'U238')))],
+                       name='uo2')
+    pins = clone(base, 4, name='uo2 pin {i}', start=10, volume=0.5)
+    pins[2].set_density('g/cm3', 10.1)
+    assert pins[0].composition is pins[1].composition is base
+    assert pins[2].composition is not base
+
+    path = str(tmp_path / 'materials.xml')
+    assert write_materials(path, clones=pins) == 4
+    materials = ET.parse(path).getroot().findall('material')
+    assert [m.get('id') for m in materials] == ['10', '11', '12', '13']
+    assert [m.get('name') for m in materials] == [f'uo2 pin {i}' for i in range(4)]
+    assert [m.find('density').get('value') for m in materials] == ['10.0', '10.0', '10.1', '10.0']
+    assert all(len(m.findall('nuclide')) == 2 for m in materials)
+
+
+def uo2():
+    return Composition(('g/cm3', '10.0'), [('nuclide', (('ao', '1.0'), ('name', 'U238')))], name='uo2')
+
+
+def test_write_materials_rejects_equal_ids(tmp_path):
+    path = tmp_path / 'materials.xml'
+    with pytest.raises(ValueError):
+        write_materials(str(path), clones=clone(uo2(), 2, start=1) + clone(uo2(), 2, start=2))
+    assert not path.exists()
+
+
+def test_clone_ids_fill_sharded_cells(tmp_path):
+    pins = clone(uo2(), 2, name='uo2 pin {i}', start=5)
+    fuel = CAD2MC.get_surface('ZCylinder', x0=0.0, y0=0.0, R=0.39)
+    universes = [(f'pin {i}', i + 1, [{'name': 'fuel', 'region': -fuel, 'material': pin.id}])
+                 for i, pin in enumerate(pins)]
+    out = str(tmp_path / 'geometry.xml')
+    CAD2MC.export_sharded(universes, str(tmp_path / 'shards'), out)
+    write_materials(str(tmp_path / 'materials.xml'), clones=pins)
+
+    cells = ET.parse(out).getroot().findall('cell')
+    materials = ET.parse(str(tmp_path / 'materials.xml')).getroot().findall('material')
+    assert [c.get('material') for c in cells] == [m.get('id') for m in materials] == ['5', '6']
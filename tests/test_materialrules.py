@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import CAD2MC
+import freecadstandin
+from idallocator import IDAllocator
+from materialrules import DEFAULT_RULES, MaterialRules, check_materials
+
+
+def test_regex_alternatives_are_anchored():
+    rules = MaterialRules([
+        {'match': 'fuel|clad', 'regex': True, 'material': 'uo2'},
+        {'match': 'fuel*', 'material': 'h2o'},
+    ])
+    assert rules.match('clad') == 0
+    assert rules.match('fuel') == 0
+    # 'fuel|clad' must not match a prefix of the Label
+    assert rules.match('fuelXYZ') == 1
+    assert rules.match('cladding') is None
+
+
+def test_rule_groups_map_to_rules():
+    rules = MaterialRules([
+        {'match': '(a|b)(x)+', 'regex': True, 'material': 'uo2'},
+        {'match': 'w(b)', 'regex': True, 'material': 'h2o'},
+    ])
+    assert rules.match('bxx') == 0
+    assert rules.match('wb') == 1
+
+
+def test_named_groups_are_rejected():
+    with pytest.raises(ValueError):
+        MaterialRules([{'match': '(?P<pin>fuel)', 'regex': True, 'material': 'uo2'}])
+
+
+def test_default_rules_on_the_pin_cell(pin_openmc):
+    assignments, unmatched = MaterialRules.from_data(DEFAULT_RULES).assign(pin_openmc)
+    assert unmatched == []
+    assert sorted((a.obj.Label, a.material) for a in assignments) == [
+        ('clad region', 'zirconium'), ('fuel region', 'uo2'),
+        ('gap region', None), ('water region', 'h2o')]
+
+
+def test_group_paths():
+    doc = freecadstandin.newDocument('Core')
+    core = doc.addObject('App::DocumentObjectGroup', 'Core')
+    guide = doc.addObject('App::DocumentObjectGroup', 'GuideTube')
+    tube = doc.addObject('Part::Cylinder', 'Tube')
+    core.Group = [guide]
+    guide.Group = [tube]
+    rules = MaterialRules([{'match': 'Core/GuideTube/*', 'on': 'path', 'material': 'h2o'}])
+    assignments, unmatched = rules.assign([tube])
+    assert [a.material for a in assignments] == ['h2o'] and unmatched == []
+
+
+def test_rule_file_defines_materials(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({
+        'rules': [{'match': '*fuel*', 'material': 'mox'}],
+        'materials': {'mox': {'density': ['g/cm3', 10.4], 'nuclides': [['Pu239', 0.05], ['U238', 0.95]]}},
+    }))
+    rules = MaterialRules.load(str(path))
+    assert list(rules.materials) == ['mox']
+    assert rules.materials['mox']['density'] == ['g/cm3', 10.4]
+    assert MaterialRules.from_data(DEFAULT_RULES).materials == {}
+
+
+def test_invalid_material_definitions_are_rejected():
+    with pytest.raises(ValueError):
+        check_materials({'uo2': {'nuclides': [['U235', 1.0]]}})
+    with pytest.raises(ValueError):
+        MaterialRules([], materials={'uo2': {'density': ['g/cm3', 10.0], 'isotopes': []}})
+
+
+def test_build_model_with_caller_materials(pin_openmc):
+    pytest.importorskip('openmc')
+    rules = MaterialRules([{'match': '*clad*', 'material': 'steel', 'cell': 'clad'}] + DEFAULT_RULES['rules'])
+    steel = {'density': ['g/cm3', 7.9], 'elements': [['Fe', 1.0]]}
+    model = CAD2MC.build_model(IDAllocator(), rules=rules, vis_objs=pin_openmc,
+                               materials={'steel': steel})
+    assert [m.name for m in model.materials] == ['uo2', 'zirconium', 'h2o', 'steel']
+    fills = dict((cell.name, cell.fill.name if cell.fill is not None else None) for cell in model.cells)
+    assert fills == {'fuel': 'uo2', 'air gap': None, 'clad': 'steel', 'moderator': 'h2o'}
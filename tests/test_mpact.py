@@ -0,0 +1,152 @@
+import math
+
+import pytest
+
+import CAD2MPACT
+import freecadstandin
+import symmetry
+from mpactgeometry import BoxGeom, CircleGeom
+
+
+def test_create_model_keeps_full_geometry_by_default(pin_mpact):
+    model = CAD2MPACT.create_model(pin_mpact)
+    assert model.Symmetry == 1
+    radii = [level.geoms[0].Radius for level in model.Levels.values()]
+    assert radii == [0.46, 0.4, 0.39]
+    assert all(level.geoms[0].StopAngle == 2 * math.pi for level in model.Levels.values())
+
+
+def test_create_model_eighth_symmetry(pin_mpact):
+    model = CAD2MPACT.create_model(pin_mpact, reduce_symmetry=True)
+    assert model.Symmetry == 8
+    assert tuple(model.SymmetryPlanes) == ('x', 'y', 'diagonal')
+    for level in model.Levels.values():
+        geom = level.geoms[0]
+        assert geom.Centroid == (0.63, 0.63)
+        assert (geom.StartAngle, geom.StopAngle) == (0, math.pi / 4)
+
+
+def test_centered_box_is_clipped_not_dropped(pin_mpact):
+    # an enclosing boundary makes the water box of the pin a level
+    doc = pin_mpact[0].Document
+    outer = doc.addObject('Part::Box', 'Outer')
+    outer.Length = outer.Width = 2.0
+    outer.Placement = freecadstandin.Placement(freecadstandin.Vector(-0.37, -0.37, 0.0))
+    model = CAD2MPACT.create_model(pin_mpact + [outer], reduce_symmetry=True)
+    boxes = [g for level in model.Levels.values() for g in level.geoms if isinstance(g, BoxGeom)]
+    assert len(boxes) == 1
+    assert [round(c, 9) for c in boxes[0].CornerPoint] == [0.63, 0.63]
+    assert [round(e, 9) for e in boxes[0].Extent] == [0.63, 0.63]
+
+
+def test_clip_box_outside_the_sector():
+    sym = symmetry.Symmetry(8, (0.0, 0.0), 0.0, math.pi / 4, ('x', 'y', 'diagonal'))
+    above_diagonal = BoxGeom(cornerpt=(0.0, 1.0), extent=[0.5, 1.0])
+    assert CAD2MPACT.clip_box(above_diagonal, sym) is None
+    left = BoxGeom(cornerpt=(-2.0, 0.0), extent=[1.0, 1.0])
+    assert CAD2MPACT.clip_box(left, sym) is None
+    off_center = CircleGeom(r=0.1, startangl=0, stopangl=2 * math.pi, centroid=(-1.0, 0.5))
+    assert CAD2MPACT.reduce_geom(off_center, sym) is None
+
+
+def test_reflective_planes_are_written(pin_mpact, tmp_path):
+    pytest.importorskip('lxml')
+    model = CAD2MPACT.create_model(pin_mpact, reduce_symmetry=True)
+    path = str(tmp_path / 'mpact.xml')
+    CAD2MPACT.generateXML(model, path)
+    text = open(path).read()
+    assert 'name="Symmetry" type="int" value="8"' in text
+    assert 'name="ReflectivePlanes" type="Array(string)" value="{x,y,diagonal}"' in text
+
+
+def test_off_center_circles_on_a_plane_keep_their_half():
+    sym = symmetry.Symmetry(8, (0.0, 0.0), 0.0, math.pi / 4, ('x', 'y', 'diagonal'))
+    on_x_axis = CircleGeom(r=0.2, startangl=0, stopangl=2 * math.pi, centroid=(1.0, 0.0))
+    assert CAD2MPACT.reduce_geom(on_x_axis, sym) is on_x_axis
+    assert (on_x_axis.StartAngle, on_x_axis.StopAngle) == (0.0, math.pi)
+    on_diagonal = CircleGeom(r=0.2, startangl=0, stopangl=2 * math.pi, centroid=(1.0, 1.0))
+    CAD2MPACT.reduce_geom(on_diagonal, sym)
+    assert (on_diagonal.StartAngle, on_diagonal.StopAngle) == (-3 * math.pi / 4, math.pi / 4)
+    inside = CircleGeom(r=0.2, startangl=0, stopangl=2 * math.pi, centroid=(1.0, 0.5))
+    CAD2MPACT.reduce_geom(inside, sym)
+    assert (inside.StartAngle, inside.StopAngle) == (0, 2 * math.pi)
+
+    quarter = sym._replace(order=4, stop=math.pi / 2, mirrors=('x', 'y'))
+    on_y_axis = CircleGeom(r=0.2, startangl=0, stopangl=2 * math.pi, centroid=(0.0, 1.0))
+    CAD2MPACT.reduce_geom(on_y_axis, quarter)
+    assert (on_y_axis.StartAngle, on_y_axis.StopAngle) == (-math.pi / 2, math.pi / 2)
+
+
+def test_mirrored_parts_of_different_heights_are_not_symmetric():
+    doc = freecadstandin.newDocument('Axial')
+    boundary = doc.addObject('Part::Box', 'Boundary')
+    boundary.Length = boundary.Width = 4.0
+    boundary.Placement = freecadstandin.Placement(freecadstandin.Vector(-2.0, -2.0, 0.0))
+    rods = []
+    for x, y in ((-1.0, 0.0), (1.0, 0.0), (0.0, -1.0), (0.0, 1.0)):
+        rod = doc.addObject('Part::Cylinder', 'Rod')
+        rod.Radius, rod.Height = 0.3, 10.0
+        rod.Placement = freecadstandin.Placement(freecadstandin.Vector(x, y, 0.0))
+        rods.append(rod)
+    bounds = boundary.Shape.BoundBox
+    assert symmetry.detect_symmetry(rods, bounds).order == 8
+
+    rods[1].Height = 6.0    # same footprint, shorter
+    assert symmetry.detect_symmetry(rods, bounds).order == 1
+
+
+def rods_document(positions, pitch, height=10.0, heights=None):
+    """
+    :return: a boundary box around len(positions) fuel rods (clad and fuel cylinders)
+    """
+    doc = freecadstandin.newDocument('Rods')
+    xs = [x for x, y in positions]
+    ys = [y for x, y in positions]
+    boundary = doc.addObject('Part::Box', 'Boundary')
+    boundary.Length = max(xs) - min(xs) + pitch
+    boundary.Width = max(ys) - min(ys) + pitch
+    boundary.Height = height
+    boundary.Placement = freecadstandin.Placement(
+        freecadstandin.Vector(min(xs) - pitch / 2, min(ys) - pitch / 2, 0.0))
+    objs = [boundary]
+    for n, (x, y) in enumerate(positions):
+        for r in (0.46, 0.39):
+            rod = doc.addObject('Part::Cylinder', 'Rod')
+            rod.Radius = r
+            rod.Height = height if heights is None else heights[n]
+            rod.Placement = freecadstandin.Placement(freecadstandin.Vector(x, y, 0.0))
+            objs.append(rod)
+    return objs
+
+
+def test_identical_slices_collapse_into_one_zone():
+    stack = CAD2MPACT.create_axial_model(rods_document([(0.0, 0.0)], 1.26), dz=1.0)
+    assert stack.NSlices == 10
+    assert [multiplier for mesh_type, multiplier in stack.Zones] == [10]
+    assert len(stack.mesh_types()) == 1
+
+
+def test_a_shorter_rod_splits_the_zones():
+    stack = CAD2MPACT.create_axial_model(rods_document([(0.0, 0.0)], 1.26, heights=[4.0]), dz=1.0)
+    assert stack.NSlices == 10
+    assert [multiplier for mesh_type, multiplier in stack.Zones] == [4, 6]
+
+
+def test_equal_pins_of_a_lattice_share_one_id():
+    pitch = 1.26
+    positions = [(i * pitch, j * pitch) for j in range(3) for i in range(3)]
+    lattice, pins = CAD2MPACT.create_lattice_model(rods_document(positions, pitch))
+    assert lattice.Map == [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+    assert len(pins) == 1
+    assert [geom.Radius for level in pins[1].Levels.values() for geom in level.geoms] == [0.46, 0.39]
+    assert all(geom.Centroid == (0.0, 0.0) for level in pins[1].Levels.values() for geom in level.geoms)
+
+
+def test_a_different_pin_gets_its_own_id():
+    pitch = 1.26
+    positions = [(i * pitch, j * pitch) for j in range(3) for i in range(3)]
+    objs = rods_document(positions, pitch)
+    objs[9].Radius = 0.45     # clad of the center pin
+    lattice, pins = CAD2MPACT.create_lattice_model(objs)
+    assert lattice.Map == [[1, 1, 1], [1, 2, 1], [1, 1, 1]]
+    assert len(pins) == 2
@@ -0,0 +1,36 @@
+import math
+
+import pytest
+
+from mpactgeometry import BoxGeom, CircleGeom, GeneralMeshType, Level, MeshParams
+
+np = pytest.importorskip('numpy')
+
+
+def mesh_type(geoms, pitch=1.26):
+    levels = [Level(geoms=[g], name=n) for n, g in enumerate(geoms, 1)]
+    return GeneralMeshType(id=1, xpitch=pitch, ypitch=pitch, zpitch=1.0, levels=levels)
+
+
+def test_ring_and_box_areas():
+    outer = CircleGeom(r=0.5, startangl=0, stopangl=2 * math.pi, meshparams=MeshParams(2, 4))
+    inner = CircleGeom(r=0.3, startangl=0, stopangl=2 * math.pi, meshparams=MeshParams())
+    box = BoxGeom(cornerpt=(-0.1, -0.1), extent=[0.2, 0.2], meshparams=MeshParams())
+    table = mesh_type([outer, inner, box]).fsr_areas()
+
+    moderator = (1.26 ** 2 - math.pi * 0.25) / 4
+    ring = math.pi * (0.25 - 0.09) / 8
+    expected = [moderator] * 4 + [ring] * 8 + [math.pi * 0.09 - 0.04, 0.04]
+    assert np.allclose(table['area'], expected)
+    assert list(table['level']) == [0] * 4 + [1] * 8 + [2, 3]
+    assert list(table['ring'][4:12]) == [0] * 4 + [1] * 4
+    assert list(table['sector'][4:12]) == [0, 1, 2, 3] * 2
+    assert table['summary']['count'] == 14
+    assert math.isclose(table['summary']['total'], 1.26 ** 2)
+
+
+def test_eighth_symmetric_areas():
+    fuel = CircleGeom(r=0.4, startangl=0, stopangl=math.pi / 4, meshparams=MeshParams(3, 1))
+    table = mesh_type([fuel]).fsr_areas()
+    assert np.allclose(table['area'], [(1.26 ** 2 - math.pi * 0.16) / 8] + [math.pi * 0.16 / 24] * 3)
+    assert math.isclose(table['summary']['total'], 1.26 ** 2 / 8)
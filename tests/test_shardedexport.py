@@ -0,0 +1,92 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import CAD2MC
+import CAD2MPACT
+from mpactgeometry import GeneralMeshType, Lattice
+from shardedexport import ShardSet
+
+
+def write_text(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_names_that_sanitize_alike_get_different_files(tmp_path):
+    shards = ShardSet(str(tmp_path), '', '')
+    assert shards.filename('a b') != shards.filename('a_b')
+    shards.write([('a b', '1', write_text, ('space\n',)), ('a_b', '1', write_text, ('underscore\n',))])
+    shards.merge(str(tmp_path / 'out'))
+    assert open(str(tmp_path / 'out')).read() == 'space\nunderscore\n'
+
+
+def test_only_changed_shards_are_rewritten(tmp_path):
+    directory = str(tmp_path / 'shards')
+    jobs = [('a', '1', write_text, ('a1\n',)), ('b', '1', write_text, ('b1\n',))]
+    assert ShardSet(directory, '<', '>').write(jobs) == ['a', 'b']
+
+    shards = ShardSet(directory, '<', '>')
+    assert shards.write([('b', '2', write_text, ('b2\n',)), jobs[0]]) == ['b']
+    shards.merge(str(tmp_path / 'out'))
+    assert open(str(tmp_path / 'out')).read() == '<b2\na1\n>'
+
+    assert ShardSet(directory, '', '').write([jobs[0]]) == []
+    assert sorted(os.listdir(directory)) == sorted([ShardSet.MANIFEST, shards.filename('a')])
+    with pytest.raises(ValueError):
+        shards.write([jobs[0], jobs[0]])
+
+
+def test_slots_follow_the_names(tmp_path):
+    directory = str(tmp_path)
+    shards = ShardSet(directory, '', '')
+    assert [shards.slot(n) for n in ('a', 'b', 'c', 'a')] == [0, 1, 2, 0]
+    shards.write([(n, '1', write_text, ('',)) for n in ('a', 'c')])
+
+    # b was removed, its slot is free again; a and c keep theirs across runs
+    shards = ShardSet(directory, '', '')
+    assert [shards.slot(n) for n in ('c', 'd', 'a')] == [2, 1, 0]
+
+
+def pin_cells():
+    fuel = CAD2MC.get_surface('ZCylinder', x0=0.0, y0=0.0, R=0.39)
+    return [{'name': 'fuel', 'region': -fuel, 'material': 1},
+            {'name': 'water', 'region': +fuel, 'material': 2}]
+
+
+def test_export_sharded_universes_and_lattices(tmp_path):
+    out = str(tmp_path / 'geometry.xml')
+    directory = str(tmp_path / 'shards')
+    lattice = {'pitch': (1.26, 1.26), 'lower_left': (-1.89, -1.89), 'outer': 2,
+               'universes': [[1, 1, 1], [1, 3, 1], [1, 1, 1]]}
+    CAD2MC.export_sharded([('pin', 1, pin_cells())], directory, out, lattices=[('assembly', 10, lattice)])
+    before = ET.parse(out).getroot()
+    ids = sorted((c.get('name'), c.get('id')) for c in before.iter('cell'))
+
+    # adding a universe in front does not renumber the existing one
+    written = CAD2MC.export_sharded([('guide tube', 3, pin_cells()), ('pin', 1, pin_cells())],
+                                    directory, out, lattices=[('assembly', 10, lattice)])
+    assert written == ['guide tube']
+    geometry = ET.parse(out).getroot()
+    cells = [(c.get('name'), c.get('id')) for c in geometry.iter('cell') if c.get('universe') == '1']
+    assert sorted(cells) == ids
+    all_ids = [c.get('id') for c in geometry.iter('cell')]
+    assert len(all_ids) == len(set(all_ids)) == 4
+
+    lattices = list(geometry.iter('lattice'))
+    assert [(l.get('id'), l.get('name')) for l in lattices] == [('10', 'assembly')]
+    assert lattices[0].find('dimension').text == '3 3'
+    assert lattices[0].find('outer').text == '2'
+    assert lattices[0].find('universes').text.split() == ['1', '1', '1', '1', '3', '1', '1', '1', '1']
+
+
+def test_mpact_lattices_are_sharded(tmp_path):
+    pytest.importorskip('lxml')
+    pin = GeneralMeshType(id=1, xpitch=1.26, ypitch=1.26, zpitch=1.0)
+    lattice = Lattice(pitch=1.26, pin_map=[[1, 1], [1, 1]], id=1)
+    out = str(tmp_path / 'mpact.xml')
+    written = CAD2MPACT.export_sharded([pin, lattice], str(tmp_path / 'shards'), out)
+    assert len(written) == 2
+    text = open(out).read()
+    assert '<ParameterList name="Assembly">' in text and 'name="PinMap"' in text